@@ -0,0 +1,104 @@
+"""
+Coalescing buffer for autosaved exam answers.
+
+Clients autosave essay answers while the student types. Autosaves are kept in
+memory per (session, student, question) and only the latest value is written,
+once the question has been quiet for AUTOSAVE_DEBOUNCE seconds (or after
+AUTOSAVE_MAX_DELAY while the student keeps typing). Every write is one batched
+upsert. Explicit saves bypass the buffer, and reads flush it first.
+"""
+import asyncio
+import itertools
+import os
+import time
+
+from async_db import async_db
+
+AUTOSAVE_DEBOUNCE = float(os.getenv("AUTOSAVE_DEBOUNCE", 1.0))
+AUTOSAVE_MAX_DELAY = float(os.getenv("AUTOSAVE_MAX_DELAY", 5.0))
+
+
+class AnswerAutosaver:
+    """Buffers autosaved answers and writes the latest of each in batches."""
+
+    def __init__(self, database=async_db, debounce=AUTOSAVE_DEBOUNCE, max_delay=AUTOSAVE_MAX_DELAY):
+        self.database = database
+        self.debounce = debounce
+        self.max_delay = max_delay
+        # (session_id, roll_no, question_id) -> [answer_text, selected_option_id, first_buffered, last_buffered, seq]
+        self._pending = {}
+        # key -> sequence number of its newest answer (buffered or saved), so a failed write
+        # never puts back an answer that something newer has replaced
+        self._latest = {}
+        self._sequence = itertools.count()
+        self._task = None
+
+    def buffer(self, session_id, roll_no, question_id, answer_text=None, selected_option_id=None):
+        """Remember an autosaved answer, replacing any unsaved earlier one."""
+        now = time.monotonic()
+        key = (session_id, roll_no, question_id)
+        entry = self._pending.get(key)
+        seq = self._latest[key] = next(self._sequence)
+        self._pending[key] = [answer_text, selected_option_id, entry[2] if entry else now, now, seq]
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def save_now(self, session_id, roll_no, answers):
+        """Write answers immediately; answers is a list of (question_id, answer_text, selected_option_id)."""
+        for question_id, _, _ in answers:
+            key = (session_id, roll_no, question_id)
+            self._pending.pop(key, None)
+            self._latest[key] = next(self._sequence)
+        return await self.database.save_student_answers(
+            [(session_id, roll_no, question_id, answer_text, selected_option_id)
+             for question_id, answer_text, selected_option_id in answers]
+        )
+
+    async def flush(self, session_id=None, roll_no=None):
+        """Write every buffered answer (optionally of one session or student) now."""
+        keys = [key for key in self._pending
+                if (session_id is None or key[0] == session_id) and (roll_no is None or key[1] == roll_no)]
+        return await self._write(keys)
+
+    def discard(self, session_id):
+        """Drop a deleted session's buffered answers."""
+        for key in [key for key in self._pending if key[0] == session_id]:
+            del self._pending[key]
+        for key in [key for key in self._latest if key[0] == session_id]:
+            del self._latest[key]
+
+    async def close(self):
+        """Stop the background flusher and write whatever is still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    async def _write(self, keys):
+        if not keys:
+            return True
+        entries = {key: self._pending.pop(key) for key in keys}
+        saved = await self.database.save_student_answers(
+            [key + (answer_text, selected_option_id) for key, (answer_text, selected_option_id, *_) in entries.items()]
+        )
+        if not saved:
+            # Keep the answers for the next flush unless newer ones were buffered or saved meanwhile
+            for key, entry in entries.items():
+                if self._latest.get(key) == entry[4]:
+                    self._pending[key] = entry
+        return saved
+
+    async def _run(self):
+        while self._pending:
+            await asyncio.sleep(self.debounce / 2)
+            now = time.monotonic()
+            due = [key for key, (_, _, first, last, _) in self._pending.items()
+                   if now - last >= self.debounce or now - first >= self.max_delay]
+            try:
+                await self._write(due)
+            except Exception as e:
+                print(f"Error flushing autosaved answers: {e}")
+
+
+# Global autosaver instance
+answer_autosaver = AnswerAutosaver(async_db)
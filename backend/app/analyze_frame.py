@@ -1,9 +1,10 @@
 # proctor_ai/analyze_frame.py
 import cv2
-from .head_pose import get_head_pose
-from .gaze import get_gaze
+from .head_pose import get_head_pose, head_pose_from_landmarks, mirror_landmarks
+from .gaze import get_gaze, gaze_from_landmarks
 from .device_detector import detect_device
 from .attention import AttentionScorer
+from .quality import quality_ladder
 
 # Thresholds (can also load from .env)
 HEAD_POSE_YAW_THRESHOLD = 25
@@ -11,17 +12,84 @@ HEAD_POSE_PITCH_THRESHOLD = 20
 GAZE_OFF_CENTER_DURATION = 1.5
 SCORE_SMOOTHING_ALPHA = 0.1
 
-attention_scorer = AttentionScorer(
-    HEAD_POSE_YAW_THRESHOLD, HEAD_POSE_PITCH_THRESHOLD, GAZE_OFF_CENTER_DURATION, SCORE_SMOOTHING_ALPHA
-)
+def create_attention_scorer():
+    """Returns a new scorer; each student needs their own, since scores are smoothed over time."""
+    return AttentionScorer(
+        HEAD_POSE_YAW_THRESHOLD, HEAD_POSE_PITCH_THRESHOLD, GAZE_OFF_CENTER_DURATION, SCORE_SMOOTHING_ALPHA
+    )
 
-def analyze_frame(frame):
-    """Analyzes a single frame and returns number of faces, status, attention score, and device info."""
-    num_faces, head_pose = get_head_pose(frame)
-    _, gaze = get_gaze(frame)
-    device = detect_device(frame)
+attention_scorer = create_attention_scorer()
 
-    attention_score, state = attention_scorer.calculate_attention_score(head_pose, gaze, device, num_faces)
+def analyze_frame(frame, scorer=None, tier=None, timestamp=None):
+    """Analyzes a single frame and returns number of faces, status, attention score, and device info.
+
+    Pass the student's own scorer; the shared module-level one is used otherwise.
+    The quality tier defaults to the one currently chosen by quality_ladder.
+    timestamp is the frame's capture time (seconds), see AttentionScorer.
+    """
+    return score_features(frame_features(frame, tier), scorer, timestamp)
+
+def frame_features(frame, tier=None):
+    """The detection half of analyze_frame(): faces, head pose, gaze and device, without scoring.
+
+    It keeps no state between frames, so frames of one video can be run out
+    of order (e.g. on a process pool) and scored in order afterwards.
+    """
+    tier = tier or quality_ladder.tier
+    num_faces, head_pose = get_head_pose(frame, tier.refine_landmarks)
+    if tier.iris:
+        _, gaze = get_gaze(frame)
+    else:
+        gaze = {"direction": "center", "confidence": 0.0}
+    device = detect_device(frame, tier.detector_size)
+    return {
+        "num_faces": num_faces,
+        "head_pose": head_pose,
+        "gaze": gaze,
+        "device": device,
+        "quality_tier": tier.name
+    }
+
+def score_features(features, scorer=None, timestamp=None):
+    """The scoring half of analyze_frame(): feeds frame_features() output to the student's scorer."""
+    scorer = scorer or attention_scorer
+    attention_score, state = scorer.calculate_attention_score(
+        features["head_pose"], features["gaze"], features["device"], features["num_faces"], timestamp
+    )
+
+    return {
+        "num_faces": features["num_faces"],
+        "head_pose": features["head_pose"],
+        "gaze": features["gaze"],
+        "device": features["device"],
+        "attention_score": round(attention_score, 2),
+        "state": state,
+        "quality_tier": features["quality_tier"]
+    }
+
+def analyze_landmarks(landmarks, width, height, scorer=None, thumbnail=None, tier=None, timestamp=None):
+    """Scores client-computed face landmarks (edge mode) like analyze_frame() scores an image.
+
+    landmarks is a (faces, points, 3) array from decode_landmarks() of the
+    unflipped camera image of the given size. Device detection only runs when
+    a thumbnail image is given; otherwise the result has device None.
+    """
+    scorer = scorer or attention_scorer
+    tier = tier or quality_ladder.tier
+    num_faces = len(landmarks)
+    head_pose = None
+    gaze = {"direction": "center", "confidence": 0.0}
+    if num_faces:
+        # get_head_pose() works on the flipped (selfie-view) image's landmarks
+        try:
+            head_pose = head_pose_from_landmarks(mirror_landmarks(landmarks[0]), width, height)
+        except cv2.error:
+            # Degenerate client landmarks (e.g. all points on top of each other)
+            head_pose = None
+        gaze = gaze_from_landmarks(landmarks[0])
+    device = detect_device(thumbnail, tier.detector_size) if thumbnail is not None else None
+
+    attention_score, state = scorer.calculate_attention_score(head_pose, gaze, device, num_faces, timestamp)
 
     return {
         "num_faces": num_faces,
@@ -29,5 +97,7 @@ def analyze_frame(frame):
         "gaze": gaze,
         "device": device,
         "attention_score": round(attention_score, 2),
-        "state": state
+        "state": state,
+        "quality_tier": tier.name,
+        "source": "landmarks"
     }
@@ -10,10 +10,13 @@ class AttentionScorer:
         self.last_gaze_off_center_time = None
         self.smoothed_score = 70.0  # Start with a base score
 
-    def calculate_attention_score(self, head_pose, gaze, device, num_faces):
+    def calculate_attention_score(self, head_pose, gaze, device, num_faces=1, timestamp=None):
         """
         Calculates the attention score based on head pose, gaze, device detection, and number of faces.
+        timestamp is the frame's capture time in seconds (defaults to now). Passing it makes
+        the result depend only on the frames, so replays match live processing exactly.
         """
+        now = time.time() if timestamp is None else timestamp
         base_score = 100
         state = "focused" # Default state
 
@@ -36,8 +39,8 @@ class AttentionScorer:
         if gaze:
             if gaze["direction"] != "center":
                 if self.last_gaze_off_center_time is None:
-                    self.last_gaze_off_center_time = time.time()
-                elif time.time() - self.last_gaze_off_center_time > self.gaze_duration_threshold:
+                    self.last_gaze_off_center_time = now
+                elif now - self.last_gaze_off_center_time > self.gaze_duration_threshold:
                     base_score -= 25 # Gaze penalty still applies to score
             else:
                 self.last_gaze_off_center_time = None
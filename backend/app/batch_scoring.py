@@ -0,0 +1,148 @@
+# proctor_ai/batch_scoring.py
+"""
+Vectorized attention scoring of whole sessions.
+
+score_batch() computes, for arrays of per-frame features, exactly what
+feeding the frames one by one through a fresh AttentionScorer (with frame
+timestamps) returns: the state priority, the gaze-off-center duration
+logic and the EMA smoothing. It is meant for re-evaluating stored sessions
+with different thresholds without a Python loop per event.
+"""
+from datetime import datetime, timezone
+
+import numpy as np
+from scipy.signal import lfilter
+
+# Initial smoothed score of a new AttentionScorer
+INITIAL_SCORE = 70.0
+
+STATE_NAMES = np.array(["focused", "away", "multiple_faces_detected", "device_detected"])
+FOCUSED, AWAY, MULTIPLE_FACES, DEVICE = range(4)
+
+
+def features_from_events(events):
+    """Turn analysis results (analyze_frame() output or stored events) into score_batch() arrays.
+
+    Timestamps are taken from 'captured_at' when present (the arrival time
+    the live scorer used), else from 'timestamp' (seconds, or a stored
+    'YYYY-MM-DD HH:MM:SS' with whole-second resolution), else the frame index.
+    """
+    count = len(events)
+    features = {
+        "yaw": np.full(count, np.nan),
+        "pitch": np.full(count, np.nan),
+        # 1 off-center, 0 center, -1 no gaze estimate
+        "gaze_off": np.full(count, -1, dtype=np.int8),
+        "num_faces": np.zeros(count, dtype=np.int16),
+        "phone_detected": np.zeros(count, dtype=bool),
+        "timestamps": np.arange(count, dtype=np.float64),
+    }
+    for i, event in enumerate(events):
+        head_pose = event.get("head_pose")
+        if head_pose:
+            features["yaw"][i] = head_pose["yaw"]
+            features["pitch"][i] = head_pose["pitch"]
+        gaze = event.get("gaze")
+        if gaze and gaze.get("direction") is not None:
+            features["gaze_off"][i] = gaze["direction"] != "center"
+        features["num_faces"][i] = event.get("num_faces") or 0
+        features["phone_detected"][i] = bool((event.get("device") or {}).get("phone_detected"))
+        if event.get("captured_at") is not None:
+            features["timestamps"][i] = event["captured_at"]
+        elif isinstance(event.get("timestamp"), (int, float)):
+            features["timestamps"][i] = event["timestamp"]
+        elif event.get("timestamp"):
+            features["timestamps"][i] = (datetime.fromisoformat(event["timestamp"])
+                                         .replace(tzinfo=timezone.utc).timestamp())
+    return features
+
+
+def score_batch(yaw, pitch, gaze_off, num_faces, phone_detected, timestamps,
+                yaw_threshold, pitch_threshold, gaze_duration_threshold, smoothing_alpha,
+                initial_score=INITIAL_SCORE):
+    """Score a sequence of frames at once.
+
+    yaw/pitch are NaN where no head pose was estimated; gaze_off is 1 for an
+    off-center gaze, 0 for center and -1 where there was no gaze estimate.
+    Arrays may be 2-D (one row per student, frames along the last axis):
+    rows are scored independently, and rows padded at the end with NaN
+    yaw/pitch and gaze_off -1 score their real frames unchanged.
+    Returns (scores, states): the smoothed scores (not rounded) and state
+    codes (index into STATE_NAMES).
+    """
+    states, base = head_states(yaw, pitch, num_faces, phone_detected, yaw_threshold, pitch_threshold)
+    off, run_time = gaze_runs(gaze_off, timestamps)
+    score = raw_scores(base, off, run_time, gaze_duration_threshold)
+    return smooth_scores(score, smoothing_alpha, initial_score), states
+
+
+# The stages of score_batch(), for callers that vary one threshold at a time
+
+def head_states(yaw, pitch, num_faces, phone_detected, yaw_threshold, pitch_threshold):
+    """State codes and base scores (before the gaze penalty), by priority: device, multiple faces, head away."""
+    yaw = np.asarray(yaw, dtype=np.float64)
+    pitch = np.asarray(pitch, dtype=np.float64)
+    device = np.asarray(phone_detected, dtype=bool)
+    multiple = ~device & (np.asarray(num_faces) > 1)
+    with np.errstate(invalid="ignore"):
+        head_away = (np.abs(yaw) > yaw_threshold) | (np.abs(pitch) > pitch_threshold)
+    away = ~device & ~multiple & ~np.isnan(yaw) & head_away
+    states = np.select([device, multiple, away], [DEVICE, MULTIPLE_FACES, AWAY], FOCUSED).astype(np.int8)
+    base = 100 - np.select([device, multiple, away], [50, 60, 30], 0)
+    return states, base
+
+
+def gaze_runs(gaze_off, timestamps):
+    """(off, run_time): off-center frames and how long their off-center run had lasted at each.
+
+    A run starts at its first off-center frame; frames without a gaze
+    estimate neither extend nor end a run.
+    """
+    gaze_off = np.asarray(gaze_off)
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    off = gaze_off == 1
+    index = np.broadcast_to(np.arange(off.shape[-1]), off.shape)
+    # Index of the last frame with a gaze estimate before each frame (-1: none)
+    last_gaze = np.maximum.accumulate(np.where(gaze_off >= 0, index, -1), axis=-1)
+    previous_gaze = np.concatenate((np.full(off.shape[:-1] + (1,), -1), last_gaze[..., :-1]), axis=-1)
+    previous_off = np.take_along_axis(off, np.maximum(previous_gaze, 0), axis=-1) & (previous_gaze >= 0)
+    run_start = off & ~previous_off
+    first = np.maximum.accumulate(np.where(run_start, index, 0), axis=-1)
+    return off, timestamps - np.take_along_axis(timestamps, first, axis=-1)
+
+
+def raw_scores(base, off, run_time, gaze_duration_threshold):
+    """Unsmoothed scores: base minus the gaze penalty once a run lasted longer than the threshold."""
+    return np.clip(base - 25 * (off & (run_time > gaze_duration_threshold)), 0, 100).astype(np.float64)
+
+
+def smooth_scores(score, smoothing_alpha, initial_score=INITIAL_SCORE):
+    """EMA s[n] = alpha * x[n] + (1 - alpha) * s[n-1], the same operations as the streaming scorer."""
+    decay = 1 - smoothing_alpha
+    initial = np.full(np.shape(score)[:-1] + (1,), decay * initial_score)
+    smoothed, _ = lfilter([smoothing_alpha], [1.0, -decay], score, axis=-1, zi=initial)
+    return np.clip(smoothed, 0, 100)
+
+
+def rescore_events(events, yaw_threshold, pitch_threshold, gaze_duration_threshold, smoothing_alpha):
+    """Re-score stored events with the given thresholds; returns a summary next to the stored one."""
+    if not events:
+        return {"events": 0, "average_attention_score": None, "state_counts": {},
+                "stored_average_attention_score": None, "stored_state_counts": {}}
+    scores, states = score_batch(**features_from_events(events), yaw_threshold=yaw_threshold,
+                                 pitch_threshold=pitch_threshold,
+                                 gaze_duration_threshold=gaze_duration_threshold,
+                                 smoothing_alpha=smoothing_alpha)
+    # Live results are rounded per frame before they are averaged
+    scores = np.round(scores, 2)
+    counts = np.bincount(states, minlength=len(STATE_NAMES))
+    stored_states, stored_counts = np.unique([event.get("state") or "unknown" for event in events],
+                                             return_counts=True)
+    return {
+        "events": len(events),
+        "average_attention_score": round(float(scores.mean()), 2),
+        "state_counts": {str(name): int(count) for name, count in zip(STATE_NAMES, counts) if count},
+        "stored_average_attention_score": round(float(np.mean([event.get("attention_score") or 0
+                                                                for event in events])), 2),
+        "stored_state_counts": {str(name): int(count) for name, count in zip(stored_states, stored_counts)},
+    }
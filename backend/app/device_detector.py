@@ -1,11 +1,21 @@
+import threading
+
 import cv2
 import numpy as np
 from ultralytics import YOLO
 
+YOLO_WEIGHTS = 'yolov8n.pt'
+MNET_PROTOTXT = "MobileNetSSD_deploy.prototxt.txt"
+MNET_WEIGHTS = "MobileNetSSD_deploy.caffemodel"
+
+# Neither a YOLO predictor nor a cv2.dnn net may be used by two threads at once, and
+# frames are analysed on several (see frame_scheduler.py): each thread loads its own.
+_thread_models = threading.local()
+
 # Initialize YOLOv8 model
 # This will download the model if not present
 try:
-    yolo_model = YOLO('yolov8n.pt')
+    yolo_model = YOLO(YOLO_WEIGHTS)
     YOLO_AVAILABLE = True
 except Exception as e:
     print(f"Warning: Could not initialize YOLOv8. Falling back to MobileNet-SSD. Error: {e}")
@@ -17,7 +27,7 @@ if not YOLO_AVAILABLE:
     # https://github.com/chuanqi305/MobileNet-SSD/blob/master/MobileNetSSD_deploy.caffemodel
     # https://github.com/chuanqi305/MobileNet-SSD/blob/master/MobileNetSSD_deploy.prototxt
     try:
-        net = cv2.dnn.readNetFromCaffe("MobileNetSSD_deploy.prototxt.txt", "MobileNetSSD_deploy.caffemodel")
+        net = cv2.dnn.readNetFromCaffe(MNET_PROTOTXT, MNET_WEIGHTS)
         CLASSES = ["background", "aeroplane", "bicycle", "bird", "boat",
                    "bottle", "bus", "car", "cat", "chair", "cow", "diningtable",
                    "dog", "horse", "motorbike", "person", "pottedplant", "sheep",
@@ -30,21 +40,38 @@ else:
     MNET_AVAILABLE = False
 
 
-def detect_device(frame):
+# Models loaded at import already handed to a thread
+_claimed = set()
+_claim_lock = threading.Lock()
+
+def _thread_model(name, load, shared):
+    """This thread's instance of a model; the first thread to ask gets the one loaded at import."""
+    model = getattr(_thread_models, name, None)
+    if model is None:
+        with _claim_lock:
+            reuse = name not in _claimed
+            _claimed.add(name)
+        model = shared if reuse else load()
+        setattr(_thread_models, name, model)
+    return model
+
+def detect_device(frame, imgsz=640):
     """
     Detects phones or other unauthorized devices in the frame.
     Prioritizes YOLOv8 if available, otherwise falls back to MobileNet-SSD.
+    imgsz is the YOLO input size (smaller is faster, less accurate for small objects).
     """
     if YOLO_AVAILABLE:
-        return detect_device_yolo(frame)
+        return detect_device_yolo(frame, imgsz)
     elif MNET_AVAILABLE:
         return detect_device_mobilenet(frame)
     else:
         return {"phone_detected": False, "bbox": None, "confidence": 0.0}
 
-def detect_device_yolo(frame):
+def detect_device_yolo(frame, imgsz=640):
     """Detects devices using YOLOv8."""
-    results = yolo_model(frame, verbose=False)
+    model = _thread_model("yolo", lambda: YOLO(YOLO_WEIGHTS), yolo_model)
+    results = model(frame, imgsz=imgsz, verbose=False)
     
     for result in results:
         for box in result.boxes:
@@ -62,8 +89,9 @@ def detect_device_mobilenet(frame):
     """Detects devices using MobileNet-SSD."""
     (h, w) = frame.shape[:2]
     blob = cv2.dnn.blobFromImage(cv2.resize(frame, (300, 300)), 0.007843, (300, 300), 127.5)
-    net.setInput(blob)
-    detections = net.forward()
+    thread_net = _thread_model("mobilenet", lambda: cv2.dnn.readNetFromCaffe(MNET_PROTOTXT, MNET_WEIGHTS), net)
+    thread_net.setInput(blob)
+    detections = thread_net.forward()
 
     for i in np.arange(0, detections.shape[2]):
         confidence = detections[0, 0, i, 2]
@@ -28,34 +28,43 @@ def get_gaze(frame):
             num_faces = len(results.multi_face_landmarks)
             # Process only the first detected face for gaze estimation
             face_landmarks = results.multi_face_landmarks[0]
+            points = np.array([(lm.x, lm.y) for lm in face_landmarks.landmark], dtype=np.float64)
+            gaze_data = gaze_from_landmarks(points)
 
-            # Using left eye for gaze estimation
-            left_eye_landmarks = [33, 160, 158, 133, 153, 144]
-            
-            # Eye corners
-            left_corner = (face_landmarks.landmark[33].x, face_landmarks.landmark[33].y)
-            right_corner = (face_landmarks.landmark[133].x, face_landmarks.landmark[133].y)
-
-            # Iris - approximation using a point in the middle of the eye
-            # A more robust solution would use iris tracking landmarks if available
-            iris_center_x = np.mean([face_landmarks.landmark[i].x for i in [473, 474, 475, 476, 477]])
-            
-            eye_width = right_corner[0] - left_corner[0]
-            
-            # Normalize iris position within the eye
-            relative_iris_pos = (iris_center_x - left_corner[0]) / eye_width if eye_width != 0 else 0.5
-
-            direction = "center"
-            confidence = 0.8
-            if relative_iris_pos < 0.35:
-                direction = "right" # Looking right from user's perspective
-                confidence = 1.0 - (relative_iris_pos / 0.35)
-            elif relative_iris_pos > 0.65:
-                direction = "left" # Looking left from user's perspective
-                confidence = (relative_iris_pos - 0.65) / 0.35
-            
-            confidence = min(1.0, confidence)
-
-            gaze_data = {"direction": direction, "confidence": confidence}
-
-    return num_faces, gaze_data
\ No newline at end of file
+    return num_faces, gaze_data
+
+
+def gaze_from_landmarks(points):
+    """
+    Estimates gaze direction from an (N, 2+) array of normalized FaceMesh
+    landmarks of the unflipped image. Needs the refined landmarks (N = 478,
+    with iris); returns center with confidence 0.0 without them.
+    """
+    if len(points) < 478:
+        return {"direction": "center", "confidence": 0.0}
+
+    # Using left eye for gaze estimation
+    # Eye corners
+    left_corner = points[33]
+    right_corner = points[133]
+
+    # Iris - approximation using the mean of the iris landmarks
+    iris_center_x = np.mean(points[473:478, 0])
+
+    eye_width = right_corner[0] - left_corner[0]
+
+    # Normalize iris position within the eye
+    relative_iris_pos = (iris_center_x - left_corner[0]) / eye_width if eye_width != 0 else 0.5
+
+    direction = "center"
+    confidence = 0.8
+    if relative_iris_pos < 0.35:
+        direction = "right" # Looking right from user's perspective
+        confidence = 1.0 - (relative_iris_pos / 0.35)
+    elif relative_iris_pos > 0.65:
+        direction = "left" # Looking left from user's perspective
+        confidence = (relative_iris_pos - 0.65) / 0.35
+
+    confidence = min(1.0, float(confidence))
+
+    return {"direction": direction, "confidence": confidence}
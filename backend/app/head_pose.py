@@ -4,14 +4,15 @@ import numpy as np
 
 mp_face_mesh = mp.solutions.face_mesh
 
-def get_head_pose(frame):
+def get_head_pose(frame, refine_landmarks=True):
     """
     Estimates head pose (yaw, pitch, roll) from a single frame.
     Returns a tuple: (num_faces, head_pose_data_for_first_face)
+    refine_landmarks=False is cheaper; head pose doesn't use the refined (iris) landmarks.
     """
     with mp_face_mesh.FaceMesh(
         max_num_faces=2, # Changed to 2 for up to two faces
-        refine_landmarks=True,
+        refine_landmarks=refine_landmarks,
         min_detection_confidence=0.5,
         min_tracking_confidence=0.5) as face_mesh:
 
@@ -29,48 +30,70 @@ def get_head_pose(frame):
         if results.multi_face_landmarks:
             num_faces = len(results.multi_face_landmarks)
             # Process only the first detected face for head pose estimation
-            face_landmarks = results.multi_face_landmarks[0]
-
-            # 3D model points.
-            face_3d = np.array([
-                (0.0, 0.0, 0.0),            # Nose tip
-                (0.0, -330.0, -65.0),       # Chin
-                (-225.0, 170.0, -135.0),    # Left eye left corner
-                (225.0, 170.0, -135.0),     # Right eye right corner
-                (-150.0, -150.0, -125.0),   # Left Mouth corner
-                (150.0, -150.0, -125.0)     # Right mouth corner
-            ], dtype=np.float64)
-
-            # 2D image points from mediapipe
-            face_2d = np.array([
-                (face_landmarks.landmark[1].x * image.shape[1], face_landmarks.landmark[1].y * image.shape[0]),      # Nose tip
-                (face_landmarks.landmark[152].x * image.shape[1], face_landmarks.landmark[152].y * image.shape[0]),   # Chin
-                (face_landmarks.landmark[263].x * image.shape[1], face_landmarks.landmark[263].y * image.shape[0]),   # Left eye left corner
-                (face_landmarks.landmark[33].x * image.shape[1], face_landmarks.landmark[33].y * image.shape[0]),      # Right eye right corner
-                (face_landmarks.landmark[287].x * image.shape[1], face_landmarks.landmark[287].y * image.shape[0]),   # Left Mouth corner
-                (face_landmarks.landmark[57].x * image.shape[1], face_landmarks.landmark[57].y * image.shape[0])       # Right mouth corner
-            ], dtype=np.float64)
-
-            focal_length = image.shape[1]
-            center = (image.shape[1]/2, image.shape[0]/2)
-            camera_matrix = np.array(
-                [[focal_length, 0, center[0]],
-                 [0, focal_length, center[1]],
-                 [0, 0, 1]], dtype = "double"
-            )
-
-            dist_coeffs = np.zeros((4,1)) # Assuming no lens distortion
-            (success, rotation_vector, translation_vector) = cv2.solvePnP(face_3d, face_2d, camera_matrix, dist_coeffs, flags=cv2.SOLVEPNP_ITERATIVE)
-
-            # Convert rotation vector to rotation matrix
-            rotation_matrix, _ = cv2.Rodrigues(rotation_vector)
-            pose_mat = cv2.hconcat((rotation_matrix, translation_vector))
-            _, _, _, _, _, _, euler_angles = cv2.decomposeProjectionMatrix(pose_mat)
-            
-            yaw = euler_angles[1, 0]
-            pitch = euler_angles[0, 0]
-            roll = euler_angles[2, 0]
-
-            head_pose_data = {"yaw": yaw, "pitch": pitch, "roll": roll}
-
-        return num_faces, head_pose_data
\ No newline at end of file
+            points = landmarks_to_array(results.multi_face_landmarks[0])
+            head_pose_data = head_pose_from_landmarks(points, image.shape[1], image.shape[0])
+
+        return num_faces, head_pose_data
+
+
+def landmarks_to_array(face_landmarks):
+    """Converts MediaPipe face landmarks to an (N, 3) array of normalized x, y, z."""
+    return np.array([(lm.x, lm.y, lm.z) for lm in face_landmarks.landmark], dtype=np.float64)
+
+
+# Left/right landmark pairs that head_pose_from_landmarks() uses (eye and mouth corners)
+MIRRORED_LANDMARKS = ((33, 263), (57, 287))
+
+def mirror_landmarks(points):
+    """
+    Converts an (N, 3) array of normalized FaceMesh landmarks of the unflipped
+    image to those FaceMesh gives for the horizontally flipped one: x is mirrored
+    and the left/right pairs head_pose_from_landmarks() uses swap labels.
+    """
+    mirrored = np.array(points, dtype=np.float64)
+    mirrored[:, 0] = 1.0 - mirrored[:, 0]
+    for left, right in MIRRORED_LANDMARKS:
+        mirrored[[left, right]] = mirrored[[right, left]]
+    return mirrored
+
+
+def head_pose_from_landmarks(points, width, height):
+    """
+    Estimates head pose from an (N, 3) array of normalized FaceMesh landmarks
+    of the horizontally flipped (selfie-view) image, as get_head_pose() uses.
+    Returns {"yaw", "pitch", "roll"}.
+    """
+    # 3D model points.
+    face_3d = np.array([
+        (0.0, 0.0, 0.0),            # Nose tip
+        (0.0, -330.0, -65.0),       # Chin
+        (-225.0, 170.0, -135.0),    # Left eye left corner
+        (225.0, 170.0, -135.0),     # Right eye right corner
+        (-150.0, -150.0, -125.0),   # Left Mouth corner
+        (150.0, -150.0, -125.0)     # Right mouth corner
+    ], dtype=np.float64)
+
+    # 2D image points: nose tip, chin, left eye left corner, right eye right corner, left and right mouth corners
+    face_2d = np.asarray(points, dtype=np.float64)[[1, 152, 263, 33, 287, 57], :2] * (width, height)
+
+    focal_length = width
+    center = (width/2, height/2)
+    camera_matrix = np.array(
+        [[focal_length, 0, center[0]],
+         [0, focal_length, center[1]],
+         [0, 0, 1]], dtype = "double"
+    )
+
+    dist_coeffs = np.zeros((4,1)) # Assuming no lens distortion
+    (success, rotation_vector, translation_vector) = cv2.solvePnP(face_3d, face_2d, camera_matrix, dist_coeffs, flags=cv2.SOLVEPNP_ITERATIVE)
+
+    # Convert rotation vector to rotation matrix
+    rotation_matrix, _ = cv2.Rodrigues(rotation_vector)
+    pose_mat = cv2.hconcat((rotation_matrix, translation_vector))
+    _, _, _, _, _, _, euler_angles = cv2.decomposeProjectionMatrix(pose_mat)
+
+    yaw = euler_angles[1, 0]
+    pitch = euler_angles[0, 0]
+    roll = euler_angles[2, 0]
+
+    return {"yaw": yaw, "pitch": pitch, "roll": roll}
@@ -0,0 +1,76 @@
+# proctor_ai/landmarks.py
+"""
+Compact face landmark payloads computed by clients (edge mode).
+
+Clients running FaceMesh in the browser send landmarks instead of images:
+
+    {"format": "float16" | "int16", "faces": 0-2, "points": 478 | 468,
+     "data": base64 of faces * points * 3 little-endian values}
+
+Values are FaceMesh's normalized x, y, z of the unflipped camera image.
+int16 values are the coordinates multiplied by INT16_SCALE.
+"""
+import base64
+import binascii
+
+import numpy as np
+
+INT16_SCALE = 10000
+MAX_FACES = 2
+# FaceMesh landmark counts with and without the refined iris landmarks
+POINT_COUNTS = (478, 468)
+# Normalized coordinates of a face in view stay close to [0, 1]
+COORDINATE_LIMIT = 2.0
+
+
+def decode_landmarks(payload):
+    """Validates a landmark payload and returns a (faces, points, 3) float32 array.
+
+    Raises ValueError describing what is wrong with the payload.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("Landmarks must be an object")
+    value_format = payload.get("format", "float16")
+    if value_format == "float16":
+        dtype = np.dtype("<f2")
+    elif value_format == "int16":
+        dtype = np.dtype("<i2")
+    else:
+        raise ValueError("Landmark format must be 'float16' or 'int16'")
+
+    faces = payload.get("faces")
+    points = payload.get("points", POINT_COUNTS[0])
+    if not isinstance(faces, int) or not 0 <= faces <= MAX_FACES:
+        raise ValueError(f"Landmark face count must be 0-{MAX_FACES}")
+    if points not in POINT_COUNTS:
+        raise ValueError(f"Landmark point count must be one of {POINT_COUNTS}")
+
+    try:
+        raw = base64.b64decode(payload.get("data") or "", validate=True)
+    except (binascii.Error, TypeError):
+        raise ValueError("Landmark data is not valid base64")
+    expected = faces * points * 3 * dtype.itemsize
+    if len(raw) != expected:
+        raise ValueError(f"Landmark data has {len(raw)} bytes, expected {expected}")
+
+    landmarks = np.frombuffer(raw, dtype=dtype).astype(np.float32).reshape(faces, points, 3)
+    if value_format == "int16":
+        landmarks /= INT16_SCALE
+    if not np.isfinite(landmarks).all() or (np.abs(landmarks) > COORDINATE_LIMIT).any():
+        raise ValueError("Landmark coordinates out of range")
+    return landmarks
+
+
+def encode_landmarks(landmarks, value_format="float16"):
+    """Packs a (faces, points, 3) array into a payload (the client side of decode_landmarks)."""
+    landmarks = np.asarray(landmarks, dtype=np.float32)
+    if value_format == "int16":
+        packed = np.round(landmarks * INT16_SCALE).astype("<i2")
+    else:
+        packed = landmarks.astype("<f2")
+    return {
+        "format": value_format,
+        "faces": int(landmarks.shape[0]),
+        "points": int(landmarks.shape[1]) if landmarks.ndim == 3 else POINT_COUNTS[0],
+        "data": base64.b64encode(packed.tobytes()).decode(),
+    }
@@ -0,0 +1,87 @@
+# proctor_ai/quality.py
+"""
+Quality ladder for frame analysis.
+
+Each tier is one detector/landmark configuration, from the most accurate
+(tier 0) to the cheapest. The ladder steps down when analysis latency is
+above the SLO or frames are backing up, and back up only after a longer run
+of comfortable observations, with a cooldown after every change so it
+doesn't flap between tiers.
+"""
+import os
+import time
+from dataclasses import dataclass
+
+ANALYSIS_LATENCY_SLO = float(os.getenv("ANALYSIS_LATENCY_SLO", 0.5))
+
+
+@dataclass(frozen=True)
+class QualityTier:
+    name: str
+    # YOLO input size (MobileNet-SSD always uses 300)
+    detector_size: int
+    # FaceMesh refine_landmarks (needed for iris landmarks)
+    refine_landmarks: bool
+    # Iris-based gaze estimation (a second FaceMesh pass)
+    iris: bool
+
+
+TIERS = (
+    QualityTier("full", 640, True, True),
+    QualityTier("high", 480, True, True),
+    QualityTier("medium", 320, True, True),
+    QualityTier("low", 320, False, False),
+)
+
+
+class QualityLadder:
+    """Picks the active tier from observed latency and backlog."""
+
+    def __init__(self, tiers=TIERS, latency_slo=ANALYSIS_LATENCY_SLO, down_after=3, up_after=20,
+                 up_ratio=0.6, cooldown=10.0):
+        self.tiers = tiers
+        self.latency_slo = latency_slo
+        # Consecutive bad (good) observations before stepping down (up)
+        self.down_after = down_after
+        self.up_after = up_after
+        # Stepping up needs latency below up_ratio * SLO, leaving headroom for the dearer tier
+        self.up_ratio = up_ratio
+        # Seconds after a change during which the tier is held
+        self.cooldown = cooldown
+        self.level = 0
+        self._bad = 0
+        self._good = 0
+        self._changed_at = float("-inf")
+
+    @property
+    def tier(self) -> QualityTier:
+        return self.tiers[self.level]
+
+    def observe(self, latency, backlogged=False):
+        """Feed one measurement (seconds per analysis, whether frames are queueing); returns the active tier."""
+        if latency > self.latency_slo or backlogged:
+            self._bad += 1
+            self._good = 0
+        elif latency < self.latency_slo * self.up_ratio:
+            self._good += 1
+            self._bad = 0
+        else:
+            self._bad = self._good = 0
+
+        now = time.monotonic()
+        if now - self._changed_at >= self.cooldown:
+            if self._bad >= self.down_after and self.level < len(self.tiers) - 1:
+                self._change(self.level + 1, now)
+            elif self._good >= self.up_after and self.level > 0:
+                self._change(self.level - 1, now)
+        return self.tier
+
+    def _change(self, level, now):
+        print(f"Analysis quality: {self.tier.name} -> {self.tiers[level].name}")
+        self.level = level
+        self._changed_at = now
+        self._bad = self._good = 0
+
+
+# Global ladder instance
+quality_ladder = QualityLadder()
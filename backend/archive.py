@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Cold-session archival.
+
+Moves the events and violations of old sessions out of the live SQLite file
+into one compressed NumPy archive per session and leaves a manifest row in
+archived_sessions behind. DatabaseManager.get_session_events() reads archived
+events back transparently.
+
+Usage:
+    python archive.py                      # archive sessions older than ARCHIVE_AFTER_DAYS
+    python archive.py --older-than-days 7
+    python archive.py --session <session_id>
+"""
+import argparse
+import os
+import sqlite3
+from functools import lru_cache
+
+import numpy as np
+
+from database import db, EVENT_COLUMNS, _event_from_row
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", 30))
+
+VIOLATION_COLUMNS = ('id', 'roll_no', 'violation_type', 'timestamp')
+
+# Storage of archived columns: ids stay int64, text is a unicode array ('' for NULL)
+# and everything else is float64 (NaN for NULL)
+_ID_COLUMNS = {'id'}
+_TEXT_COLUMNS = {'roll_no', 'violation_type', 'timestamp', 'gaze_direction', 'state', 'extra', 'raw_data'}
+_INT_COLUMNS = {'num_faces', 'phone_detected', 'device_bbox_x', 'device_bbox_y', 'device_bbox_w', 'device_bbox_h'}
+
+
+def _to_array(name, values):
+    """Convert one SQLite column into its archived NumPy array."""
+    if name in _ID_COLUMNS:
+        return np.array(values, dtype=np.int64)
+    if name in _TEXT_COLUMNS:
+        return np.array(['' if v is None else str(v) for v in values], dtype=str)
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+
+
+def _from_array_value(name, value):
+    """Convert one archived array element back to the value SQLite would return."""
+    if name in _ID_COLUMNS:
+        return int(value)
+    if name in _TEXT_COLUMNS:
+        return str(value) or None
+    if np.isnan(value):
+        return None
+    return int(value) if name in _INT_COLUMNS else float(value)
+
+
+@lru_cache(maxsize=8)
+def _load_archive(archive_path):
+    """Load a session archive (cached: admins tend to browse one session at a time)."""
+    with np.load(archive_path) as archive:
+        return {name: archive[name] for name in archive.files}
+
+
+def _event_columns(arrays, count):
+    """(name, array) for each of EVENT_COLUMNS; columns added after the archive was written read as NULL."""
+    return [(name, arrays[f"event_{name}"] if f"event_{name}" in arrays else np.full(count, np.nan))
+            for name in EVENT_COLUMNS]
+
+
+def _events_at(arrays, indices):
+    columns = _event_columns(arrays, len(arrays['event_roll_no']))
+    return [
+        _event_from_row(tuple(_from_array_value(name, values[i]) for name, values in columns))
+        for i in indices
+    ]
+
+
+def read_archived_events(archive_path, roll_no):
+    """Return a student's archived events in the same shape as live events."""
+    arrays = _load_archive(archive_path)
+    return _events_at(arrays, np.flatnonzero(arrays['event_roll_no'] == roll_no))
+
+
+def read_archived_events_page(archive_path, roll_no, after_id=0, limit=500, start=None, end=None):
+    """Up to `limit` of a student's archived events with id > after_id, oldest first.
+
+    Archives are written sorted by (roll_no, id), so the page is found by
+    binary search and only its rows become event dicts. start/end bound the
+    timestamp (inclusive, 'YYYY-MM-DD HH:MM:SS').
+    """
+    arrays = _load_archive(archive_path)
+    roll_nos = arrays['event_roll_no']
+    low = np.searchsorted(roll_nos, roll_no, side='left')
+    high = np.searchsorted(roll_nos, roll_no, side='right')
+    low += np.searchsorted(arrays['event_id'][low:high], after_id, side='right')
+    indices = np.arange(low, high)
+    if start is not None or end is not None:
+        timestamps = arrays['event_timestamp'][low:high]
+        mask = np.ones(len(indices), dtype=bool)
+        if start is not None:
+            mask &= timestamps >= start
+        if end is not None:
+            mask &= timestamps <= end
+        indices = indices[mask]
+    return _events_at(arrays, indices[:limit])
+
+
+def read_archived_columns(archive_path, roll_no, names):
+    """Return a student's archived event columns as raw arrays (NULL text is '', NULL numbers NaN)."""
+    arrays = _load_archive(archive_path)
+    mask = arrays['event_roll_no'] == roll_no
+    return {name: arrays[f"event_{name}"][mask] for name in names}
+
+
+def read_archived_violations(archive_path, roll_no=None):
+    """Return archived violations, optionally for one student only."""
+    arrays = _load_archive(archive_path)
+    indices = range(len(arrays['violation_id']))
+    if roll_no is not None:
+        indices = np.flatnonzero(arrays['violation_roll_no'] == roll_no)
+    return [
+        {name: _from_array_value(name, arrays[f"violation_{name}"][i]) for name in VIOLATION_COLUMNS}
+        for i in indices
+    ]
+
+
+class SessionArchiver:
+    """Moves cold sessions' events and violations into per-session .npz archives."""
+
+    def __init__(self, database=db, archive_dir=ARCHIVE_DIR, archive_after_days=ARCHIVE_AFTER_DAYS):
+        self.db_path = database.db_path
+        self.archive_dir = archive_dir
+        self.archive_after_days = archive_after_days
+
+    def find_cold_sessions(self):
+        """Sessions older than the retention age with no recent events that aren't archived yet."""
+        conn = sqlite3.connect(self.db_path)
+        cutoff = f"-{self.archive_after_days} days"
+        rows = conn.execute('''
+            SELECT s.session_id FROM sessions s
+            WHERE s.created_at < datetime('now', ?)
+              AND s.status IS NOT 'deleting'
+              AND s.session_id NOT IN (SELECT session_id FROM archived_sessions)
+              AND NOT EXISTS (
+                  SELECT 1 FROM events e
+                  WHERE e.session_id = s.session_id AND e.timestamp >= datetime('now', ?)
+              )
+            ORDER BY s.created_at ASC
+        ''', (cutoff, cutoff)).fetchall()
+        conn.close()
+        return [row[0] for row in rows]
+
+    def archive_session(self, session_id):
+        """Archive one session. Returns its manifest entry, or None if nothing was done."""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        archive_path = os.path.join(self.archive_dir, f"{session_id}.npz")
+        tmp_path = archive_path + ".tmp"
+
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        cursor = conn.cursor()
+        try:
+            # Hold the write lock so no event can slip in between copy and delete
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('SELECT 1 FROM archived_sessions WHERE session_id = ?', (session_id,))
+            if cursor.fetchone():
+                cursor.execute('ROLLBACK')
+                return None
+
+            cursor.execute(f'''
+                SELECT roll_no, {', '.join(EVENT_COLUMNS)} FROM events
+                WHERE session_id = ? ORDER BY roll_no, id
+            ''', (session_id,))
+            event_rows = cursor.fetchall()
+            cursor.execute(f'''
+                SELECT {', '.join(VIOLATION_COLUMNS)} FROM violations
+                WHERE session_id = ? ORDER BY id
+            ''', (session_id,))
+            violation_rows = cursor.fetchall()
+
+            arrays = {}
+            for i, name in enumerate(('roll_no',) + EVENT_COLUMNS):
+                arrays[f"event_{name}"] = _to_array(name, [row[i] for row in event_rows])
+            for i, name in enumerate(VIOLATION_COLUMNS):
+                arrays[f"violation_{name}"] = _to_array(name, [row[i] for row in violation_rows])
+
+            with open(tmp_path, 'wb') as f:
+                np.savez_compressed(f, **arrays)
+            os.replace(tmp_path, archive_path)
+
+            manifest = {
+                'session_id': session_id,
+                'archive_path': archive_path,
+                'event_count': len(event_rows),
+                'violation_count': len(violation_rows),
+                'archive_bytes': os.path.getsize(archive_path),
+            }
+            cursor.execute('''
+                INSERT INTO archived_sessions (session_id, archive_path, event_count, violation_count, archive_bytes)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (session_id, archive_path, manifest['event_count'], manifest['violation_count'],
+                  manifest['archive_bytes']))
+            cursor.execute('DELETE FROM events WHERE session_id = ?', (session_id,))
+            cursor.execute('DELETE FROM violations WHERE session_id = ?', (session_id,))
+            cursor.execute('COMMIT')
+            return manifest
+        except Exception:
+            if conn.in_transaction:
+                cursor.execute('ROLLBACK')
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        finally:
+            conn.close()
+
+    def archive_cold_sessions(self):
+        """Archive every cold session, then reclaim the freed pages."""
+        archived = []
+        for session_id in self.find_cold_sessions():
+            try:
+                manifest = self.archive_session(session_id)
+                if manifest:
+                    archived.append(manifest)
+            except Exception as e:
+                print(f"Error archiving session {session_id}: {e}")
+        if archived:
+            self.reclaim_space()
+        return archived
+
+    def reclaim_space(self):
+        """Return free pages to the filesystem with an incremental vacuum."""
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        try:
+            if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+                # Database created before incremental auto-vacuum: convert it once
+                conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                conn.execute('VACUUM')
+            else:
+                conn.execute('PRAGMA incremental_vacuum').fetchall()
+        finally:
+            conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive cold proctoring sessions")
+    parser.add_argument("--older-than-days", type=float, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR)
+    parser.add_argument("--session", help="Archive this session regardless of age")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the sessions that would be archived")
+    args = parser.parse_args()
+
+    archiver = SessionArchiver(db, args.archive_dir, args.older_than_days)
+
+    if args.dry_run:
+        for session_id in archiver.find_cold_sessions():
+            print(f"  - {session_id}")
+        return
+
+    if args.session:
+        manifest = archiver.archive_session(args.session)
+        archived = [manifest] if manifest else []
+        if archived:
+            archiver.reclaim_space()
+    else:
+        archived = archiver.archive_cold_sessions()
+
+    for manifest in archived:
+        print(f"✓ {manifest['session_id']}: {manifest['event_count']} events, "
+              f"{manifest['violation_count']} violations -> {manifest['archive_path']} "
+              f"({manifest['archive_bytes'] / 1e3:.1f} kB)")
+    print(f"\nArchived {len(archived)} session(s)")
+
+
+if __name__ == "__main__":
+    main()
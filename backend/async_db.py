@@ -0,0 +1,86 @@
+"""
+Async facades for DatabaseManager and AuthManager.
+
+The managers use blocking sqlite3 calls. The facades run those calls on
+dedicated worker threads, so FastAPI handlers can `await` database work
+without stalling the event loop (and every websocket on it). The sync
+managers stay available for scripts such as check_db.py.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from database import db, DatabaseManager
+from auth import auth_manager, AuthManager
+
+
+class AsyncFacade:
+    """Exposes every public method of `target` as a coroutine run on `executor`."""
+
+    def __init__(self, target, executor: ThreadPoolExecutor):
+        self._target = target
+        self._executor = executor
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(attr, *args, **kwargs))
+
+        # Cache the wrapper so later lookups skip __getattr__
+        setattr(self, name, call)
+        return call
+
+    @property
+    def sync(self):
+        """The wrapped synchronous manager."""
+        return self._target
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker thread once queued calls have finished."""
+        self._executor.shutdown(wait=wait)
+
+
+class AsyncDatabaseManager(AsyncFacade):
+    """Awaitable mirror of DatabaseManager.
+
+    All calls share one DB thread: SQLite allows a single writer at a time,
+    so serialising here avoids 'database is locked' retries.
+    """
+
+    def __init__(self, manager: DatabaseManager = db, executor: ThreadPoolExecutor = None):
+        super().__init__(manager, executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="db"))
+
+    async def iter_session_events(self, session_id, roll_no, after_id=0, start=None, end=None, page_size=500):
+        """Yield a student's events oldest first, reading one keyset page at a time.
+
+        Pages follow the event ids, so events inserted meanwhile never make it
+        skip or repeat one.
+        """
+        while True:
+            page = await self.get_session_events_page(session_id, roll_no, after_id, page_size, start, end)
+            for event in page:
+                yield event
+            if len(page) < page_size:
+                return
+            after_id = page[-1]["id"]
+
+
+class AsyncAuthManager(AsyncFacade):
+    """Awaitable mirror of AuthManager.
+
+    Runs on its own thread because signup and OTP resend wait on SMTP, which
+    must not hold up frame and violation writes.
+    """
+
+    def __init__(self, manager: AuthManager = auth_manager, executor: ThreadPoolExecutor = None):
+        super().__init__(manager, executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="auth"))
+
+
+# Global async instances
+async_db = AsyncDatabaseManager(db)
+async_auth_manager = AsyncAuthManager(auth_manager)
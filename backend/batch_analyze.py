@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Offline analysis of a directory of recorded exam videos.
+
+Reader threads decode the videos, one video per thread at a time, sampling
+one frame every --interval seconds of video time (grab() skips the frames in
+between, as in replay.py). The sampled frames fan out to a process pool
+running the detection half of analyze_frame (frame_features), so the pool
+works on frames of all videos at once. Each reader scores its video's frames
+in order with a fresh AttentionScorer as the results come back, so the events
+are the same as replay.py's.
+
+For each video <name>, the output directory gets:
+    <name>.events.ndjson   one analyze_frame() result per sampled frame, with its "timestamp"
+    <name>.summary.json    StudentStats summary, written last: marks the video as done
+
+Re-running with the same output directory resumes: finished videos are
+skipped, and an interrupted video continues after its last complete event
+(its scorer and stats are rebuilt from the events already written).
+
+Usage:
+    python batch_analyze.py recordings/ --out analysis/ --workers 8
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import cv2
+
+from app.analyze_frame import frame_features, score_features, create_attention_scorer
+from app.quality import TIERS
+from replay import sample_video, DEFAULT_INTERVAL
+from session_stats import StudentStats
+
+VIDEO_EXTENSIONS = (".mp4", ".webm", ".avi", ".mkv", ".mov")
+
+_TIERS_BY_NAME = {tier.name: tier for tier in TIERS}
+
+
+def find_videos(directory):
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.lower().endswith(VIDEO_EXTENSIONS))
+
+
+def output_paths(path, out_dir):
+    """(events path, summary path) of a video."""
+    name = os.path.basename(path)
+    return os.path.join(out_dir, name + ".events.ndjson"), os.path.join(out_dir, name + ".summary.json")
+
+
+def load_progress(events_path, scorer, stats):
+    """Feeds the events of an interrupted run to scorer and stats; returns how many there are.
+
+    A partial last line (the run was killed while writing it) is cut off.
+    """
+    if not os.path.exists(events_path):
+        return 0
+    count = 0
+    complete = 0
+    with open(events_path, "rb+") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                event = json.loads(line)
+            except ValueError:
+                break
+            timestamp = event.pop("timestamp")
+            scorer.calculate_attention_score(event["head_pose"], event["gaze"], event["device"],
+                                             event["num_faces"], timestamp)
+            stats.update(event, timestamp)
+            count += 1
+            complete += len(line)
+        f.truncate(complete)
+    return count
+
+
+def _init_worker():
+    # One worker per core: keep OpenCV from starting a thread pool in each
+    cv2.setNumThreads(1)
+
+
+def analyze_video(path, executor, out_dir, interval=DEFAULT_INTERVAL, tier=TIERS[0], window=4):
+    """Analyse one video on the pool, at most `window` frames in flight; returns its summary."""
+    events_path, summary_path = output_paths(path, out_dir)
+    if os.path.exists(summary_path):
+        with open(summary_path, encoding="utf-8") as f:
+            return {**json.load(f), "skipped": True}
+
+    started = time.monotonic()
+    scorer = create_attention_scorer()
+    stats = StudentStats()
+    # Resuming continues the sampling grid: the n-th sample is the first frame at n * interval
+    resumed = load_progress(events_path, scorer, stats)
+    pending = deque()
+    with open(events_path, "a", encoding="utf-8") as out:
+        def score_oldest():
+            timestamp, future = pending.popleft()
+            result = score_features(future.result(), scorer, timestamp)
+            stats.update(result, timestamp)
+            out.write(json.dumps({"timestamp": timestamp, **result}, default=float) + "\n")
+
+        for timestamp, frame in sample_video(path, interval, start=resumed * interval):
+            pending.append((timestamp, executor.submit(frame_features, frame, tier)))
+            if len(pending) >= window:
+                score_oldest()
+        while pending:
+            score_oldest()
+
+    summary = {"source": path, "frames": stats.total_events, "resumed_from": resumed, "interval": interval,
+               "quality_tier": tier.name, "elapsed": round(time.monotonic() - started, 2), **stats.results()}
+    partial = summary_path + ".tmp"
+    with open(partial, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    os.replace(partial, summary_path)
+    return summary
+
+
+def analyze_directory(directory, out_dir, workers=None, readers=None, interval=DEFAULT_INTERVAL, tier=TIERS[0]):
+    """Analyse every video in a directory; returns their summaries (or {"source", "error"}) in name order."""
+    videos = find_videos(directory)
+    if not videos:
+        return []
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    readers = readers or min(len(videos), workers)
+    # Enough frames in flight across the readers to keep every worker busy
+    window = max(2, -(-2 * workers // readers))
+
+    # Workers are spawned, not forked: the readers are already running threads when the pool grows
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker) as executor:
+        def run(path):
+            try:
+                return analyze_video(path, executor, out_dir, interval, tier, window)
+            except Exception as e:
+                return {"source": path, "error": str(e)}
+
+        with ThreadPoolExecutor(max_workers=readers, thread_name_prefix="video-reader") as reader_pool:
+            return list(reader_pool.map(run, videos))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyse a directory of recorded exam videos")
+    parser.add_argument("directory", help="Directory of videos")
+    parser.add_argument("--out", help="Output directory (default: <directory>/analysis)")
+    parser.add_argument("--workers", type=int, default=None, help="Analysis processes (default: CPU count)")
+    parser.add_argument("--readers", type=int, default=None,
+                        help="Decoding threads, one video each (default: min(videos, workers))")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL,
+                        help="Seconds of video between analysed frames (default: 1.0, the live capture rate)")
+    parser.add_argument("--tier", choices=list(_TIERS_BY_NAME), default=TIERS[0].name, help="Analysis quality tier")
+    args = parser.parse_args()
+
+    started = time.monotonic()
+    summaries = analyze_directory(args.directory, args.out or os.path.join(args.directory, "analysis"),
+                                  args.workers, args.readers, args.interval, _TIERS_BY_NAME[args.tier])
+    if not summaries:
+        parser.error(f"no videos ({', '.join(VIDEO_EXTENSIONS)}) in {args.directory}")
+
+    analysed = 0
+    for summary in summaries:
+        if "error" in summary:
+            print(f"{summary['source']}: failed: {summary['error']}")
+            continue
+        note = " (already done)" if summary.get("skipped") else (
+            f" (resumed after {summary['resumed_from']})" if summary["resumed_from"] else "")
+        if not summary.get("skipped"):
+            analysed += summary["frames"] - summary["resumed_from"]
+        print(f"{summary['source']}: {summary['frames']} frames{note}, "
+              f"average attention {summary['average_attention_score']:.2f}, states {summary['state_counts']}")
+    elapsed = time.monotonic() - started
+    print(f"Analysed {analysed} frames in {elapsed:.1f} s ({analysed / max(elapsed, 1e-9):.1f} frames/s)")
+
+
+if __name__ == "__main__":
+    main()
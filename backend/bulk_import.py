@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Bulk roster and question bank import.
+
+Parses a roster CSV (one roll number per row, header optional) and a question
+bank in JSON or CSV, validates every row, and inserts the valid rows in a
+single transaction. Invalid rows are reported with their row number instead
+of aborting the whole import.
+
+Question bank CSV columns:
+    question_text, question_type, points, options, correct
+where options are separated by "|" and correct lists the 1-based indices of
+the correct options, also separated by "|" (e.g. "2" or "1|3").
+
+Question bank JSON is a list of questions (or {"questions": [...]}):
+    {"question_text": ..., "question_type": "mcq", "points": 2,
+     "options": [{"option_text": ..., "is_correct": true}, ...]}
+
+Usage:
+    python bulk_import.py <session_id> --roster students.csv
+    python bulk_import.py <session_id> --questions bank.json
+
+The CLI writes straight to the database and does not notify running servers.
+A server that already served the session's questions keeps serving them from
+its exam cache until it restarts; while it runs, import through
+POST /api/session/<session_id>/import/questions instead.
+"""
+import argparse
+import csv
+import json
+import re
+
+from database import db
+
+ROLL_NO_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_\-./]{0,63}$')
+ROLL_NO_HEADERS = ('roll_no', 'roll', 'roll_number', 'rollno')
+QUESTION_TYPES = ('mcq', 'essay')
+OPTION_SEPARATOR = '|'
+MAX_IMPORT_ROWS = 10000
+
+
+def parse_roster(lines):
+    """Parse roster CSV lines into (roll_nos, errors).
+
+    Uses the `roll_no` column if the file has a header, otherwise the first
+    column. Blank lines are skipped; rows are numbered as in the file.
+    """
+    roll_nos, errors = [], []
+    seen = {}
+    column = 0
+    first_row = True
+    for row_number, row in enumerate(csv.reader(lines), start=1):
+        if not row or not any(cell.strip() for cell in row):
+            continue
+        if first_row:
+            first_row = False
+            header = [cell.strip().lower() for cell in row]
+            matches = [i for i, name in enumerate(header) if name in ROLL_NO_HEADERS]
+            if matches:
+                column = matches[0]
+                continue
+        if len(roll_nos) + len(errors) >= MAX_IMPORT_ROWS:
+            errors.append({'row': row_number, 'message': f"Too many rows (limit {MAX_IMPORT_ROWS})"})
+            break
+
+        roll_no = row[column].strip() if column < len(row) else ''
+        if not roll_no:
+            errors.append({'row': row_number, 'message': "Missing roll number"})
+        elif not ROLL_NO_PATTERN.match(roll_no):
+            errors.append({'row': row_number, 'message': f"Invalid roll number '{roll_no}'"})
+        elif roll_no in seen:
+            errors.append({'row': row_number, 'message': f"Duplicate roll number '{roll_no}' (first on row {seen[roll_no]})"})
+        else:
+            seen[roll_no] = row_number
+            roll_nos.append(roll_no)
+    return roll_nos, errors
+
+
+def _order_index(value, default):
+    """An order_index from a question bank: an integer, or the default when missing."""
+    if value is None:
+        return default
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"Invalid order_index '{value}' (must be an integer)")
+    return value
+
+
+def _is_correct(value):
+    """An option's is_correct flag: true/false or 1/0 (missing means false)."""
+    if value is None:
+        return False
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    raise ValueError(f"Invalid is_correct '{value}' (must be true, false, 1 or 0)")
+
+
+def _validate_question(raw):
+    """Normalise one question dict, raising ValueError with a readable message."""
+    if not isinstance(raw, dict):
+        raise ValueError("Question must be an object")
+    question_text = str(raw.get('question_text') or '').strip()
+    question_type = str(raw.get('question_type') or '').strip().lower()
+    if not question_text or not question_type:
+        raise ValueError("Question text and type are required")
+    if question_type not in QUESTION_TYPES:
+        raise ValueError("Question type must be 'mcq' or 'essay'")
+
+    points = raw.get('points', 1)
+    try:
+        points = int(points) if points not in (None, '') else 1
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid points '{points}'")
+    if points < 0:
+        raise ValueError("Points must not be negative")
+
+    options = []
+    for i, option in enumerate(raw.get('options') or []):
+        if isinstance(option, str):
+            option = {'option_text': option}
+        option_text = str(option.get('option_text') or '').strip() if isinstance(option, dict) else ''
+        if not option_text:
+            raise ValueError(f"Option {i + 1} has no text")
+        try:
+            options.append({
+                'option_text': option_text,
+                'is_correct': _is_correct(option.get('is_correct')),
+                'order_index': _order_index(option.get('order_index'), i),
+            })
+        except ValueError as e:
+            raise ValueError(f"Option {i + 1}: {e}")
+    if question_type == 'mcq':
+        if len(options) < 2:
+            raise ValueError("MCQ questions need at least two options")
+        if not any(option['is_correct'] for option in options):
+            raise ValueError("MCQ questions need at least one correct option")
+    elif options:
+        raise ValueError("Essay questions cannot have options")
+
+    return {
+        'question_text': question_text,
+        'question_type': question_type,
+        'points': points,
+        'order_index': _order_index(raw.get('order_index'), None),
+        'options': options,
+    }
+
+
+def _question_from_csv_row(row):
+    """Turn a question bank CSV row into a question dict (options not yet validated)."""
+    texts = [text.strip() for text in (row.get('options') or '').split(OPTION_SEPARATOR) if text.strip()]
+    correct = set()
+    for index in (row.get('correct') or '').split(OPTION_SEPARATOR):
+        if index.strip():
+            try:
+                correct.add(int(index) - 1)
+            except ValueError:
+                raise ValueError(f"Invalid correct option index '{index.strip()}'")
+    if any(i < 0 or i >= len(texts) for i in correct):
+        raise ValueError("Correct option index out of range")
+    question = {key: row.get(key) for key in ('question_text', 'question_type', 'points') if row.get(key)}
+    question['options'] = [{'option_text': text, 'is_correct': i in correct} for i, text in enumerate(texts)]
+    return question
+
+
+def parse_question_bank(lines, file_format='json'):
+    """Parse a JSON or CSV question bank into (questions, errors).
+
+    For JSON, rows are numbered from 1 in list order; for CSV they are file
+    line numbers (the header is line 1).
+    """
+    questions, errors = [], []
+    if file_format == 'json':
+        try:
+            data = json.loads(''.join(lines))
+        except ValueError as e:
+            return [], [{'row': 0, 'message': f"Invalid JSON: {e}"}]
+        if isinstance(data, dict):
+            data = data.get('questions')
+        if not isinstance(data, list):
+            return [], [{'row': 0, 'message': "Expected a list of questions"}]
+        rows = enumerate(data, start=1)
+    elif file_format == 'csv':
+        reader = csv.DictReader(lines)
+        if not reader.fieldnames or 'question_text' not in [name.strip() for name in reader.fieldnames]:
+            return [], [{'row': 1, 'message': "CSV header must include question_text"}]
+        reader.fieldnames = [name.strip() for name in reader.fieldnames]
+        rows = ((reader.line_num, row) for row in reader if any((value or '').strip() for value in row.values()))
+    else:
+        return [], [{'row': 0, 'message': f"Unsupported format '{file_format}'"}]
+
+    for row_number, raw in rows:
+        if len(questions) + len(errors) >= MAX_IMPORT_ROWS:
+            errors.append({'row': row_number, 'message': f"Too many rows (limit {MAX_IMPORT_ROWS})"})
+            break
+        try:
+            if file_format == 'csv':
+                raw = _question_from_csv_row(raw)
+            questions.append(_validate_question(raw))
+        except ValueError as e:
+            errors.append({'row': row_number, 'message': str(e)})
+    return questions, errors
+
+
+def roster_report(result, errors):
+    """Combine add_students_bulk()'s result with the parse errors."""
+    if 'error' in result:
+        errors.append({'row': 0, 'message': f"Database error: {result['error']}"})
+    for roll_no in result['skipped']:
+        errors.append({'row': 0, 'message': f"Roll number '{roll_no}' is already in the session"})
+    return {'inserted': result['inserted'], 'errors': errors}
+
+
+def question_bank_report(questions, question_ids, errors):
+    """Combine add_questions_bulk()'s result with the parse errors."""
+    if questions and not question_ids:
+        errors.append({'row': 0, 'message': "Database error: no questions were added"})
+    return {'question_ids': question_ids, 'errors': errors}
+
+
+def import_roster(session_id, lines, database=db):
+    """Validate a roster and add its students to a session. Returns an import report."""
+    roll_nos, errors = parse_roster(lines)
+    result = database.add_students_bulk(session_id, roll_nos) if roll_nos else {'inserted': [], 'skipped': []}
+    return roster_report(result, errors)
+
+
+def import_question_bank(session_id, lines, file_format='json', database=db):
+    """Validate a question bank and add its questions to a session. Returns an import report."""
+    questions, errors = parse_question_bank(lines, file_format)
+    question_ids = database.add_questions_bulk(session_id, questions) if questions else []
+    return question_bank_report(questions, question_ids, errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Bulk import a roster or question bank into a session",
+        epilog="Running servers are not notified: restart them after importing questions, or import "
+               "through POST /api/session/<session_id>/import/questions while they run.")
+    parser.add_argument("session_id")
+    parser.add_argument("--roster", help="CSV file with one roll number per row")
+    parser.add_argument("--questions", help="Question bank file (.json or .csv)")
+    parser.add_argument("--format", choices=('json', 'csv'), help="Question bank format (default: from extension)")
+    args = parser.parse_args()
+
+    if not args.roster and not args.questions:
+        parser.error("nothing to import: pass --roster and/or --questions")
+    if not db.get_session_data(args.session_id):
+        parser.error(f"session {args.session_id} not found")
+
+    reports = []
+    if args.roster:
+        with open(args.roster, newline='', encoding='utf-8-sig') as f:
+            report = import_roster(args.session_id, f)
+        print(f"✓ Added {len(report['inserted'])} students")
+        reports.append(report)
+    if args.questions:
+        file_format = args.format or ('csv' if args.questions.lower().endswith('.csv') else 'json')
+        with open(args.questions, newline='', encoding='utf-8-sig') as f:
+            report = import_question_bank(args.session_id, f, file_format)
+        print(f"✓ Added {len(report['question_ids'])} questions")
+        reports.append(report)
+
+    for report in reports:
+        for error in report['errors']:
+            print(f"  ✗ row {error['row']}: {error['message']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Pub/sub bus between backend workers.
+
+With a single uvicorn worker the in-process LocalBus is enough. To run
+several workers on one box, point PROCTOR_BUS_URL at a Redis server, or at the
+small Redis-protocol stand-in this module can serve itself:
+
+    python bus.py serve unix:///tmp/proctor-bus.sock
+    PROCTOR_BUS_URL=unix:///tmp/proctor-bus.sock uvicorn main:app --workers 4
+
+Messages are JSON objects published on one channel. Every worker receives
+each of them; the publisher's own handlers run before publish() returns.
+
+Attention scorers stay per worker: each smooths only the frames its worker
+analyzed, so live attention scores are exact only with a single worker (the
+stored events can be rescored exactly with /api/session/{id}/rescore).
+"""
+import argparse
+import asyncio
+import json
+import os
+import uuid
+from abc import ABC, abstractmethod
+from urllib.parse import urlparse
+
+PROCTOR_BUS_URL = os.getenv("PROCTOR_BUS_URL", "")
+BUS_CHANNEL = "proctor"
+RECONNECT_DELAY = 1.0
+
+
+class BusError(Exception):
+    """Error reply from the bus server."""
+
+
+class Bus(ABC):
+    """Interface shared by the bus backends."""
+
+    # True when other processes may publish through this bus
+    distributed = False
+
+    def __init__(self):
+        self._handlers = []
+        self.origin = uuid.uuid4().hex
+
+    def subscribe(self, handler):
+        """Call `await handler(message)` for every message published on the bus."""
+        self._handlers.append(handler)
+
+    async def _dispatch(self, message):
+        for handler in self._handlers:
+            try:
+                await handler(message)
+            except Exception as e:
+                print(f"Error handling bus message {message.get('type')}: {e}")
+
+    async def start(self):
+        """Connect (if needed) and start delivering messages."""
+
+    async def close(self):
+        """Disconnect."""
+
+    @abstractmethod
+    async def publish(self, message: dict):
+        """Send a message to every worker's handlers (this worker's run before returning)."""
+
+
+class LocalBus(Bus):
+    """In-process bus: messages go straight to this process's handlers."""
+
+    async def publish(self, message):
+        await self._dispatch(message)
+
+
+# --- Redis protocol (RESP2) ---
+
+def _encode_command(*args):
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+def _encode_reply(value):
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, BusError):
+        return f"-{value}\r\n".encode()
+    if isinstance(value, bool):
+        return b":%d\r\n" % value
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, list):
+        return f"*{len(value)}\r\n".encode() + b"".join(_encode_reply(item) for item in value)
+    data = value if isinstance(value, bytes) else str(value).encode()
+    return b"$%d\r\n%s\r\n" % (len(data), data)
+
+
+async def _read_reply(reader):
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("bus connection closed")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest.decode()
+    if kind == b"-":
+        return BusError(rest.decode())
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        length = int(rest)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2].decode()
+    if kind == b"*":
+        length = int(rest)
+        if length < 0:
+            return None
+        return [await _read_reply(reader) for _ in range(length)]
+    raise BusError(f"unexpected reply {line!r}")
+
+
+async def _open(url):
+    parsed = urlparse(url)
+    if parsed.scheme == "unix":
+        return await asyncio.open_unix_connection(parsed.path)
+    return await asyncio.open_connection(parsed.hostname or "localhost", parsed.port or 6379)
+
+
+class RespBus(Bus):
+    """Bus over the Redis protocol: a Redis server, or the stand-in from BusServer.
+
+    Uses one connection for commands and one for the subscription.
+    """
+
+    distributed = True
+
+    def __init__(self, url):
+        super().__init__()
+        self.url = url
+        parsed = urlparse(url)
+        self._db = int(parsed.path.lstrip("/") or 0) if parsed.scheme == "redis" else 0
+        self._reader = self._writer = None
+        self._lock = asyncio.Lock()
+        self._subscriber = None
+        self._subscribed = None
+
+    async def start(self):
+        if self._subscriber is None:
+            self._subscribed = asyncio.get_running_loop().create_future()
+            self._subscriber = asyncio.create_task(self._listen())
+            await self._subscribed
+
+    async def close(self):
+        if self._subscriber is not None:
+            self._subscriber.cancel()
+            self._subscriber = None
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+    async def _command(self, *args):
+        async with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._writer is None:
+                        self._reader, self._writer = await _open(self.url)
+                        if self._db:
+                            self._writer.write(_encode_command("SELECT", self._db))
+                            await _read_reply(self._reader)
+                    self._writer.write(_encode_command(*args))
+                    await self._writer.drain()
+                    reply = await _read_reply(self._reader)
+                    break
+                except (ConnectionError, OSError, asyncio.IncompleteReadError):
+                    # Reconnect once (the server may have restarted)
+                    self._reader = self._writer = None
+                    if attempt:
+                        raise
+        if isinstance(reply, BusError):
+            raise reply
+        return reply
+
+    async def _listen(self):
+        while True:
+            writer = None
+            try:
+                reader, writer = await _open(self.url)
+                writer.write(_encode_command("SUBSCRIBE", BUS_CHANNEL))
+                await writer.drain()
+                while True:
+                    reply = await _read_reply(reader)
+                    if not isinstance(reply, list) or not reply:
+                        continue
+                    if reply[0] == "subscribe" and not self._subscribed.done():
+                        self._subscribed.set_result(True)
+                    elif reply[0] == "message":
+                        message = json.loads(reply[2])
+                        # Our own messages were handled when they were published
+                        if message.pop("origin", None) != self.origin:
+                            await self._dispatch(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Bus subscription lost ({e}); reconnecting")
+                await asyncio.sleep(RECONNECT_DELAY)
+            finally:
+                if writer is not None:
+                    writer.close()
+
+    async def publish(self, message):
+        await self._dispatch(message)
+        await self._command("PUBLISH", BUS_CHANNEL, json.dumps({**message, "origin": self.origin}))
+
+
+class BusServer:
+    """Minimal Redis-protocol server for the commands RespBus uses.
+
+    Lets several workers on one box share a bus without installing Redis;
+    also serves tests.
+    """
+
+    def __init__(self):
+        self._channels = {}
+        self._connections = set()
+        self._server = None
+
+    async def start(self, url):
+        parsed = urlparse(url)
+        if parsed.scheme == "unix":
+            if os.path.exists(parsed.path):
+                os.remove(parsed.path)
+            self._server = await asyncio.start_unix_server(self._serve, parsed.path)
+        else:
+            self._server = await asyncio.start_server(self._serve, parsed.hostname or "127.0.0.1",
+                                                      parsed.port or 6379)
+        return self
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._connections):
+                writer.close()
+            await self._server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        self._connections.add(writer)
+        try:
+            while True:
+                request = await _read_reply(reader)
+                if not isinstance(request, list) or not request:
+                    writer.write(_encode_reply(BusError("ERR expected a command array")))
+                    continue
+                writer.write(_encode_reply(self._execute(request[0].upper(), request[1:], writer)))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # Shutting down; asyncio's stream callback logs cancelled handlers as errors
+            pass
+        finally:
+            self._connections.discard(writer)
+            for subscribers in self._channels.values():
+                subscribers.discard(writer)
+            writer.close()
+
+    def _execute(self, command, args, writer):
+        if command == "PING":
+            return "PONG"
+        if command == "SELECT":
+            return "OK"
+        if command == "SUBSCRIBE":
+            # Reply frames for every channel; the last one is returned normally
+            for i, channel in enumerate(args):
+                self._channels.setdefault(channel, set()).add(writer)
+                if i < len(args) - 1:
+                    writer.write(_encode_reply(["subscribe", channel, i + 1]))
+            return ["subscribe", args[-1], len(args)]
+        if command == "PUBLISH":
+            channel, message = args
+            subscribers = list(self._channels.get(channel, ()))
+            for subscriber in subscribers:
+                subscriber.write(_encode_reply(["message", channel, message]))
+            return len(subscribers)
+        return BusError(f"ERR unknown command '{command}'")
+
+
+def create_bus(url=PROCTOR_BUS_URL) -> Bus:
+    """LocalBus when url is empty or 'local', otherwise a RespBus (redis:// or unix://)."""
+    if not url or url == "local":
+        return LocalBus()
+    if urlparse(url).scheme not in ("redis", "unix"):
+        raise ValueError(f"Unsupported PROCTOR_BUS_URL '{url}' (use redis://host:port or unix:///path)")
+    return RespBus(url)
+
+
+# Global bus instance
+bus = create_bus()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local bus for multi-worker deployments")
+    parser.add_argument("command", choices=["serve"])
+    parser.add_argument("url", help="unix:///path/to.sock or redis://127.0.0.1:6380")
+    args = parser.parse_args()
+
+    async def serve():
+        server = await BusServer().start(args.url)
+        print(f"Bus listening on {args.url}")
+        await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import sqlite3
+from database import db
 
 def check_database():
     """Check database structure and data."""
@@ -33,6 +34,17 @@ def check_database():
         violation_count = cursor.fetchone()[0]
         print(f"\nTotal violations: {violation_count}")
         
+        # Check violation counters against the raw violations
+        mismatches = db.check_violation_counts()
+        if mismatches:
+            print(f"\nViolation counters out of sync ({len(mismatches)}):")
+            for m in mismatches[:10]:
+                print(f"  - {m['session_id'][:8]}... | {m['roll_no']} | {m['violation_type']}: "
+                      f"stored {m['stored_count']}, actual {m['actual_count']}")
+            print("  Run db.check_violation_counts(repair=True) to rebuild them.")
+        else:
+            print("\nViolation counters: in sync")
+        
     except Exception as e:
         print(f"Error: {e}")
     finally:
@@ -1,8 +1,189 @@
 import sqlite3
 import json
+import os
 from datetime import datetime
 from typing import Dict, List, Optional
 import uuid
+from session_stats import StudentStats, MAX_FRAME_GAP, DISTRACTED_STATES
+
+# Columns added to the events table for the compact (typed) storage format
+EVENT_EXTRA_COLUMNS = [
+    ('head_pose_roll', 'REAL'),
+    ('gaze_direction', 'TEXT'),
+    ('gaze_confidence', 'REAL'),
+    ('device_confidence', 'REAL'),
+    ('device_bbox_x', 'INTEGER'),
+    ('device_bbox_y', 'INTEGER'),
+    ('device_bbox_w', 'INTEGER'),
+    ('device_bbox_h', 'INTEGER'),
+    ('extra', 'TEXT'),
+    ('captured_at', 'REAL'),
+]
+
+# Columns written by _pack_event(), in order
+PACKED_EVENT_COLUMNS = (
+    'num_faces', 'head_pose_yaw', 'head_pose_pitch', 'head_pose_roll',
+    'gaze_direction', 'gaze_confidence', 'phone_detected', 'device_confidence',
+    'device_bbox_x', 'device_bbox_y', 'device_bbox_w', 'device_bbox_h',
+    'attention_score', 'state', 'captured_at', 'extra'
+)
+
+# Columns read back by _event_from_row(), in order
+EVENT_COLUMNS = ('id', 'timestamp') + PACKED_EVENT_COLUMNS + ('raw_data',)
+
+_ANALYSIS_KEYS = ('num_faces', 'head_pose', 'gaze', 'device', 'attention_score', 'state', 'captured_at')
+
+
+def _pack_event(analysis_data: Dict) -> tuple:
+    """Flatten an analyze_frame() result into PACKED_EVENT_COLUMNS values."""
+    head_pose = analysis_data.get('head_pose')
+    gaze = analysis_data.get('gaze')
+    device = analysis_data.get('device')
+    bbox = device.get('bbox') if device else None
+    extra = {key: value for key, value in analysis_data.items() if key not in _ANALYSIS_KEYS}
+    
+    return (
+        int(analysis_data.get('num_faces', 0)),
+        float(head_pose['yaw']) if head_pose else None,
+        float(head_pose['pitch']) if head_pose else None,
+        float(head_pose.get('roll', 0)) if head_pose else None,
+        gaze.get('direction') if gaze else None,
+        float(gaze.get('confidence', 0)) if gaze else None,
+        bool(device.get('phone_detected', False)) if device else None,
+        float(device.get('confidence', 0)) if device else None,
+        *((int(v) for v in bbox) if bbox else (None, None, None, None)),
+        float(analysis_data.get('attention_score', 0)),
+        analysis_data.get('state', 'unknown'),
+        float(analysis_data['captured_at']) if analysis_data.get('captured_at') is not None else None,
+        json.dumps(extra, default=str) if extra else None
+    )
+
+
+def _event_from_row(row: tuple) -> Dict:
+    """Rebuild the analysis JSON for an events row selected as EVENT_COLUMNS."""
+    (event_id, timestamp, num_faces, yaw, pitch, roll, gaze_direction, gaze_confidence,
+     phone_detected, device_confidence, bbox_x, bbox_y, bbox_w, bbox_h,
+     attention_score, state, captured_at, extra, raw_data) = row
+    
+    if raw_data is not None:
+        # Legacy row that has not been compacted yet
+        event = json.loads(raw_data)
+    else:
+        event = {
+            'num_faces': num_faces,
+            'head_pose': {'yaw': yaw, 'pitch': pitch, 'roll': roll} if yaw is not None else None,
+            'gaze': {'direction': gaze_direction, 'confidence': gaze_confidence} if gaze_direction is not None else None,
+            'device': {
+                'phone_detected': bool(phone_detected),
+                'bbox': [bbox_x, bbox_y, bbox_w, bbox_h] if bbox_x is not None else None,
+                'confidence': device_confidence
+            } if phone_detected is not None else None,
+            'attention_score': attention_score,
+            'state': state
+        }
+        if captured_at is not None:
+            event['captured_at'] = captured_at
+        if extra:
+            event.update(json.loads(extra))
+    
+    event['id'] = event_id
+    event['timestamp'] = timestamp
+    return event
+
+
+# States with their own counter in event_rollups; anything else counts as 'other'
+ROLLUP_STATES = ('focused', 'away', 'distracted', 'device_detected', 'multiple_faces_detected')
+
+_ROLLUP_COLUMNS = (
+    ['event_count', 'attention_sum', 'attention_min', 'attention_max']
+    + [f"{state}_count" for state in ROLLUP_STATES]
+    + ['other_state_count', 'faces_0_count', 'faces_1_count', 'faces_2plus_count',
+       'device_hits', 'violation_count']
+)
+
+# Per-event rollup values, selected from events rows (aggregated over a GROUP BY when rebuilding)
+_ROLLUP_EVENT_SELECT = f'''
+    session_id, roll_no, CAST(strftime('%s', timestamp) AS INTEGER) / 60,
+    COUNT(*), SUM(attention_score), MIN(attention_score), MAX(attention_score),
+    {', '.join(f"SUM(state = '{state}')" for state in ROLLUP_STATES)},
+    SUM(state NOT IN ({', '.join(f"'{state}'" for state in ROLLUP_STATES)}) OR state IS NULL),
+    SUM(num_faces = 0), SUM(num_faces = 1), SUM(num_faces > 1),
+    SUM(COALESCE(phone_detected, 0)), 0
+'''
+
+# Merge a new rollup row into an existing minute
+_ROLLUP_UPSERT = f'''
+    ON CONFLICT (session_id, roll_no, minute) DO UPDATE SET
+        attention_min = COALESCE(MIN(attention_min, excluded.attention_min), attention_min, excluded.attention_min),
+        attention_max = COALESCE(MAX(attention_max, excluded.attention_max), attention_max, excluded.attention_max),
+        {', '.join(f"{column} = {column} + excluded.{column}" for column in _ROLLUP_COLUMNS
+                   if column not in ('attention_min', 'attention_max'))}
+'''
+
+
+def _normalize_timestamp(value: Optional[str]) -> Optional[str]:
+    """Turn an ISO-8601 time ('2025-10-25T15:38:06Z') into SQLite's CURRENT_TIMESTAMP format."""
+    if not value:
+        return None
+    return value.replace('T', ' ').rstrip('Z')[:19]
+
+
+def _rollup_from_row(minute: int, values: tuple, **extra) -> Dict:
+    """Build a rollup dict from values selected in _ROLLUP_COLUMNS order."""
+    row = dict(zip(_ROLLUP_COLUMNS, values))
+    events = row['event_count'] or 0
+    rollup = {
+        'minute': minute,
+        'start': datetime.utcfromtimestamp(minute * 60).strftime('%Y-%m-%d %H:%M:%S'),
+        'events': events,
+        'mean_attention': round(row['attention_sum'] / events, 2) if events else None,
+        'min_attention': row['attention_min'],
+        'max_attention': row['attention_max'],
+        'states': {state: row[f"{state}_count"] for state in ROLLUP_STATES},
+        'faces': {'0': row['faces_0_count'], '1': row['faces_1_count'], '2+': row['faces_2plus_count']},
+        'device_hits': row['device_hits'],
+        'violations': row['violation_count'],
+    }
+    rollup['states']['other'] = row['other_state_count']
+    rollup.update(extra)
+    return rollup
+
+
+# Rows removed per short transaction when a session is deleted
+DELETE_CHUNK_SIZE = int(os.getenv("DELETE_CHUNK_SIZE", 2000))
+
+# Session data removed chunk by chunk, children before parents
+_SESSION_DELETE_STEPS = [
+    ('student_answers', '''
+        DELETE FROM student_answers WHERE id IN (
+            SELECT id FROM student_answers WHERE session_id = :session_id LIMIT :chunk_size)'''),
+    ('mcq_options', '''
+        DELETE FROM mcq_options WHERE id IN (
+            SELECT o.id FROM mcq_options o JOIN questions q ON q.id = o.question_id
+            WHERE q.session_id = :session_id LIMIT :chunk_size)'''),
+    ('questions', '''
+        DELETE FROM questions WHERE id IN (
+            SELECT id FROM questions WHERE session_id = :session_id LIMIT :chunk_size)'''),
+    ('results', '''
+        DELETE FROM results WHERE id IN (
+            SELECT id FROM results WHERE session_id = :session_id LIMIT :chunk_size)'''),
+    ('violation_counts', '''
+        DELETE FROM violation_counts WHERE session_id = :session_id AND (roll_no, violation_type) IN (
+            SELECT roll_no, violation_type FROM violation_counts WHERE session_id = :session_id LIMIT :chunk_size)'''),
+    ('event_rollups', '''
+        DELETE FROM event_rollups WHERE session_id = :session_id AND (roll_no, minute) IN (
+            SELECT roll_no, minute FROM event_rollups WHERE session_id = :session_id LIMIT :chunk_size)'''),
+    ('violations', '''
+        DELETE FROM violations WHERE id IN (
+            SELECT id FROM violations WHERE session_id = :session_id LIMIT :chunk_size)'''),
+    ('events', '''
+        DELETE FROM events WHERE id IN (
+            SELECT id FROM events WHERE session_id = :session_id LIMIT :chunk_size)'''),
+    ('students', '''
+        DELETE FROM students WHERE id IN (
+            SELECT id FROM students WHERE session_id = :session_id LIMIT :chunk_size)'''),
+]
+
 
 class DatabaseManager:
     def __init__(self, db_path: str = "proctoring.db"):
@@ -14,6 +195,10 @@ class DatabaseManager:
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
+        # Let the archiver hand freed pages back with PRAGMA incremental_vacuum
+        # (only takes effect on a new database; archive.py converts existing ones)
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        
         # Sessions table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS sessions (
@@ -57,10 +242,21 @@ class DatabaseManager:
                 phone_detected BOOLEAN,
                 attention_score REAL,
                 state TEXT,
-                raw_data TEXT, -- JSON string of complete analysis
+                raw_data TEXT, -- legacy: JSON string of complete analysis (NULL for compact rows)
+                head_pose_roll REAL,
+                gaze_direction TEXT,
+                gaze_confidence REAL,
+                device_confidence REAL,
+                device_bbox_x INTEGER,
+                device_bbox_y INTEGER,
+                device_bbox_w INTEGER,
+                device_bbox_h INTEGER,
+                extra TEXT, -- JSON of any analysis keys without a column (usually NULL)
+                captured_at REAL, -- arrival time (unix seconds) the live scorer used
                 FOREIGN KEY (session_id) REFERENCES sessions (session_id)
             )
         ''')
+        self._add_missing_columns(cursor, 'events', EVENT_EXTRA_COLUMNS)
         
         # Questions table (for custom exams)
         cursor.execute('''
@@ -125,10 +321,12 @@ class DatabaseManager:
                 exam_score REAL, -- total exam score
                 total_possible_points REAL, -- total possible points
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                graded_at TIMESTAMP, -- last grade_session() run for this student
                 FOREIGN KEY (session_id) REFERENCES sessions (session_id),
                 UNIQUE(session_id, roll_no)
             )
         ''')
+        self._add_missing_columns(cursor, 'results', [('graded_at', 'TIMESTAMP')])
         
         # Violations table (for mouse out and tab switches)
         cursor.execute('''
@@ -142,9 +340,90 @@ class DatabaseManager:
             )
         ''')
         
+        # Indexes for per-student and per-session event/violation scans
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_events_student ON events (session_id, roll_no)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_violations_student ON violations (session_id, roll_no)')
+        
+        # Archived sessions manifest (events/violations moved out to archive files)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS archived_sessions (
+                session_id TEXT PRIMARY KEY,
+                archive_path TEXT NOT NULL,
+                event_count INTEGER,
+                violation_count INTEGER,
+                archive_bytes INTEGER,
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (session_id) REFERENCES sessions (session_id)
+            )
+        ''')
+        
+        # Per-student, per-minute rollups (updated with every event and violation)
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='event_rollups'")
+        rollups_missing = cursor.fetchone() is None
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS event_rollups (
+                session_id TEXT NOT NULL,
+                roll_no TEXT NOT NULL,
+                minute INTEGER NOT NULL, -- Unix time // 60
+                event_count INTEGER DEFAULT 0,
+                attention_sum REAL DEFAULT 0,
+                attention_min REAL,
+                attention_max REAL,
+                focused_count INTEGER DEFAULT 0,
+                away_count INTEGER DEFAULT 0,
+                distracted_count INTEGER DEFAULT 0,
+                device_detected_count INTEGER DEFAULT 0,
+                multiple_faces_detected_count INTEGER DEFAULT 0,
+                other_state_count INTEGER DEFAULT 0,
+                faces_0_count INTEGER DEFAULT 0,
+                faces_1_count INTEGER DEFAULT 0,
+                faces_2plus_count INTEGER DEFAULT 0,
+                device_hits INTEGER DEFAULT 0,
+                violation_count INTEGER DEFAULT 0,
+                PRIMARY KEY (session_id, roll_no, minute)
+            ) WITHOUT ROWID
+        ''')
+        
+        # Violation counters (kept in step with the violations table on every insert)
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='violation_counts'")
+        counters_missing = cursor.fetchone() is None
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS violation_counts (
+                session_id TEXT NOT NULL,
+                roll_no TEXT NOT NULL,
+                violation_type TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (session_id, roll_no, violation_type)
+            ) WITHOUT ROWID
+        ''')
+        # Background session deletions (progress survives restarts)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS session_deletions (
+                session_id TEXT PRIMARY KEY,
+                total_rows INTEGER NOT NULL,
+                deleted_rows INTEGER NOT NULL DEFAULT 0,
+                requested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                finished_at TIMESTAMP
+            )
+        ''')
+        
+        if counters_missing:
+            # Existing database: seed the counters from the raw violations
+            self._rebuild_violation_counts(cursor)
+        if rollups_missing:
+            self._rebuild_rollups(cursor)
+        
         conn.commit()
         conn.close()
     
+    def _add_missing_columns(self, cursor, table: str, columns: List[tuple]):
+        """Add columns introduced after a table was first created."""
+        cursor.execute(f"PRAGMA table_info({table})")
+        existing = {row[1] for row in cursor.fetchall()}
+        for name, column_type in columns:
+            if name not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+    
     def create_session(self, session_id: str, google_form_link: str = None, students: List[str] = None, 
                       exam_type: str = 'google_form', exam_title: str = None, exam_description: str = None) -> bool:
         """Create a new session in the database."""
@@ -160,11 +439,10 @@ class DatabaseManager:
             
             # Insert students if provided
             if students:
-                for roll_no in students:
-                    cursor.execute('''
-                        INSERT INTO students (session_id, roll_no)
-                        VALUES (?, ?)
-                    ''', (session_id, roll_no))
+                cursor.executemany('''
+                    INSERT INTO students (session_id, roll_no)
+                    VALUES (?, ?)
+                ''', [(session_id, roll_no) for roll_no in students])
             
             conn.commit()
             conn.close()
@@ -173,32 +451,49 @@ class DatabaseManager:
             print(f"Error creating session: {e}")
             return False
     
+    def add_students_bulk(self, session_id: str, roll_nos: List[str]) -> Dict:
+        """Add many students to a session in one transaction.
+        
+        Roll numbers already in the session are skipped. Returns the inserted
+        and skipped roll numbers.
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT roll_no FROM students WHERE session_id = ?', (session_id,))
+            existing = {row[0] for row in cursor.fetchall()}
+            new_roll_nos = [roll_no for roll_no in dict.fromkeys(roll_nos) if roll_no not in existing]
+            
+            cursor.executemany('''
+                INSERT OR IGNORE INTO students (session_id, roll_no)
+                VALUES (?, ?)
+            ''', [(session_id, roll_no) for roll_no in new_roll_nos])
+            
+            conn.commit()
+            conn.close()
+            return {'inserted': new_roll_nos, 'skipped': [r for r in roll_nos if r in existing]}
+        except Exception as e:
+            print(f"Error adding students: {e}")
+            return {'inserted': [], 'skipped': [], 'error': str(e)}
+    
     def save_event(self, session_id: str, roll_no: str, analysis_data: Dict) -> bool:
-        """Save a frame analysis event to the database."""
+        """Save a frame analysis event to the database as typed columns."""
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
-            cursor.execute('''
-                INSERT INTO events (
-                    session_id, roll_no, num_faces, head_pose_yaw, head_pose_pitch,
-                    gaze_x, gaze_y, device_detected, phone_detected, attention_score,
-                    state, raw_data
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                session_id,
-                roll_no,
-                analysis_data.get('num_faces', 0),
-                analysis_data.get('head_pose', {}).get('yaw', 0),
-                analysis_data.get('head_pose', {}).get('pitch', 0),
-                analysis_data.get('gaze', {}).get('x', 0),
-                analysis_data.get('gaze', {}).get('y', 0),
-                analysis_data.get('device', {}).get('device_detected', False),
-                analysis_data.get('device', {}).get('phone_detected', False),
-                analysis_data.get('attention_score', 0),
-                analysis_data.get('state', 'unknown'),
-                json.dumps(analysis_data)
-            ))
+            cursor.execute(f'''
+                INSERT INTO events (session_id, roll_no, {', '.join(PACKED_EVENT_COLUMNS)})
+                VALUES (?, ?, {', '.join('?' * len(PACKED_EVENT_COLUMNS))})
+            ''', (session_id, roll_no) + _pack_event(analysis_data))
+            
+            # Fold the event into its minute rollup in the same transaction
+            cursor.execute(f'''
+                INSERT INTO event_rollups (session_id, roll_no, minute, {', '.join(_ROLLUP_COLUMNS)})
+                SELECT {_ROLLUP_EVENT_SELECT} FROM events WHERE id = ?
+                {_ROLLUP_UPSERT}
+            ''', (cursor.lastrowid,))
             
             conn.commit()
             conn.close()
@@ -207,6 +502,60 @@ class DatabaseManager:
             print(f"Error saving event: {e}")
             return False
     
+    def compact_legacy_events(self, batch_size: int = 5000) -> int:
+        """Move legacy raw_data JSON rows into the typed columns. Returns rows converted.
+        
+        Also moves captured_at out of the extra JSON of rows written before it had a column.
+        """
+        converted = 0
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            last_id = 0
+            while True:
+                cursor.execute('''
+                    SELECT id, raw_data FROM events
+                    WHERE raw_data IS NOT NULL AND id > ?
+                    ORDER BY id LIMIT ?
+                ''', (last_id, batch_size))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                
+                updates = []
+                for event_id, raw_data in rows:
+                    try:
+                        updates.append(_pack_event(json.loads(raw_data)) + (event_id,))
+                    except (ValueError, TypeError, KeyError, AttributeError):
+                        # Unreadable legacy row: keep its raw_data as-is
+                        continue
+                
+                cursor.executemany(f'''
+                    UPDATE events
+                    SET {', '.join(f"{column} = ?" for column in PACKED_EVENT_COLUMNS)}, raw_data = NULL
+                    WHERE id = ?
+                ''', updates)
+                conn.commit()
+                converted += len(updates)
+            
+            cursor.execute('''
+                UPDATE events
+                SET captured_at = json_extract(extra, '$.captured_at'),
+                    extra = NULLIF(json_remove(extra, '$.captured_at'), '{}')
+                WHERE raw_data IS NULL AND captured_at IS NULL
+                  AND json_extract(extra, '$.captured_at') IS NOT NULL
+            ''')
+            conn.commit()
+            converted += cursor.rowcount
+            
+            conn.close()
+            return converted
+        except Exception as e:
+            print(f"Error compacting events: {e}")
+            return converted
+    
     def update_student_status(self, session_id: str, roll_no: str, status: str) -> bool:
         """Update student status in the database."""
         try:
@@ -240,7 +589,7 @@ class DatabaseManager:
             return False
     
     def save_violation(self, session_id: str, roll_no: str, violation_type: str) -> bool:
-        """Save a violation (mouse out or tab switch) to the database."""
+        """Save a violation (mouse out, tab switch, ...) and bump its counter in the same transaction."""
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
@@ -250,6 +599,19 @@ class DatabaseManager:
                 VALUES (?, ?, ?)
             ''', (session_id, roll_no, violation_type))
             
+            cursor.execute('''
+                INSERT INTO violation_counts (session_id, roll_no, violation_type, count)
+                VALUES (?, ?, ?, 1)
+                ON CONFLICT (session_id, roll_no, violation_type) DO UPDATE SET count = count + 1
+            ''', (session_id, roll_no, violation_type))
+            
+            cursor.execute('''
+                INSERT INTO event_rollups (session_id, roll_no, minute, violation_count)
+                SELECT session_id, roll_no, CAST(strftime('%s', timestamp) AS INTEGER) / 60, 1
+                FROM violations WHERE id = ?
+                ON CONFLICT (session_id, roll_no, minute) DO UPDATE SET violation_count = violation_count + 1
+            ''', (cursor.lastrowid,))
+            
             conn.commit()
             conn.close()
             return True
@@ -258,26 +620,24 @@ class DatabaseManager:
             return False
     
     def get_violation_counts(self, session_id: str, roll_no: str) -> Dict:
-        """Get violation counts for a student."""
+        """Get violation counts for a student from the counters table.
+        
+        Always includes mouse_out_count and tab_switch_count; any other violation
+        type recorded for the student is returned as '<violation_type>_count'.
+        """
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
             cursor.execute('''
-                SELECT violation_type, COUNT(*) 
-                FROM violations 
+                SELECT violation_type, count
+                FROM violation_counts
                 WHERE session_id = ? AND roll_no = ?
-                GROUP BY violation_type
             ''', (session_id, roll_no))
             
-            results = cursor.fetchall()
             counts = {'mouse_out_count': 0, 'tab_switch_count': 0}
-            
-            for row in results:
-                if row[0] == 'mouse_out':
-                    counts['mouse_out_count'] = row[1]
-                elif row[0] == 'tab_switch':
-                    counts['tab_switch_count'] = row[1]
+            for violation_type, count in cursor.fetchall():
+                counts[f"{violation_type}_count"] = count
             
             conn.close()
             return counts
@@ -285,6 +645,178 @@ class DatabaseManager:
             print(f"Error getting violation counts: {e}")
             return {'mouse_out_count': 0, 'tab_switch_count': 0}
     
+    def _rebuild_violation_counts(self, cursor, session_id: str = None):
+        """Recompute violation counters from the raw violations table.
+        
+        Archived sessions keep their counters: their raw violations live in the archive.
+        """
+        if session_id:
+            cursor.execute('SELECT 1 FROM archived_sessions WHERE session_id = ?', (session_id,))
+            if cursor.fetchone():
+                return
+            cursor.execute('DELETE FROM violation_counts WHERE session_id = ?', (session_id,))
+            cursor.execute('''
+                INSERT INTO violation_counts (session_id, roll_no, violation_type, count)
+                SELECT session_id, roll_no, violation_type, COUNT(*)
+                FROM violations WHERE session_id = ?
+                GROUP BY session_id, roll_no, violation_type
+            ''', (session_id,))
+        else:
+            cursor.execute('''
+                DELETE FROM violation_counts
+                WHERE session_id NOT IN (SELECT session_id FROM archived_sessions)
+            ''')
+            cursor.execute('''
+                INSERT INTO violation_counts (session_id, roll_no, violation_type, count)
+                SELECT session_id, roll_no, violation_type, COUNT(*)
+                FROM violations
+                GROUP BY session_id, roll_no, violation_type
+            ''')
+    
+    def _rebuild_rollups(self, cursor, session_id: str = None):
+        """Recompute event_rollups from the raw events and violations (archived sessions are kept)."""
+        if session_id:
+            cursor.execute('SELECT 1 FROM archived_sessions WHERE session_id = ?', (session_id,))
+            if cursor.fetchone():
+                return
+            where, params = 'WHERE session_id = ?', (session_id,)
+            cursor.execute('DELETE FROM event_rollups WHERE session_id = ?', params)
+        else:
+            where, params = '', ()
+            cursor.execute('''
+                DELETE FROM event_rollups
+                WHERE session_id NOT IN (SELECT session_id FROM archived_sessions)
+            ''')
+        
+        cursor.execute(f'''
+            INSERT INTO event_rollups (session_id, roll_no, minute, {', '.join(_ROLLUP_COLUMNS)})
+            SELECT {_ROLLUP_EVENT_SELECT} FROM events {where}
+            GROUP BY 1, 2, 3
+        ''', params)
+        cursor.execute(f'''
+            INSERT INTO event_rollups (session_id, roll_no, minute, violation_count)
+            SELECT session_id, roll_no, CAST(strftime('%s', timestamp) AS INTEGER) / 60, COUNT(*)
+            FROM violations {where}
+            GROUP BY 1, 2, 3
+            ON CONFLICT (session_id, roll_no, minute) DO UPDATE SET violation_count = excluded.violation_count
+        ''', params)
+    
+    def rebuild_rollups(self, session_id: str = None) -> bool:
+        """Rebuild the per-minute rollups of one session (or all sessions) from the raw tables."""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            self._rebuild_rollups(cursor, session_id)
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"Error rebuilding rollups: {e}")
+            return False
+    
+    def get_rollups(self, session_id: str, roll_no: str = None, minutes: int = 1) -> List[Dict]:
+        """Get the rollup series of a session in buckets of `minutes` minutes.
+        
+        With roll_no the series covers one student; without it, every student
+        of the session is merged into a class-wide series.
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            minutes = max(1, int(minutes))
+            
+            where = 'WHERE session_id = ?' + (' AND roll_no = ?' if roll_no else '')
+            params = (minutes, minutes, session_id) + ((roll_no,) if roll_no else ())
+            cursor.execute(f'''
+                SELECT (minute / ?) * ? AS bucket, SUM(event_count), SUM(attention_sum),
+                       MIN(attention_min), MAX(attention_max),
+                       {', '.join(f"SUM({column})" for column in _ROLLUP_COLUMNS[4:])},
+                       COUNT(DISTINCT roll_no)
+                FROM event_rollups {where}
+                GROUP BY bucket ORDER BY bucket
+            ''', params)
+            
+            rollups = [_rollup_from_row(row[0], row[1:-1], students=row[-1]) for row in cursor.fetchall()]
+            conn.close()
+            return rollups
+        except Exception as e:
+            print(f"Error getting rollups: {e}")
+            return []
+    
+    def get_rollup_totals(self, session_id: str) -> Dict:
+        """Per-student totals over the whole session, answered from the rollups."""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            cursor.execute(f'''
+                SELECT roll_no, MIN(minute), SUM(event_count), SUM(attention_sum),
+                       MIN(attention_min), MAX(attention_max),
+                       {', '.join(f"SUM({column})" for column in _ROLLUP_COLUMNS[4:])}
+                FROM event_rollups WHERE session_id = ?
+                GROUP BY roll_no
+            ''', (session_id,))
+            
+            totals = {row[0]: _rollup_from_row(row[1], row[2:]) for row in cursor.fetchall()}
+            conn.close()
+            return totals
+        except Exception as e:
+            print(f"Error getting rollup totals: {e}")
+            return {}
+    
+    def check_violation_counts(self, session_id: str = None, repair: bool = False) -> List[Dict]:
+        """Compare the violation counters against the raw violations table.
+        
+        Returns one entry per (session, student, type) whose stored counter differs
+        from the actual number of violation rows. With repair=True the counters are
+        rebuilt from the raw table afterwards.
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            where = 'WHERE session_id = ?' if session_id else ''
+            params = (session_id,) if session_id else ()
+            
+            cursor.execute(f'''
+                SELECT session_id, roll_no, violation_type, COUNT(*)
+                FROM violations {where}
+                GROUP BY session_id, roll_no, violation_type
+            ''', params)
+            actual = {row[:3]: row[3] for row in cursor.fetchall()}
+            
+            cursor.execute(f'''
+                SELECT session_id, roll_no, violation_type, count
+                FROM violation_counts {where}
+            ''', params)
+            stored = {row[:3]: row[3] for row in cursor.fetchall()}
+            
+            cursor.execute('SELECT session_id FROM archived_sessions')
+            archived = {row[0] for row in cursor.fetchall()}
+            
+            mismatches = []
+            for key in sorted(set(actual) | set(stored)):
+                if key[0] in archived:
+                    continue
+                if actual.get(key, 0) != stored.get(key, 0):
+                    mismatches.append({
+                        'session_id': key[0],
+                        'roll_no': key[1],
+                        'violation_type': key[2],
+                        'stored_count': stored.get(key, 0),
+                        'actual_count': actual.get(key, 0)
+                    })
+            
+            if repair and mismatches:
+                self._rebuild_violation_counts(cursor, session_id)
+                conn.commit()
+            
+            conn.close()
+            return mismatches
+        except Exception as e:
+            print(f"Error checking violation counts: {e}")
+            return []
+    
     def save_session_results(self, session_id: str, roll_no: str, results: Dict) -> bool:
         """Save final session results to the database."""
         try:
@@ -312,14 +844,24 @@ class DatabaseManager:
             
             total_events = cursor.fetchone()[0]
             
-            # Insert results
+            # Insert or update results (keeping the grading columns filled by grade_session)
             cursor.execute('''
-                INSERT OR REPLACE INTO results (
+                INSERT INTO results (
                     session_id, roll_no, average_attention_score, distracted_count,
                     multiple_faces_count, no_face_count, device_detected_count,
                     mouse_out_count, tab_switch_count,
                     total_events, session_duration
                 ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(session_id, roll_no) DO UPDATE SET
+                    average_attention_score = excluded.average_attention_score,
+                    distracted_count = excluded.distracted_count,
+                    multiple_faces_count = excluded.multiple_faces_count,
+                    no_face_count = excluded.no_face_count,
+                    device_detected_count = excluded.device_detected_count,
+                    mouse_out_count = excluded.mouse_out_count,
+                    tab_switch_count = excluded.tab_switch_count,
+                    total_events = excluded.total_events,
+                    session_duration = excluded.session_duration
             ''', (
                 session_id,
                 roll_no,
@@ -341,6 +883,96 @@ class DatabaseManager:
             print(f"Error saving session results: {e}")
             return False
     
+    def grade_session(self, session_id: str, roll_nos: List[str] = None, changed_only: bool = False) -> Dict:
+        """Grade MCQ answers and fill exam scores for a session with set-based SQL.
+        
+        Marks every MCQ answer correct or not by joining its selected option,
+        sets points_earned, then writes exam_score (all points earned, so
+        manually awarded essay points count too) and total_possible_points into
+        results. roll_nos limits grading to some students; changed_only to the
+        students whose answers changed since they were last graded.
+        Returns counts of graded students and answers.
+        """
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        try:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            
+            # The students to grade, in a temp table the statements below join against
+            cursor.execute('DROP TABLE IF EXISTS temp.grading_students')
+            cursor.execute('CREATE TEMP TABLE grading_students (roll_no TEXT PRIMARY KEY)')
+            cursor.execute('''
+                INSERT INTO grading_students (roll_no)
+                SELECT s.roll_no FROM students s
+                WHERE s.session_id = ?
+                  AND (? IS NULL OR s.roll_no IN (SELECT value FROM json_each(?)))
+                  AND (NOT ? OR EXISTS (
+                      SELECT 1 FROM student_answers sa
+                      LEFT JOIN results r ON r.session_id = sa.session_id AND r.roll_no = sa.roll_no
+                      WHERE sa.session_id = s.session_id AND sa.roll_no = s.roll_no
+                        AND (r.graded_at IS NULL OR sa.answered_at >= r.graded_at)
+                  ))
+            ''', (session_id, None if roll_nos is None else 1, json.dumps(list(roll_nos or [])), changed_only))
+            graded_students = cursor.rowcount
+            
+            cursor.execute('''
+                UPDATE student_answers
+                SET is_correct = graded.is_correct,
+                    points_earned = CASE WHEN graded.is_correct THEN graded.points ELSE 0 END
+                FROM (
+                    SELECT sa.id, COALESCE(o.is_correct, 0) AS is_correct, q.points
+                    FROM student_answers sa
+                    JOIN grading_students g ON g.roll_no = sa.roll_no
+                    JOIN questions q ON q.id = sa.question_id AND q.question_type = 'mcq'
+                    LEFT JOIN mcq_options o ON o.id = sa.selected_option_id AND o.question_id = q.id
+                    WHERE sa.session_id = ?
+                ) graded
+                WHERE student_answers.id = graded.id
+            ''', (session_id,))
+            graded_answers = cursor.rowcount
+            
+            cursor.execute('''
+                INSERT INTO results (session_id, roll_no, exam_score, total_possible_points, graded_at)
+                SELECT ?, g.roll_no, COALESCE(earned.points, 0), possible.points, CURRENT_TIMESTAMP
+                FROM grading_students g
+                CROSS JOIN (SELECT COALESCE(SUM(points), 0) AS points FROM questions WHERE session_id = ?) possible
+                LEFT JOIN (
+                    SELECT sa.roll_no, SUM(sa.points_earned) AS points
+                    FROM student_answers sa
+                    JOIN questions q ON q.id = sa.question_id AND q.session_id = sa.session_id
+                    WHERE sa.session_id = ?
+                    GROUP BY sa.roll_no
+                ) earned ON earned.roll_no = g.roll_no
+                WHERE true
+                ON CONFLICT(session_id, roll_no) DO UPDATE SET
+                    exam_score = excluded.exam_score,
+                    total_possible_points = excluded.total_possible_points,
+                    graded_at = excluded.graded_at
+            ''', (session_id, session_id, session_id))
+            
+            cursor.execute('DROP TABLE temp.grading_students')
+            cursor.execute('COMMIT')
+            return {'graded_students': graded_students, 'graded_answers': graded_answers}
+        except Exception as e:
+            # Closing the connection without COMMIT rolls the grading back
+            print(f"Error grading session: {e}")
+            return {'graded_students': 0, 'graded_answers': 0, 'error': str(e)}
+        finally:
+            conn.close()
+    
+    def get_last_event_id(self, session_id: str) -> Optional[int]:
+        """Id of the session's newest live event (None if it has none, e.g. once archived)."""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute('SELECT MAX(id) FROM events WHERE session_id = ?', (session_id,))
+            last_id = cursor.fetchone()[0]
+            conn.close()
+            return last_id
+        except Exception as e:
+            print(f"Error getting last event id: {e}")
+            return None
+    
     def get_session_data(self, session_id: str) -> Optional[Dict]:
         """Get complete session data from database."""
         try:
@@ -350,7 +982,7 @@ class DatabaseManager:
             # Get session info
             cursor.execute('''
                 SELECT google_form_link, created_at, status, exam_type, exam_title, exam_description
-                FROM sessions WHERE session_id = ?
+                FROM sessions WHERE session_id = ? AND status IS NOT 'deleting'
             ''', (session_id,))
             
             session_row = cursor.fetchone()
@@ -387,7 +1019,7 @@ class DatabaseManager:
                 cursor.execute('''
                     SELECT average_attention_score, distracted_count, multiple_faces_count,
                            no_face_count, device_detected_count, mouse_out_count, tab_switch_count,
-                           total_events, session_duration
+                           total_events, session_duration, exam_score, total_possible_points
                     FROM results WHERE session_id = ? AND roll_no = ?
                 ''', (session_id, roll_no))
                 
@@ -402,7 +1034,9 @@ class DatabaseManager:
                         'mouse_out_count': results_row[5],
                         'tab_switch_count': results_row[6],
                         'total_events': results_row[7],
-                        'session_duration': results_row[8]
+                        'session_duration': results_row[8],
+                        'exam_score': results_row[9],
+                        'total_possible_points': results_row[10]
                     }
             
             conn.close()
@@ -420,7 +1054,7 @@ class DatabaseManager:
             # Get all sessions
             cursor.execute('''
                 SELECT session_id, google_form_link, created_at, status, exam_type, exam_title, exam_description
-                FROM sessions ORDER BY created_at DESC
+                FROM sessions WHERE status IS NOT 'deleting' ORDER BY created_at DESC
             ''')
             
             sessions_rows = cursor.fetchall()
@@ -457,7 +1091,7 @@ class DatabaseManager:
                     cursor.execute('''
                         SELECT average_attention_score, distracted_count, multiple_faces_count,
                                no_face_count, device_detected_count, mouse_out_count, tab_switch_count,
-                               total_events, session_duration
+                               total_events, session_duration, exam_score, total_possible_points
                         FROM results WHERE session_id = ? AND roll_no = ?
                     ''', (session_id, roll_no))
                     
@@ -472,7 +1106,9 @@ class DatabaseManager:
                             'mouse_out_count': results_row[5],
                             'tab_switch_count': results_row[6],
                             'total_events': results_row[7],
-                            'session_duration': results_row[8]
+                            'session_duration': results_row[8],
+                            'exam_score': results_row[9],
+                            'total_possible_points': results_row[10]
                         }
             
             conn.close()
@@ -482,31 +1118,147 @@ class DatabaseManager:
             return {}
     
     def get_session_events(self, session_id: str, roll_no: str) -> List[Dict]:
-        """Get all events for a specific student session."""
+        """Get all events for a specific student session (archived events first)."""
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
-            cursor.execute('''
-                SELECT timestamp, raw_data FROM events 
+            events = []
+            archive_path = self._get_archive_path(cursor, session_id)
+            if archive_path:
+                from archive import read_archived_events
+                events.extend(read_archived_events(archive_path, roll_no))
+            
+            cursor.execute(f'''
+                SELECT {', '.join(EVENT_COLUMNS)} FROM events 
                 WHERE session_id = ? AND roll_no = ?
                 ORDER BY timestamp ASC
             ''', (session_id, roll_no))
             
-            events_rows = cursor.fetchall()
+            events.extend(_event_from_row(row) for row in cursor.fetchall())
+            
+            conn.close()
+            return events
+        except Exception as e:
+            print(f"Error getting session events: {e}")
+            return []
+    
+    def get_student_stats(self, session_id: str, roll_no: str) -> Optional[StudentStats]:
+        """A student's StudentStats, aggregated in SQL instead of loading every event.
+        
+        Frame times are captured_at (the timestamp for rows stored before it had a
+        column). Returns None for archived sessions or on error.
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            if self._get_archive_path(cursor, session_id):
+                conn.close()
+                return None
+            
+            cursor.execute(f'''
+                SELECT COUNT(*), COALESCE(SUM(attention_score), 0), MIN(attention_score), MAX(attention_score),
+                       COALESCE(SUM(state IN ({', '.join('?' * len(DISTRACTED_STATES))})), 0),
+                       COALESCE(SUM(num_faces > 1), 0), COALESCE(SUM(num_faces = 0), 0),
+                       COALESCE(SUM(phone_detected), 0)
+                FROM events WHERE session_id = ? AND roll_no = ?
+            ''', (*DISTRACTED_STATES, session_id, roll_no))
+            (total_events, score_sum, score_min, score_max, distracted_count, multiple_faces_count,
+             no_face_count, device_detected_count) = cursor.fetchone()
+            
+            cursor.execute('''
+                SELECT state, COUNT(*) FROM events
+                WHERE session_id = ? AND roll_no = ?
+                GROUP BY state
+            ''', (session_id, roll_no))
+            state_counts = dict(cursor.fetchall())
+            
+            # One bucket per score point, rounding half to even like round() in StudentStats.update()
+            cursor.execute('''
+                SELECT MAX(0, MIN(100, CASE WHEN attention_score - CAST(attention_score AS INTEGER) = 0.5
+                                            THEN CAST(attention_score AS INTEGER) + CAST(attention_score AS INTEGER) % 2
+                                            ELSE CAST(ROUND(attention_score) AS INTEGER) END)) AS bucket,
+                       COUNT(*)
+                FROM events WHERE session_id = ? AND roll_no = ?
+                GROUP BY bucket
+            ''', (session_id, roll_no))
+            score_histogram = [0] * 101
+            for bucket, count in cursor.fetchall():
+                score_histogram[bucket] = count
+            
+            # Time between consecutive frames, credited to the earlier frame's state
+            cursor.execute('''
+                WITH frames AS (
+                    SELECT id, state, COALESCE(captured_at, CAST(strftime('%s', timestamp) AS REAL)) AS t
+                    FROM events WHERE session_id = ? AND roll_no = ?
+                ), gaps AS (
+                    SELECT LAG(state) OVER (ORDER BY t, id) AS state, t - LAG(t) OVER (ORDER BY t, id) AS gap
+                    FROM frames
+                )
+                SELECT state, SUM(gap) FROM gaps
+                WHERE gap > 0 AND gap <= ?
+                GROUP BY state
+            ''', (session_id, roll_no, MAX_FRAME_GAP))
+            state_durations = dict(cursor.fetchall())
+            
+            conn.close()
+            return StudentStats.from_totals(total_events, score_sum, score_min, score_max, score_histogram,
+                                            state_counts, state_durations, distracted_count,
+                                            multiple_faces_count, no_face_count, device_detected_count)
+        except Exception as e:
+            print(f"Error getting student stats: {e}")
+            return None
+    
+    def get_session_events_page(self, session_id: str, roll_no: str, after_id: int = 0, limit: int = 500,
+                                start: str = None, end: str = None) -> List[Dict]:
+        """Get up to `limit` events with id > after_id, oldest first (keyset pagination).
+        
+        start/end optionally bound the event timestamp (inclusive), e.g. '2025-10-25 15:38:06'.
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            start = _normalize_timestamp(start)
+            end = _normalize_timestamp(end)
+            
             events = []
+            archive_path = self._get_archive_path(cursor, session_id)
+            if archive_path:
+                from archive import read_archived_events_page
+                events = read_archived_events_page(archive_path, roll_no, after_id, limit, start, end)
+                if events:
+                    after_id = events[-1]['id']
             
-            for row in events_rows:
-                event_data = json.loads(row[1])
-                event_data['timestamp'] = row[0]
-                events.append(event_data)
+            if len(events) < limit:
+                conditions = ['session_id = ?', 'roll_no = ?', 'id > ?']
+                params = [session_id, roll_no, after_id]
+                if start is not None:
+                    conditions.append('timestamp >= ?')
+                    params.append(start)
+                if end is not None:
+                    conditions.append('timestamp <= ?')
+                    params.append(end)
+                params.append(limit - len(events))
+                
+                cursor.execute(f'''
+                    SELECT {', '.join(EVENT_COLUMNS)} FROM events
+                    WHERE {' AND '.join(conditions)}
+                    ORDER BY id ASC LIMIT ?
+                ''', params)
+                events.extend(_event_from_row(row) for row in cursor.fetchall())
             
             conn.close()
             return events
         except Exception as e:
-            print(f"Error getting session events: {e}")
+            print(f"Error getting session events page: {e}")
             return []
     
+    def _get_archive_path(self, cursor, session_id: str) -> Optional[str]:
+        """Return the archive file of an archived session, or None if it is live."""
+        cursor.execute('SELECT archive_path FROM archived_sessions WHERE session_id = ?', (session_id,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+    
     def add_question(self, session_id: str, question_text: str, question_type: str, 
                     points: int = 1, order_index: int = 0) -> int:
         """Add a question to a session. Returns question ID."""
@@ -546,47 +1298,92 @@ class DatabaseManager:
             print(f"Error adding MCQ option: {e}")
             return False
     
+    def add_questions_bulk(self, session_id: str, questions: List[Dict]) -> List[int]:
+        """Add many questions (with their MCQ options) to a session in one transaction.
+        
+        Each question is a dict with question_text, question_type, points,
+        order_index and an optional list of options ({option_text, is_correct,
+        order_index}). Questions without an order_index go after the session's
+        existing ones, in input order. Returns the new question IDs in input
+        order, or [] on error.
+        """
+        if not questions:
+            return []
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        try:
+            cursor = conn.cursor()
+            
+            # The write lock keeps the new IDs contiguous, so they can be read back after executemany
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('SELECT COALESCE(MAX(id), 0) FROM questions')
+            last_id = cursor.fetchone()[0]
+            cursor.execute('SELECT COALESCE(MAX(order_index) + 1, 0) FROM questions WHERE session_id = ?',
+                           (session_id,))
+            next_order = cursor.fetchone()[0]
+            
+            cursor.executemany('''
+                INSERT INTO questions (session_id, question_text, question_type, points, order_index)
+                VALUES (?, ?, ?, ?, ?)
+            ''', [(session_id, q['question_text'], q['question_type'], q.get('points', 1),
+                   next_order + i if q.get('order_index') is None else q['order_index'])
+                  for i, q in enumerate(questions)])
+            
+            cursor.execute('''
+                SELECT id FROM questions WHERE session_id = ? AND id > ?
+                ORDER BY id ASC
+            ''', (session_id, last_id))
+            question_ids = [row[0] for row in cursor.fetchall()]
+            
+            cursor.executemany('''
+                INSERT INTO mcq_options (question_id, option_text, is_correct, order_index)
+                VALUES (?, ?, ?, ?)
+            ''', [(question_id, option['option_text'], bool(option.get('is_correct', False)),
+                   option.get('order_index', i))
+                  for question_id, q in zip(question_ids, questions)
+                  for i, option in enumerate(q.get('options') or [])])
+            
+            cursor.execute('COMMIT')
+            return question_ids
+        except Exception as e:
+            # Closing the connection without COMMIT rolls the whole batch back
+            print(f"Error adding questions: {e}")
+            return []
+        finally:
+            conn.close()
+    
     def get_session_questions(self, session_id: str) -> List[Dict]:
-        """Get all questions for a session with their options."""
+        """Get all questions for a session with their options (one JOIN query)."""
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
-            # Get questions
             cursor.execute('''
-                SELECT id, question_text, question_type, points, order_index
-                FROM questions WHERE session_id = ?
-                ORDER BY order_index ASC
+                SELECT q.id, q.question_text, q.question_type, q.points, q.order_index,
+                       o.id, o.option_text, o.is_correct, o.order_index
+                FROM questions q
+                LEFT JOIN mcq_options o ON o.question_id = q.id AND q.question_type = 'mcq'
+                WHERE q.session_id = ?
+                ORDER BY q.order_index ASC, q.id ASC, o.order_index ASC, o.id ASC
             ''', (session_id,))
             
             questions = []
             for row in cursor.fetchall():
-                question = {
-                    'id': row[0],
-                    'question_text': row[1],
-                    'question_type': row[2],
-                    'points': row[3],
-                    'order_index': row[4],
-                    'options': []
-                }
-                
-                # Get MCQ options if it's an MCQ question
-                if row[2] == 'mcq':
-                    cursor.execute('''
-                        SELECT id, option_text, is_correct, order_index
-                        FROM mcq_options WHERE question_id = ?
-                        ORDER BY order_index ASC
-                    ''', (row[0],))
-                    
-                    for option_row in cursor.fetchall():
-                        question['options'].append({
-                            'id': option_row[0],
-                            'option_text': option_row[1],
-                            'is_correct': bool(option_row[2]),
-                            'order_index': option_row[3]
-                        })
-                
-                questions.append(question)
+                if not questions or questions[-1]['id'] != row[0]:
+                    questions.append({
+                        'id': row[0],
+                        'question_text': row[1],
+                        'question_type': row[2],
+                        'points': row[3],
+                        'order_index': row[4],
+                        'options': []
+                    })
+                if row[5] is not None:
+                    questions[-1]['options'].append({
+                        'id': row[5],
+                        'option_text': row[6],
+                        'is_correct': bool(row[7]),
+                        'order_index': row[8]
+                    })
             
             conn.close()
             return questions
@@ -596,36 +1393,34 @@ class DatabaseManager:
     
     def save_student_answer(self, session_id: str, roll_no: str, question_id: int, 
                           answer_text: str = None, selected_option_id: int = None) -> bool:
-        """Save a student's answer to a question."""
+        """Save a student's answer to a question (insert or replace the previous one)."""
+        return self.save_student_answers([(session_id, roll_no, question_id, answer_text, selected_option_id)])
+    
+    def save_student_answers(self, answers: List[tuple]) -> bool:
+        """Upsert many answers in one transaction.
+        
+        Each answer is a (session_id, roll_no, question_id, answer_text,
+        selected_option_id) tuple; a later answer to the same question replaces
+        the earlier one.
+        """
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
-            # Check if answer already exists
-            cursor.execute('''
-                SELECT id FROM student_answers 
-                WHERE session_id = ? AND roll_no = ? AND question_id = ?
-            ''', (session_id, roll_no, question_id))
-            
-            if cursor.fetchone():
-                # Update existing answer
-                cursor.execute('''
-                    UPDATE student_answers 
-                    SET answer_text = ?, selected_option_id = ?, answered_at = CURRENT_TIMESTAMP
-                    WHERE session_id = ? AND roll_no = ? AND question_id = ?
-                ''', (answer_text, selected_option_id, session_id, roll_no, question_id))
-            else:
-                # Insert new answer
-                cursor.execute('''
-                    INSERT INTO student_answers (session_id, roll_no, question_id, answer_text, selected_option_id)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (session_id, roll_no, question_id, answer_text, selected_option_id))
+            cursor.executemany('''
+                INSERT INTO student_answers (session_id, roll_no, question_id, answer_text, selected_option_id)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(session_id, roll_no, question_id) DO UPDATE SET
+                    answer_text = excluded.answer_text,
+                    selected_option_id = excluded.selected_option_id,
+                    answered_at = CURRENT_TIMESTAMP
+            ''', answers)
             
             conn.commit()
             conn.close()
             return True
         except Exception as e:
-            print(f"Error saving student answer: {e}")
+            print(f"Error saving student answers: {e}")
             return False
     
     def get_student_answers(self, session_id: str, roll_no: str) -> List[Dict]:
@@ -667,47 +1462,151 @@ class DatabaseManager:
             return []
 
     def delete_session(self, session_id: str) -> bool:
-        """Delete a session and all its related data."""
+        """Delete a session and all its related data now, chunk by chunk.
+        
+        The API deletes in the background instead (see session_deletion.py);
+        this blocking form is for scripts and tests.
+        """
+        if not self.mark_session_deleting(session_id):
+            return False
+        while True:
+            result = self.delete_session_chunk(session_id)
+            if result is None:
+                return False
+            if result['done']:
+                return True
+    
+    def mark_session_deleting(self, session_id: str) -> Optional[Dict]:
+        """Hide a session from every listing and queue its data for deletion.
+        
+        Returns the deletion progress, or None if there is no such session.
+        Marking a session that is already being deleted just returns its progress.
+        """
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
-            # Delete in order to respect foreign key constraints
-            # 1. Delete student answers
-            cursor.execute('DELETE FROM student_answers WHERE session_id = ?', (session_id,))
+            cursor.execute("UPDATE sessions SET status = 'deleting' WHERE session_id = ?", (session_id,))
+            if cursor.rowcount == 0:
+                conn.close()
+                return None
             
-            # 2. Delete MCQ options (cascade from questions)
             cursor.execute('''
-                DELETE FROM mcq_options 
-                WHERE question_id IN (
-                    SELECT id FROM questions WHERE session_id = ?
-                )
-            ''', (session_id,))
+                INSERT OR IGNORE INTO session_deletions (session_id, total_rows)
+                SELECT :session_id,
+                       (SELECT COUNT(*) FROM student_answers WHERE session_id = :session_id)
+                     + (SELECT COUNT(*) FROM mcq_options o JOIN questions q ON q.id = o.question_id
+                        WHERE q.session_id = :session_id)
+                     + (SELECT COUNT(*) FROM questions WHERE session_id = :session_id)
+                     + (SELECT COUNT(*) FROM results WHERE session_id = :session_id)
+                     + (SELECT COUNT(*) FROM violation_counts WHERE session_id = :session_id)
+                     + (SELECT COUNT(*) FROM event_rollups WHERE session_id = :session_id)
+                     + (SELECT COUNT(*) FROM violations WHERE session_id = :session_id)
+                     + (SELECT COUNT(*) FROM events WHERE session_id = :session_id)
+                     + (SELECT COUNT(*) FROM students WHERE session_id = :session_id)
+                     + 1 -- the session row
+            ''', {'session_id': session_id})
             
-            # 3. Delete questions
-            cursor.execute('DELETE FROM questions WHERE session_id = ?', (session_id,))
+            conn.commit()
+            conn.close()
+            return self.get_deletion_progress(session_id)
+        except Exception as e:
+            print(f"Error marking session for deletion: {e}")
+            return None
+    
+    def delete_session_chunk(self, session_id: str, chunk_size: int = DELETE_CHUNK_SIZE) -> Optional[Dict]:
+        """Delete up to chunk_size rows of a session being deleted, in one short transaction.
+        
+        Tables are emptied children first; the last call removes the archive
+        and the session row itself. Returns the progress (with done=True once
+        nothing is left), or None on error.
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            
+            deleted = 0
+            for table, statement in _SESSION_DELETE_STEPS:
+                cursor.execute(statement, {'session_id': session_id, 'chunk_size': chunk_size})
+                deleted = cursor.rowcount
+                if deleted:
+                    break
+            
+            archive_path = None
+            if not deleted:
+                table = 'sessions'
+                # Only the session row (and its archive) are left
+                archive_path = self._get_archive_path(cursor, session_id)
+                cursor.execute('DELETE FROM archived_sessions WHERE session_id = ?', (session_id,))
+                cursor.execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
+                deleted = cursor.rowcount
+                cursor.execute('''
+                    UPDATE session_deletions SET finished_at = CURRENT_TIMESTAMP
+                    WHERE session_id = ? AND finished_at IS NULL
+                ''', (session_id,))
+            cursor.execute('''
+                UPDATE session_deletions SET deleted_rows = MIN(total_rows, deleted_rows + ?)
+                WHERE session_id = ?
+            ''', (deleted, session_id))
             
-            # 4. Delete results
-            cursor.execute('DELETE FROM results WHERE session_id = ?', (session_id,))
+            conn.commit()
+            conn.close()
             
-            # 5. Delete violations
-            cursor.execute('DELETE FROM violations WHERE session_id = ?', (session_id,))
+            if archive_path and os.path.exists(archive_path):
+                os.remove(archive_path)
+            progress = self.get_deletion_progress(session_id)
+            if progress:
+                progress['table'] = table
+            return progress
+        except Exception as e:
+            print(f"Error deleting session chunk: {e}")
+            return None
+    
+    def get_deletion_progress(self, session_id: str) -> Optional[Dict]:
+        """Progress of a session deletion, or None if it was never requested."""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
             
-            # 6. Delete events
-            cursor.execute('DELETE FROM events WHERE session_id = ?', (session_id,))
+            cursor.execute('''
+                SELECT total_rows, deleted_rows, requested_at, finished_at
+                FROM session_deletions WHERE session_id = ?
+            ''', (session_id,))
+            row = cursor.fetchone()
+            conn.close()
             
-            # 6. Delete students
-            cursor.execute('DELETE FROM students WHERE session_id = ?', (session_id,))
+            if not row:
+                return None
+            return {
+                'session_id': session_id,
+                'total_rows': row[0],
+                'deleted_rows': row[1],
+                'progress': round(row[1] / row[0], 4) if row[0] else 1.0,
+                'requested_at': row[2],
+                'finished_at': row[3],
+                'done': row[3] is not None,
+            }
+        except Exception as e:
+            print(f"Error getting deletion progress: {e}")
+            return None
+    
+    def get_pending_deletions(self) -> List[str]:
+        """Sessions whose deletion was requested but hasn't finished (oldest first)."""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
             
-            # 7. Delete session
-            cursor.execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
+            cursor.execute('''
+                SELECT session_id FROM session_deletions
+                WHERE finished_at IS NULL ORDER BY requested_at ASC
+            ''')
+            session_ids = [row[0] for row in cursor.fetchall()]
             
-            conn.commit()
             conn.close()
-            return True
+            return session_ids
         except Exception as e:
-            print(f"Error deleting session: {e}")
-            return False
+            print(f"Error getting pending deletions: {e}")
+            return []
 
 # Global database instance
 db = DatabaseManager()
@@ -0,0 +1,294 @@
+"""
+Evidence frame store.
+
+Keeps the submitted images behind flags, plus periodic samples, without
+putting image blobs in SQLite. Each session has a directory of append-only
+segment files holding the raw JPEG/PNG bytes back to back, and an
+index.ndjson with one line per frame (segment, offset, length, student,
+time, reason, status). A frame's id is its line number in the index.
+
+Writes go to the segments first and the index second, each with a single
+append, so a crash leaves at most unreferenced segment bytes or a torn last
+index line. Readers skip the torn line, and the next writer to open the index
+ends it with a newline so its own lines don't get glued onto it. Every
+EvidenceStore writes its own segments (named after a random writer id), so
+several backend workers can share a directory; index lines are appended with
+O_APPEND.
+
+Reads map the segments with mmap and return memoryview slices, so a frame
+goes from the page cache to the response without a copy. At most
+EVIDENCE_MAX_MAPS segments stay mapped (least recently read ones are unmapped
+first), so a long-running server doesn't hold a descriptor per segment ever read.
+
+Per student, the store keeps:
+- the frame that put them in a flagged status (reason "flag"),
+- then at most one frame every EVIDENCE_FLAG_INTERVAL while they stay flagged ("flagged"),
+- a sample every EVIDENCE_SAMPLE_INTERVAL otherwise ("sample"),
+and never more than EVIDENCE_MAX_PER_MINUTE frames in any minute.
+"""
+import json
+import mmap
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict, deque
+
+from frame_scheduler import FLAGGED_STATUSES
+
+# Root directory (one subdirectory per session); empty disables the store
+EVIDENCE_DIR = os.getenv("EVIDENCE_DIR", "evidence")
+EVIDENCE_SEGMENT_BYTES = int(os.getenv("EVIDENCE_SEGMENT_BYTES", 64 * 1024 * 1024))
+EVIDENCE_FLAG_INTERVAL = float(os.getenv("EVIDENCE_FLAG_INTERVAL", 10.0))
+# Seconds between samples of students who aren't flagged (0: no samples)
+EVIDENCE_SAMPLE_INTERVAL = float(os.getenv("EVIDENCE_SAMPLE_INTERVAL", 300.0))
+EVIDENCE_MAX_PER_MINUTE = int(os.getenv("EVIDENCE_MAX_PER_MINUTE", 6))
+# Segments kept memory-mapped for reads, across all sessions
+EVIDENCE_MAX_MAPS = int(os.getenv("EVIDENCE_MAX_MAPS", 32))
+
+INDEX_FILE = "index.ndjson"
+
+
+def media_type(image: bytes) -> str:
+    return "image/png" if image[:4] == b"\x89PNG" else "image/jpeg"
+
+
+class _StudentEvidence:
+    def __init__(self):
+        self.status = None
+        self.last_flagged = float("-inf")
+        self.last_stored = float("-inf")
+        # Times of the frames stored in the last minute
+        self.recent = deque()
+
+
+class _SessionWriter:
+    def __init__(self, directory, writer_id):
+        self.directory = directory
+        self.writer_id = writer_id
+        self.segment_number = 0
+        self.segment = None
+        self.segment_fd = None
+        self.segment_size = 0
+        # Held while writing; the store's lock only guards the rate limits and the writer table
+        self.lock = threading.Lock()
+        self.closed = False
+        os.makedirs(directory, exist_ok=True)
+        self.index_fd = os.open(os.path.join(directory, INDEX_FILE), os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        size = os.fstat(self.index_fd).st_size
+        if size and os.pread(self.index_fd, 1, size - 1) != b"\n":
+            # Torn last line from a crashed writer: end it (readers count it as a bad line)
+            os.write(self.index_fd, b"\n")
+
+    def open_segment(self):
+        self.close_segment()
+        self.segment_number += 1
+        self.segment = f"{self.writer_id}-{self.segment_number:05d}.seg"
+        self.segment_fd = os.open(os.path.join(self.directory, self.segment),
+                                  os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self.segment_size = 0
+
+    def close_segment(self):
+        if self.segment_fd is not None:
+            os.close(self.segment_fd)
+            self.segment_fd = None
+
+    def close(self):
+        with self.lock:
+            if not self.closed:
+                self.closed = True
+                self.close_segment()
+                os.close(self.index_fd)
+
+
+class _SessionReader:
+    def __init__(self):
+        # Bytes of the index parsed so far, and one entry per line (None for a bad line)
+        self.index_offset = 0
+        self.records = []
+
+
+class EvidenceStore:
+    """Appends evidence frames to per-session segment files and reads them back by id."""
+
+    def __init__(self, directory=EVIDENCE_DIR, segment_bytes=EVIDENCE_SEGMENT_BYTES,
+                 flag_interval=EVIDENCE_FLAG_INTERVAL, sample_interval=EVIDENCE_SAMPLE_INTERVAL,
+                 max_per_minute=EVIDENCE_MAX_PER_MINUTE, max_maps=EVIDENCE_MAX_MAPS):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.flag_interval = flag_interval
+        self.sample_interval = sample_interval
+        self.max_per_minute = max_per_minute
+        self.max_maps = max_maps
+        self.writer_id = uuid.uuid4().hex[:12]
+        self._students = {}
+        self._writers = {}
+        self._readers = {}
+        # (session ID, segment) -> mmap, least recently read first
+        self._maps = OrderedDict()
+        self._lock = threading.Lock()
+        self._read_lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.directory)
+
+    def session_directory(self, session_id):
+        return os.path.join(self.directory, session_id.replace("/", "_"))
+
+    def offer(self, session_id, roll_no, image, status, result, timestamp):
+        """Store the image if the student's rate limits call for it; returns the index record or None.
+
+        image is the submitted JPEG/PNG bytes, status the proctoring status
+        the frame led to and result its analysis. Thread-safe; meant to run
+        next to the analysis, off the event loop.
+        """
+        if not self.enabled or not image:
+            return None
+        with self._lock:
+            reason = self._reason((session_id, roll_no), status, timestamp)
+            if reason is None:
+                return None
+            writer = self._writers.get(session_id)
+            if writer is None:
+                writer = self._writers[session_id] = _SessionWriter(self.session_directory(session_id),
+                                                                    self.writer_id)
+        record = {"roll_no": roll_no, "timestamp": timestamp, "reason": reason, "status": status,
+                  "state": result.get("state"), "attention_score": result.get("attention_score"),
+                  "media_type": media_type(image)}
+        # Only this session's writes wait for the disk
+        with writer.lock:
+            if writer.closed:
+                # The session was forgotten (deleted) meanwhile
+                return None
+            return self._append(writer, image, record)
+
+    def _reason(self, key, status, now):
+        student = self._students.get(key)
+        if student is None:
+            student = self._students[key] = _StudentEvidence()
+        flagged = status in FLAGGED_STATUSES
+        if flagged and status != student.status:
+            reason = "flag"
+        elif flagged and now - student.last_flagged >= self.flag_interval:
+            reason = "flagged"
+        elif not flagged and self.sample_interval and now - student.last_stored >= self.sample_interval:
+            reason = "sample"
+        else:
+            reason = None
+        student.status = status
+        if reason is None:
+            return None
+
+        while student.recent and now - student.recent[0] >= 60:
+            student.recent.popleft()
+        if len(student.recent) >= self.max_per_minute:
+            return None
+        student.recent.append(now)
+        student.last_stored = now
+        if flagged:
+            student.last_flagged = now
+        return reason
+
+    def _append(self, writer, image, record):
+        if writer.segment_fd is None or (writer.segment_size and
+                                         writer.segment_size + len(image) > self.segment_bytes):
+            writer.open_segment()
+        record.update({"segment": writer.segment, "offset": writer.segment_size, "length": len(image)})
+        os.write(writer.segment_fd, image)
+        writer.segment_size += len(image)
+        os.write(writer.index_fd, (json.dumps(record, separators=(",", ":")) + "\n").encode())
+        return record
+
+    def frames(self, session_id, roll_no=None, reason=None):
+        """Index records of a session's frames (oldest first), each with its "id"."""
+        with self._read_lock:
+            reader = self._refresh(session_id)
+            return [{"id": frame_id, **record} for frame_id, record in enumerate(reader.records)
+                    if record is not None and (roll_no is None or record["roll_no"] == roll_no)
+                    and (reason is None or record["reason"] == reason)]
+
+    def read(self, session_id, frame_id):
+        """(memoryview of the image bytes, index record), or None if there is no such frame."""
+        with self._read_lock:
+            reader = self._refresh(session_id)
+            if not 0 <= frame_id < len(reader.records) or reader.records[frame_id] is None:
+                return None
+            record = reader.records[frame_id]
+            end = record["offset"] + record["length"]
+            key = (session_id, record["segment"])
+            segment = self._maps.get(key)
+            if segment is None or len(segment) < end:
+                # Not mapped yet, or mapped before this frame was appended to it: (re)map the whole file
+                path = os.path.join(self.session_directory(session_id), os.path.basename(record["segment"]))
+                with open(path, "rb") as f:
+                    segment = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._unmap(self._maps.pop(key, None))
+                self._maps[key] = segment
+                while len(self._maps) > self.max_maps:
+                    self._unmap(self._maps.popitem(last=False)[1])
+                if len(segment) < end:
+                    return None
+            self._maps.move_to_end(key)
+            return memoryview(segment)[record["offset"]:end], record
+
+    @staticmethod
+    def _unmap(segment):
+        if segment is None:
+            return
+        try:
+            segment.close()
+        except BufferError:
+            # A response still holds a view into it: the map closes when the last view is released
+            pass
+
+    def _refresh(self, session_id):
+        """Parses index lines appended since the last call."""
+        reader = self._readers.get(session_id)
+        if reader is None:
+            reader = self._readers[session_id] = _SessionReader()
+        try:
+            with open(os.path.join(self.session_directory(session_id), INDEX_FILE), "rb") as f:
+                f.seek(reader.index_offset)
+                appended = f.read()
+        except FileNotFoundError:
+            return reader
+        # A last line without its newline is still being written (or torn): leave it for later
+        complete = appended[:appended.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            try:
+                reader.records.append(json.loads(line))
+            except ValueError:
+                reader.records.append(None)
+        reader.index_offset += len(complete)
+        return reader
+
+    def forget(self, session_id):
+        """Drop a session's rate limits, open files and maps (e.g. after it was deleted)."""
+        with self._lock:
+            for key in [key for key in self._students if key[0] == session_id]:
+                del self._students[key]
+            writer = self._writers.pop(session_id, None)
+        if writer:
+            writer.close()
+        with self._read_lock:
+            self._readers.pop(session_id, None)
+            for key in [key for key in self._maps if key[0] == session_id]:
+                self._unmap(self._maps.pop(key))
+
+    def delete_session(self, session_id):
+        """Remove a session's evidence from disk."""
+        self.forget(session_id)
+        if self.enabled:
+            shutil.rmtree(self.session_directory(session_id), ignore_errors=True)
+
+    def close(self):
+        with self._lock:
+            writers = list(self._writers.values())
+            self._writers.clear()
+        for writer in writers:
+            writer.close()
+
+
+# Global store instance
+evidence_store = EvidenceStore()
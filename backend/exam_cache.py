@@ -0,0 +1,116 @@
+"""
+In-memory cache of exam content (questions and MCQ options).
+
+At exam start every student loads the question set at once. The cache builds
+it once per session from DatabaseManager.get_session_questions() and keeps
+the response body pre-serialized, in a student version (answers stripped) and
+an admin version, each with an ETag. Writes to a session's questions must call
+invalidate() so the next request rebuilds it.
+"""
+import asyncio
+import hashlib
+import json
+
+from async_db import async_db
+
+
+class ExamContent:
+    """Pre-serialized question set of one session."""
+
+    __slots__ = ("student_body", "student_etag", "admin_body", "admin_etag", "question_ids")
+
+    def __init__(self, questions):
+        student_questions = [
+            {**question, "options": [
+                {key: value for key, value in option.items() if key != "is_correct"}
+                for option in question["options"]
+            ]}
+            for question in questions
+        ]
+        self.student_body, self.student_etag = self._serialize(student_questions)
+        self.admin_body, self.admin_etag = self._serialize(questions)
+        self.question_ids = frozenset(question["id"] for question in questions)
+
+    @staticmethod
+    def _serialize(questions):
+        body = json.dumps({"status": "success", "questions": questions}, separators=(",", ":")).encode()
+        return body, '"' + hashlib.sha1(body).hexdigest() + '"'
+
+    def response(self, include_answers=False):
+        """Return (body, etag) for students, or for admins with include_answers."""
+        if include_answers:
+            return self.admin_body, self.admin_etag
+        return self.student_body, self.student_etag
+
+
+def etag_matches(if_none_match, etag):
+    """True when an If-None-Match header value lists etag (or is "*").
+
+    Uses the weak comparison HTTP asks for here: a W/ prefix on either side is ignored.
+    """
+    if not if_none_match:
+        return False
+    etag = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ExamContentCache:
+    """Session ID -> ExamContent, built at most once per invalidation.
+
+    Concurrent misses for the same session share one database read. A build
+    that was overtaken by invalidate() is returned to its callers but not
+    stored, so stale content never outlives a write.
+    """
+
+    def __init__(self, database=async_db):
+        self.database = database
+        self._entries = {}
+        self._building = {}
+        self._generations = {}
+
+    async def get(self, session_id):
+        """Return the session's ExamContent, loading it on a miss."""
+        entry = self._entries.get(session_id)
+        if entry is not None:
+            return entry
+
+        build = self._building.get(session_id)
+        if build is None:
+            build = asyncio.ensure_future(self._build(session_id))
+            self._building[session_id] = build
+            build.add_done_callback(lambda done: self._building.get(session_id) is done
+                                    and self._building.pop(session_id))
+        return await asyncio.shield(build)
+
+    async def _build(self, session_id):
+        generation = self._generations.get(session_id, 0)
+        questions = await self.database.get_session_questions(session_id)
+        entry = ExamContent(questions)
+        # Empty sets aren't cached: the session may still be being set up (or the read failed)
+        if questions and self._generations.get(session_id, 0) == generation:
+            self._entries[session_id] = entry
+        return entry
+
+    def invalidate(self, session_id):
+        """Drop a session's cached content after its questions or options changed."""
+        self._generations[session_id] = self._generations.get(session_id, 0) + 1
+        self._entries.pop(session_id, None)
+        # A build in flight read the old content: let the next request start a fresh one
+        self._building.pop(session_id, None)
+
+    def invalidate_question(self, question_id):
+        """Drop the cached session containing question_id, if any."""
+        for session_id, entry in list(self._entries.items()):
+            if question_id in entry.question_ids:
+                self.invalidate(session_id)
+        # The question's session isn't known here, so no build in flight may be kept either
+        for session_id in list(self._building):
+            self.invalidate(session_id)
+
+
+# Global cache instance
+exam_cache = ExamContentCache(async_db)
@@ -0,0 +1,279 @@
+"""
+Admission control and fair scheduling of frame analysis.
+
+Frame analysis is the expensive part of /api/submit-frame, and under load
+every student's frames used to compete for it equally. The scheduler runs
+analyses on a fixed pool of FRAME_WORKERS threads and decides per frame:
+
+- Each student has one lane: at most one analysis in flight and one frame
+  waiting. A newer frame replaces the waiting one ("superseded").
+- Flagged students (see FLAGGED_STATUSES) go first, then students whose last
+  analysis is older than FRAME_MIN_INTERVAL (their guaranteed minimum rate),
+  then everyone else ("surplus").
+- While the pipeline is overloaded (every worker busy and either the
+  measured latency above FRAME_LATENCY_TARGET or as many frames waiting as
+  there are workers), surplus frames
+  of calm students are shed on arrival ("load"), and surplus frames that
+  waited longer than FRAME_MAX_WAIT are shed when their turn comes ("stale").
+
+metrics() reports latency, queue depth, shed counts and the students that
+are currently being degraded. capture_advice() turns the same measurements
+into the capture settings returned to each client, so clients back off
+while the pipeline is hot and speed up for flagged students.
+"""
+import asyncio
+import heapq
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+FRAME_WORKERS = int(os.getenv("FRAME_WORKERS", min(4, os.cpu_count() or 1)))
+FRAME_MIN_INTERVAL = float(os.getenv("FRAME_MIN_INTERVAL", 5.0))
+FRAME_LATENCY_TARGET = float(os.getenv("FRAME_LATENCY_TARGET", 0.5))
+FRAME_MAX_WAIT = float(os.getenv("FRAME_MAX_WAIT", 2.0))
+
+# Client capture interval (seconds) at normal load, and for flagged students
+CAPTURE_INTERVAL = float(os.getenv("CAPTURE_INTERVAL", 1.0))
+CAPTURE_FAST_INTERVAL = float(os.getenv("CAPTURE_FAST_INTERVAL", 0.5))
+# (width, height, JPEG quality) of client screenshots
+CAPTURE_FULL = (640, 480, 0.8)
+CAPTURE_FLAGGED = (640, 480, 0.9)
+CAPTURE_REDUCED = (320, 240, 0.6)
+
+# Statuses whose frames are analysed first (device, multiple faces, away from the screen or camera)
+FLAGGED_STATUSES = frozenset({"Device Detected", "Multiple faces detected", "Distracted", "No face detected"})
+
+# Priority classes, in dispatch order
+FLAGGED, GUARANTEED, SURPLUS = 0, 1, 2
+PRIORITY_NAMES = ("flagged", "guaranteed", "surplus")
+
+LATENCY_ALPHA = 0.2
+LATENCY_WINDOW = 200
+# A student counts as degraded for this long after one of their frames was shed
+DEGRADED_WINDOW = 30.0
+# Lanes idle for longer than this are forgotten
+LANE_TTL = 300.0
+
+
+class FrameShed(Exception):
+    """A frame was not analysed; reason is 'superseded', 'load' or 'stale'."""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class _Lane:
+    """Scheduling state of one student."""
+
+    __slots__ = ("key", "running", "pending", "last_analyzed", "last_seen", "last_shed", "analyzed", "shed")
+
+    def __init__(self, key):
+        self.key = key
+        self.running = False
+        # (priority, enqueued_at, work, future) of the waiting frame
+        self.pending = None
+        self.last_analyzed = None
+        self.last_seen = time.monotonic()
+        self.last_shed = None
+        self.analyzed = 0
+        self.shed = 0
+
+
+class FrameScheduler:
+    """Runs frame analyses on a thread pool, fairly across students and shedding surplus under load."""
+
+    def __init__(self, workers=FRAME_WORKERS, min_interval=FRAME_MIN_INTERVAL,
+                 latency_target=FRAME_LATENCY_TARGET, max_wait=FRAME_MAX_WAIT, executor=None):
+        self.workers = workers
+        self.min_interval = min_interval
+        self.latency_target = latency_target
+        self.max_wait = max_wait
+        self._executor = executor
+        self._lanes = {}
+        self._ready = []
+        self._waiting = 0
+        self._sequence = 0
+        self._in_flight = 0
+        self._latency = 0.0
+        # EMA of the analysis itself, without time spent waiting
+        self.service_latency = 0.0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._analyzed = [0, 0, 0]
+        self._shed = {"superseded": 0, "load": 0, "stale": 0}
+
+    async def run(self, key, work, flagged=False):
+        """Run work() (a blocking callable) for the student `key` when scheduled; return its result.
+
+        Raises FrameShed if the frame was dropped instead.
+        """
+        now = time.monotonic()
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = self._lanes[key] = _Lane(key)
+            self._prune(now)
+        lane.last_seen = now
+
+        if flagged:
+            priority = FLAGGED
+        elif lane.last_analyzed is None or now - lane.last_analyzed >= self.min_interval:
+            priority = GUARANTEED
+        else:
+            priority = SURPLUS
+        if priority == SURPLUS and self.overloaded():
+            self._drop(lane, "load")
+            raise FrameShed("load")
+
+        if lane.pending is not None:
+            self._drop(lane, "superseded", lane.pending[3])
+        future = asyncio.get_running_loop().create_future()
+        lane.pending = (priority, now, work, future)
+        self._waiting += 1
+        if not lane.running:
+            self._push(lane)
+        self._dispatch()
+        return await future
+
+    def overloaded(self) -> bool:
+        """True while every worker is busy and latency is above target or frames are queueing up."""
+        return self._in_flight >= self.workers and (
+            self._latency > self.latency_target or self._waiting >= self.workers)
+
+    def backlogged(self) -> bool:
+        """True while at least as many frames wait as there are workers."""
+        return self._waiting >= self.workers
+
+    def pressure(self) -> float:
+        """Load relative to capacity: 1.0 means latency at target or a full queue."""
+        return max(self._latency / self.latency_target if self.latency_target else 0.0,
+                   self._waiting / self.workers)
+
+    def capture_advice(self, flagged=False) -> dict:
+        """Next capture interval and screenshot size/quality for a client.
+
+        Calm students back off as pressure grows, but never beyond min_interval,
+        their guaranteed analysis rate, so slowing down never leaves blind spots.
+        Flagged students capture faster, at higher quality, unless the pipeline
+        is badly overloaded.
+        """
+        pressure = self.pressure()
+        if flagged:
+            interval = CAPTURE_FAST_INTERVAL if pressure < 2 else CAPTURE_INTERVAL
+            width, height, quality = CAPTURE_FLAGGED
+        else:
+            interval = min(CAPTURE_INTERVAL * max(1.0, pressure), max(CAPTURE_INTERVAL, self.min_interval))
+            width, height, quality = CAPTURE_FULL if pressure < 1 else CAPTURE_REDUCED
+        return {"interval_ms": int(interval * 1000), "width": width, "height": height, "jpeg_quality": quality}
+
+    def forget(self, session_id):
+        """Drop the lanes of a session (keys are (session_id, roll_no))."""
+        for key in [key for key in self._lanes if key[0] == session_id]:
+            lane = self._lanes.pop(key)
+            if lane.pending is not None:
+                self._drop(lane, "superseded", lane.pending[3])
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _push(self, lane):
+        self._sequence += 1
+        heapq.heappush(self._ready, (lane.pending[0], self._sequence, lane))
+
+    def _drop(self, lane, reason, future=None):
+        if future is not None:
+            lane.pending = None
+            self._waiting -= 1
+            if not future.done():
+                future.set_exception(FrameShed(reason))
+        lane.shed += 1
+        lane.last_shed = time.monotonic()
+        self._shed[reason] += 1
+
+    def _dispatch(self):
+        while self._in_flight < self.workers and self._ready:
+            _, _, lane = heapq.heappop(self._ready)
+            # Entries of lanes whose frame was superseded (and re-pushed) or already taken are stale
+            if lane.pending is None or lane.running:
+                continue
+            priority, enqueued_at, work, future = lane.pending
+            if future.cancelled():
+                # The request went away while waiting
+                lane.pending = None
+                self._waiting -= 1
+                continue
+            if priority == SURPLUS and time.monotonic() - enqueued_at > self.max_wait:
+                self._drop(lane, "stale", future)
+                continue
+            lane.pending = None
+            self._waiting -= 1
+            lane.running = True
+            self._in_flight += 1
+            asyncio.ensure_future(self._analyze(lane, priority, enqueued_at, work, future))
+
+    async def _analyze(self, lane, priority, enqueued_at, work, future):
+        started = time.monotonic()
+        try:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="frames")
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, work)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
+        finally:
+            finished = time.monotonic()
+            latency = finished - enqueued_at
+            self._latency = LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * self._latency
+            self.service_latency = LATENCY_ALPHA * (finished - started) + (1 - LATENCY_ALPHA) * self.service_latency
+            self._latencies.append(latency)
+            self._analyzed[priority] += 1
+            lane.analyzed += 1
+            lane.last_analyzed = finished
+            lane.running = False
+            self._in_flight -= 1
+            if lane.pending is not None:
+                self._push(lane)
+            self._dispatch()
+
+    def _prune(self, now):
+        for key, lane in list(self._lanes.items()):
+            if now - lane.last_seen > LANE_TTL and not lane.running and lane.pending is None:
+                del self._lanes[key]
+
+    def metrics(self) -> dict:
+        """Pipeline latency, queue depth, analysed/shed counts and degraded students."""
+        now = time.monotonic()
+        latencies = sorted(self._latencies)
+        degraded = [
+            {
+                "session_id": lane.key[0],
+                "roll_no": lane.key[1],
+                "shed": lane.shed,
+                "analyzed": lane.analyzed,
+                "seconds_since_analysis": round(now - lane.last_analyzed, 1) if lane.last_analyzed else None,
+            }
+            for lane in self._lanes.values()
+            if lane.last_shed is not None and now - lane.last_shed <= DEGRADED_WINDOW
+        ]
+        return {
+            "workers": self.workers,
+            "in_flight": self._in_flight,
+            "queue_depth": self._waiting,
+            "overloaded": self.overloaded(),
+            "latency_ms": round(self._latency * 1000, 1),
+            "service_latency_ms": round(self.service_latency * 1000, 1),
+            "p95_latency_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 1) if latencies else None,
+            "analyzed": dict(zip(PRIORITY_NAMES, self._analyzed)),
+            "shed": dict(self._shed),
+            "students": len(self._lanes),
+            "degraded_students": degraded,
+        }
+
+
+# Global scheduler instance
+frame_scheduler = FrameScheduler()
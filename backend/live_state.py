@@ -0,0 +1,164 @@
+"""
+Live state of running exam sessions.
+
+The store is the one in-memory view of sessions and their students that the
+request handlers use: lookups on the frame/violation hot path are dict reads,
+sessions are loaded from the database the first time they are touched (so
+sessions created by another worker show up too), and every change is written
+through to the database before it is applied in memory.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from async_db import async_db
+from session_stats import StudentStats
+
+# How long an unknown session (or roll number) is remembered as missing before
+# the database is asked again, so bogus IDs can't turn into a read per request
+MISSING_TTL = 5.0
+
+
+@dataclass(slots=True)
+class LiveStudent:
+    roll_no: str
+    status: str = "Not Started"
+    stats: StudentStats = field(default_factory=StudentStats)
+    results: Optional[Dict] = None
+    # Attention scorer of the frames this worker analyzed (created on the first one). With
+    # several workers each smooths only the frames it received, so live scores are exact
+    # only with a single worker; /rescore scores the stored events exactly.
+    scorer: Any = None
+    # time.monotonic() of the last server-side image analysis
+    last_image_at: float = 0.0
+
+
+@dataclass(slots=True)
+class LiveSession:
+    session_id: str
+    exam_type: str = "custom"
+    exam_title: Optional[str] = None
+    exam_description: Optional[str] = None
+    students: Dict[str, LiveStudent] = field(default_factory=dict)
+    loaded_at: float = field(default_factory=time.monotonic)
+
+
+class LiveStateStore:
+    """Session ID -> LiveSession, loaded lazily and kept in step with the database."""
+
+    def __init__(self, database=async_db):
+        self.database = database
+        self._sessions = {}
+        self._missing = {}
+        self._loading = {}
+
+    async def get_session(self, session_id) -> Optional[LiveSession]:
+        """Return a session, loading it from the database on first access."""
+        session = self._sessions.get(session_id)
+        if session is not None:
+            return session
+        if self._missing.get(session_id, 0) > time.monotonic():
+            return None
+        return await self._load(session_id)
+
+    async def get_student(self, session_id, roll_no) -> Optional[LiveStudent]:
+        """Return a student of a session, or None if either is unknown."""
+        session = await self.get_session(session_id)
+        if session is None:
+            return None
+        student = session.students.get(roll_no)
+        if student is None and time.monotonic() - session.loaded_at > MISSING_TTL:
+            # The roster may have grown through another worker since the session was loaded
+            session = await self._load(session_id)
+            student = session.students.get(roll_no) if session else None
+        return student
+
+    async def _load(self, session_id):
+        load = self._loading.get(session_id)
+        if load is None:
+            load = asyncio.ensure_future(self._read(session_id))
+            self._loading[session_id] = load
+            load.add_done_callback(lambda done: self._loading.get(session_id) is done
+                                   and self._loading.pop(session_id))
+        return await asyncio.shield(load)
+
+    async def _read(self, session_id):
+        data = await self.database.get_session_data(session_id)
+        if not data:
+            self._sessions.pop(session_id, None)
+            self._missing[session_id] = time.monotonic() + MISSING_TTL
+            return None
+        self._missing.pop(session_id, None)
+
+        # Keep the students already live (their running stats live only here)
+        known = self._sessions[session_id].students if session_id in self._sessions else {}
+        session = LiveSession(
+            session_id=session_id,
+            exam_type=data.get("exam_type") or "custom",
+            exam_title=data.get("exam_title"),
+            exam_description=data.get("exam_description"),
+        )
+        for roll_no, student_data in data["students"].items():
+            student = known.get(roll_no) or LiveStudent(roll_no)
+            student.status = student_data.get("status") or student.status
+            student.results = student_data.get("results") or student.results
+            session.students[roll_no] = student
+        self._sessions[session_id] = session
+        return session
+
+    async def create_session(self, session_id, students: List[str], exam_type="custom",
+                             exam_title=None, exam_description=None) -> bool:
+        """Create a session in the database, then make it live."""
+        if not await self.database.create_session(session_id, None, students, exam_type, exam_title, exam_description):
+            return False
+        self._missing.pop(session_id, None)
+        self._sessions[session_id] = LiveSession(
+            session_id=session_id,
+            exam_type=exam_type,
+            exam_title=exam_title,
+            exam_description=exam_description,
+            students={roll_no: LiveStudent(roll_no) for roll_no in students},
+        )
+        return True
+
+    async def add_students(self, session_id, roll_nos: List[str]) -> Dict:
+        """Add students to a session (see DatabaseManager.add_students_bulk)."""
+        result = await self.database.add_students_bulk(session_id, roll_nos)
+        session = self._sessions.get(session_id)
+        if session is not None:
+            for roll_no in result["inserted"]:
+                session.students.setdefault(roll_no, LiveStudent(roll_no))
+        return result
+
+    async def set_status(self, session_id, student: LiveStudent, status) -> bool:
+        """Change a student's status; the database is only written when it actually changes."""
+        if student.status == status and status != "Finished":
+            return True
+        if not await self.database.update_student_status(session_id, student.roll_no, status):
+            return False
+        student.status = status
+        return True
+
+    def apply_status(self, session_id, roll_no, status):
+        """Record a status change made by another worker (no database write)."""
+        session = self._sessions.get(session_id)
+        student = session.students.get(roll_no) if session else None
+        if student is not None:
+            student.status = status
+
+    def invalidate(self, session_id):
+        """Note that a session changed elsewhere: forget it is missing and re-read its roster on demand."""
+        self._missing.pop(session_id, None)
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.loaded_at = float("-inf")
+
+    def drop(self, session_id):
+        """Forget a session (after it was deleted)."""
+        self._sessions.pop(session_id, None)
+        self._missing[session_id] = time.monotonic() + MISSING_TTL
+
+
+# Global store instance
+live_state = LiveStateStore(async_db)
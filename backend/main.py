@@ -1,15 +1,35 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, Response, FileResponse
 import uvicorn
+import asyncio
 import json
+import os
+import time
 import uuid
 import base64
+import io
 from app.head_pose import get_head_pose
-from app.analyze_frame import analyze_frame
+from app.analyze_frame import (analyze_frame, analyze_landmarks, create_attention_scorer, HEAD_POSE_YAW_THRESHOLD,
+                               HEAD_POSE_PITCH_THRESHOLD, GAZE_OFF_CENTER_DURATION, SCORE_SMOOTHING_ALPHA)
+from app.batch_scoring import rescore_events
+from app.landmarks import decode_landmarks
+from app.quality import quality_ladder
 import numpy as np
 import cv2
-from database import db
 from auth import auth_manager
+from async_db import async_db, async_auth_manager
+from live_state import live_state
+from session_stats import StudentStats
+from bus import bus
+from timeline import build_timeline, DEFAULT_POINTS
+from exam_cache import exam_cache, etag_matches
+from answer_autosave import answer_autosaver
+from session_deletion import session_deleter
+from frame_scheduler import frame_scheduler, FrameShed, FLAGGED_STATUSES
+from bulk_import import parse_roster, parse_question_bank, roster_report, question_bank_report
+from evidence_store import evidence_store
+from session_recorder import session_recorder
 app = FastAPI()
 
 # --- CORS Middleware ---
@@ -21,13 +41,50 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Edge mode: ask landmark-only clients for a full frame at least this often (seconds)
+LANDMARK_IMAGE_INTERVAL = float(os.getenv("LANDMARK_IMAGE_INTERVAL", 30.0))
+# If set, landmark payloads are also appended to <dir>/<session_id>/<roll_no>.ndjson for replay.py
+LANDMARK_STREAM_DIR = os.getenv("LANDMARK_STREAM_DIR", "")
+
 # --- In-memory data stores (for prototype) ---
-sessions = {}
+# Live session/student state lives in live_state
 active_websockets = {}
 
 # --- WebSocket Manager ---
 async def send_status_update():
-    """Sends the current status of all sessions to all connected admins."""
+    """Asks every worker to send the current status of all sessions to its connected admins."""
+    await bus.publish({"type": "status_update"})
+
+_status_push = None
+_status_push_again = False
+
+def schedule_status_push():
+    """Push status to this worker's admins soon; requests arriving during a push are merged into one more."""
+    global _status_push, _status_push_again
+    if _status_push is not None and not _status_push.done():
+        _status_push_again = True
+        return
+    
+    async def push():
+        global _status_push_again
+        _status_push_again = True
+        while _status_push_again:
+            _status_push_again = False
+            await push_status_to_admins()
+    
+    _status_push = asyncio.ensure_future(push())
+
+async def send_to_admins(message: dict):
+    """Sends a message to this worker's connected admins."""
+    text = json.dumps(message)
+    for websocket in list(active_websockets.get("admin", [])):
+        try:
+            await websocket.send_text(text)
+        except Exception as e:
+            print(f"Error sending to admin: {e}")
+
+async def push_status_to_admins():
+    """Sends the current status of all sessions to this worker's connected admins."""
     if "admin" not in active_websockets or not active_websockets["admin"]:
         return
         
@@ -37,7 +94,7 @@ async def send_status_update():
     
     # Get current sessions from database
     try:
-        sessions_data = db.get_all_sessions()
+        sessions_data = await async_db.get_all_sessions()
     except Exception as e:
         print(f"Error getting sessions data: {e}")
         return
@@ -68,7 +125,7 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
         await websocket.accept()
         print(f"WebSocket connection established for {client_id}")
         if client_id == "admin":
-            await send_status_update()
+            await push_status_to_admins()
 
         while True:
             try:
@@ -85,6 +142,34 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
             active_websockets[client_id].remove(websocket)
         print(f"WebSocket connection closed for {client_id}")
 
+# --- Messages from other workers (and this one) ---
+async def handle_bus_message(message: dict):
+    """Apply a change announced on the bus to this worker's state."""
+    kind = message.get("type")
+    session_id = message.get("session_id")
+    if kind == "status_update":
+        schedule_status_push()
+    elif kind == "student_status":
+        live_state.apply_status(session_id, message["roll_no"], message["status"])
+    elif kind == "session_changed":
+        live_state.invalidate(session_id)
+    elif kind == "session_deleted":
+        live_state.drop(session_id)
+        frame_scheduler.forget(session_id)
+        exam_cache.invalidate(session_id)
+        answer_autosaver.discard(session_id)
+        evidence_store.forget(session_id)
+        session_recorder.forget(session_id)
+    elif kind == "questions_changed":
+        if message.get("question_id") is not None:
+            exam_cache.invalidate_question(message["question_id"])
+        else:
+            exam_cache.invalidate(session_id)
+    elif kind == "violation":
+        await send_to_admins(message)
+
+bus.subscribe(handle_bus_message)
+
 # --- API Endpoints ---
 @app.post("/api/login")
 async def login(data: dict):
@@ -106,17 +191,9 @@ async def start_session(data: dict):
 
     session_id = str(uuid.uuid4())
     
-    # Save to database
-    if db.create_session(session_id, None, students, "custom", exam_title, exam_description):
-        # Also keep in memory for backward compatibility
-        sessions[session_id] = {
-            "exam_type": "custom",
-            "exam_title": exam_title,
-            "exam_description": exam_description,
-            "students": {
-                student: {"status": "Not Started", "events": []} for student in students
-            },
-        }
+    # Save to database (and make the session live)
+    if await live_state.create_session(session_id, students, "custom", exam_title, exam_description):
+        await bus.publish({"type": "session_changed", "session_id": session_id})
         await send_status_update()
         return {"status": "success", "session_id": session_id, "students": students}
     else:
@@ -131,13 +208,12 @@ async def student_login(data: dict):
     if not roll_no or not session_id:
         return {"status": "error", "message": "Roll number and session ID are required"}
 
-    # Check if session exists in database
-    session_data = db.get_session_data(session_id)
-    if not session_data:
+    # Check if session exists
+    if not await live_state.get_session(session_id):
         return {"status": "error", "message": "Session not found"}
     
     # Check if student exists in this session
-    if roll_no not in session_data["students"]:
+    if not await live_state.get_student(session_id, roll_no):
         return {"status": "error", "message": "Student not found in this session"}
     
     return {"status": "success", "message": "Login successful"}
@@ -145,23 +221,21 @@ async def student_login(data: dict):
 @app.get("/api/student-dashboard/{session_id}/{roll_no}")
 async def student_dashboard(session_id: str, roll_no: str):
     """Provides student dashboard details."""
-    # Get session data from database
-    session_data = db.get_session_data(session_id)
-    if not session_data:
+    session = await live_state.get_session(session_id)
+    if not session:
         return {"status": "error", "message": "Session not found"}
     
     # Check if student exists in this session
-    if roll_no not in session_data["students"]:
+    student = await live_state.get_student(session_id, roll_no)
+    if not student:
         return {"status": "error", "message": "Student not found in this session"}
     
-    student_data = session_data["students"][roll_no]
-    
     response_data = {
         "roll_no": roll_no,
-        "proctoring_status": student_data.get("status", "Not Started"),
+        "proctoring_status": student.status,
         "exam_type": "custom",
-        "exam_title": session_data.get("exam_title"),
-        "exam_description": session_data.get("exam_description"),
+        "exam_title": session.exam_title,
+        "exam_description": session.exam_description,
     }
     
     return {
@@ -176,50 +250,162 @@ async def submit_frame(data: dict):
         session_id = data.get("session_id")
         roll_no = data.get("roll_no")
         frame_base64 = data.get("frame")
+        # The scorer runs on arrival time, not analysis time, so scheduling delays don't change results
+        captured_at = time.time()
 
-        if session_id not in sessions or roll_no not in sessions[session_id]["students"]:
+        student = await live_state.get_student(session_id, roll_no)
+        if not student:
             return {"status": "error", "message": "Invalid session ID or roll number"}
 
-        # Convert base64 to numpy array
-        frame_bytes = base64.b64decode(frame_base64.split(",")[-1])  # remove prefix if exists
-        nparr = np.frombuffer(frame_bytes, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        if frame is None:
+        if student.scorer is None:
+            student.scorer = create_attention_scorer()
+
+        def decode_and_analyze():
+            image = image_bytes(frame_base64)
+            frame = decode_image(image)
+            if frame is None:
+                return None
+            result = analyze_frame(frame, student.scorer, timestamp=captured_at)
+            # On the scheduler's thread, so the evidence write stays off the event loop
+            evidence_store.offer(session_id, roll_no, image, proctoring_status(result), result, captured_at)
+            # Only queued (or dropped): encoding happens on the recorder's threads
+            session_recorder.submit(session_id, roll_no, frame, captured_at)
+            return result
+
+        # --- AI Analysis (scheduled fairly across students; may be shed under load) ---
+        try:
+            result = await frame_scheduler.run((session_id, roll_no), decode_and_analyze,
+                                               flagged=student.status in FLAGGED_STATUSES)
+        except FrameShed as shed:
+            return {"status": "success", "proctoring_status": student.status, "skipped": shed.reason,
+                    "capture": frame_scheduler.capture_advice(student.status in FLAGGED_STATUSES)}
+        # Step analysis quality down (or back up) with the measured load
+        quality_ladder.observe(frame_scheduler.service_latency, frame_scheduler.backlogged())
+        if result is None:
             return {"status": "error", "message": "Failed to decode frame"}
-        
-        # --- AI Analysis ---
-        result = analyze_frame(frame)
-        
-        # Determine status
-        if result["num_faces"] == 0:
-            status = "No face detected"
-        elif result["num_faces"] > 1:
-            status = "Multiple faces detected"
-        elif result["state"] in ["distracted", "away"]:
-            status = "Distracted"
-        elif result["state"] == "focused":
-            status = "Focused"
-        else:  # device detected
-            status = "Device Detected"
-
-        # Update status in database
-        db.update_student_status(session_id, roll_no, status)
-        
-        # Save event to database
-        db.save_event(session_id, roll_no, result)
-        
-        # Also update in-memory for backward compatibility
-        sessions[session_id]["students"][roll_no]["status"] = status
-        sessions[session_id]["students"][roll_no]["events"].append(result)
+        student.last_image_at = time.monotonic()
 
-        await send_status_update()
+        status = await record_analysis(session_id, student, result, captured_at)
 
-        return {"status": "success", "proctoring_status": status, "analysis": result}
+        return {"status": "success", "proctoring_status": status, "analysis": result,
+                "capture": frame_scheduler.capture_advice(status in FLAGGED_STATUSES)}
 
     except Exception as e:
         print("Error in /submit-frame:", e)
         return {"status": "error", "message": str(e)}
 
+@app.post("/api/submit-landmarks")
+async def submit_landmarks(data: dict):
+    """Edge mode: score face landmarks computed by the client instead of a full frame.
+
+    Body: session_id, roll_no, landmarks (see app/landmarks.py), width and
+    height of the camera image, and optionally a small JPEG thumbnail for
+    device detection. The response asks for a full frame (request_frame)
+    while the student is flagged or no image was analysed for
+    LANDMARK_IMAGE_INTERVAL seconds.
+    """
+    try:
+        session_id = data.get("session_id")
+        roll_no = data.get("roll_no")
+        captured_at = time.time()
+
+        student = await live_state.get_student(session_id, roll_no)
+        if not student:
+            return {"status": "error", "message": "Invalid session ID or roll number"}
+
+        try:
+            landmarks = decode_landmarks(data.get("landmarks"))
+            width, height = int(data.get("width", 0)), int(data.get("height", 0))
+        except (ValueError, TypeError) as e:
+            return {"status": "error", "message": str(e)}
+        if width <= 0 or height <= 0:
+            return {"status": "error", "message": "Image width and height are required"}
+        thumbnail_base64 = data.get("thumbnail")
+
+        if student.scorer is None:
+            student.scorer = create_attention_scorer()
+
+        def analyze():
+            thumbnail = image_bytes(thumbnail_base64) if thumbnail_base64 else None
+            result = analyze_landmarks(landmarks, width, height, student.scorer,
+                                       decode_image(thumbnail) if thumbnail else None, timestamp=captured_at)
+            if thumbnail:
+                evidence_store.offer(session_id, roll_no, thumbnail, proctoring_status(result), result, captured_at)
+            if LANDMARK_STREAM_DIR:
+                # Runs on the scheduler's thread, one at a time per student, so lines never interleave
+                record_landmarks(session_id, roll_no, {
+                    "timestamp": captured_at, "width": width, "height": height,
+                    "landmarks": data["landmarks"], "thumbnail": thumbnail_base64,
+                    "quality_tier": result["quality_tier"],
+                })
+            return result
+
+        # Scheduled like frames: keeps the student's scorer single-threaded and thumbnails fair
+        try:
+            result = await frame_scheduler.run((session_id, roll_no), analyze,
+                                               flagged=student.status in FLAGGED_STATUSES)
+        except FrameShed as shed:
+            return {"status": "success", "proctoring_status": student.status, "skipped": shed.reason,
+                    "request_frame": False}
+        if thumbnail_base64:
+            student.last_image_at = time.monotonic()
+
+        status = await record_analysis(session_id, student, result, captured_at)
+
+        request_frame = (status in FLAGGED_STATUSES
+                         or time.monotonic() - student.last_image_at >= LANDMARK_IMAGE_INTERVAL)
+        return {"status": "success", "proctoring_status": status, "analysis": result,
+                "request_frame": request_frame}
+
+    except Exception as e:
+        print("Error in /submit-landmarks:", e)
+        return {"status": "error", "message": str(e)}
+
+def record_landmarks(session_id: str, roll_no: str, record: dict):
+    """Append one edge-mode record to the student's landmark stream (see replay.py)."""
+    directory = os.path.join(LANDMARK_STREAM_DIR, session_id.replace("/", "_"))
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, roll_no.replace("/", "_") + ".ndjson"), "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+def image_bytes(image_base64: str) -> bytes:
+    """The bytes of a base64 (or data URL) image."""
+    return base64.b64decode(image_base64.split(",")[-1])  # remove prefix if exists
+
+def decode_image(image: bytes):
+    """Decodes JPEG/PNG bytes into a BGR image; None if they aren't one."""
+    return cv2.imdecode(np.frombuffer(image, np.uint8), cv2.IMREAD_COLOR)
+
+def proctoring_status(result: dict) -> str:
+    """The student status an analysis result leads to."""
+    if result["num_faces"] == 0:
+        return "No face detected"
+    elif result["num_faces"] > 1:
+        return "Multiple faces detected"
+    elif result["state"] in ["distracted", "away"]:
+        return "Distracted"
+    elif result["state"] == "focused":
+        return "Focused"
+    else:  # device detected
+        return "Device Detected"
+
+async def record_analysis(session_id: str, student, result: dict, captured_at: float) -> str:
+    """Store an analysis result: status change, event and running stats. Returns the new status."""
+    status = proctoring_status(result)
+
+    # Update status (written to the database, and announced, only when it changes)
+    if student.status != status and await live_state.set_status(session_id, student, status):
+        await bus.publish({"type": "student_status", "session_id": session_id, "roll_no": student.roll_no,
+                           "status": status})
+
+    # Save event to database (with the time the scorer used, so it can be rescored exactly)
+    result["captured_at"] = captured_at
+    await async_db.save_event(session_id, student.roll_no, result)
+    student.stats.update(result, captured_at)
+
+    await send_status_update()
+    return status
+
 @app.post("/api/submit-violation")
 async def submit_violation(data: dict):
     """Receive and store violations (mouse out, tab switch) from frontend."""
@@ -232,12 +418,14 @@ async def submit_violation(data: dict):
             return {"status": "error", "message": "Session ID, roll number, and violation type are required"}
         
         # Save violation to database
-        db.save_violation(session_id, roll_no, violation_type)
+        await async_db.save_violation(session_id, roll_no, violation_type)
         
-        # Get current counts from database (source of truth)
-        violation_counts = db.get_violation_counts(session_id, roll_no)
+        # Get current counts from database (source of truth; one row per student)
+        violation_counts = await async_db.get_violation_counts(session_id, roll_no)
         
-        # Notify admin via websocket
+        # Notify admins via websocket
+        await bus.publish({"type": "violation", "session_id": session_id, "roll_no": roll_no,
+                           "violation_type": violation_type, "counts": violation_counts})
         await send_status_update()
         
         return {
@@ -252,9 +440,9 @@ async def submit_violation(data: dict):
 
 @app.get("/api/violation-counts/{session_id}/{roll_no}")
 async def get_violation_counts(session_id: str, roll_no: str):
-    """Get current violation counts for a student."""
+    """Get current violation counts for a student (a single row of the counter table)."""
     try:
-        counts = db.get_violation_counts(session_id, roll_no)
+        counts = await async_db.get_violation_counts(session_id, roll_no)
         return {
             "status": "success",
             "counts": counts
@@ -272,51 +460,35 @@ async def stop_session(data: dict):
         if not session_id or not roll_no:
             return {"status": "error", "message": "Session ID and roll number are required"}
 
-        if session_id not in sessions or roll_no not in sessions[session_id]["students"]:
+        student = await live_state.get_student(session_id, roll_no)
+        if not student:
             return {"status": "error", "message": "Invalid session ID or roll number"}
 
-        student_data = sessions[session_id]["students"][roll_no]
-        events = student_data.get("events", [])
-
-        # Calculate results (handle case where no events exist)
-        if not events:
-            results = {
-                "average_attention_score": 0,
-                "distracted_count": 0,
-                "multiple_faces_count": 0,
-                "no_face_count": 0,
-                "device_detected_count": 0,
-                "mouse_out_count": 0,
-                "tab_switch_count": 0,
-            }
+        await answer_autosaver.flush(session_id, roll_no)
+        session_recorder.finish(session_id, roll_no)
+
+        # Results come straight from the running aggregates (all zeros if no frames arrived).
+        # With several workers this one may have seen only some of the frames: aggregate the stored events.
+        if bus.distributed:
+            stats = await async_db.get_student_stats(session_id, roll_no)
+            if stats is None:
+                stats = StudentStats.from_events(await async_db.get_session_events(session_id, roll_no))
         else:
-            attention_scores = [event.get("attention_score", 0) for event in events]
-            distracted_count = sum(1 for event in events if event.get("state", "") in ["distracted", "away"])
-            multiple_faces_count = sum(1 for event in events if event.get("num_faces", 0) > 1)
-            no_face_count = sum(1 for event in events if event.get("num_faces", 0) == 0)
-            device_detected_count = sum(1 for event in events if event.get("device", {}).get("phone_detected", False))
-
-            results = {
-                "average_attention_score": sum(attention_scores) / len(attention_scores) if attention_scores else 0,
-                "distracted_count": distracted_count,
-                "multiple_faces_count": multiple_faces_count,
-                "no_face_count": no_face_count,
-                "device_detected_count": device_detected_count,
-            }
+            stats = student.stats
+        results = stats.results()
         
         # Get violation counts from database
-        violation_counts = db.get_violation_counts(session_id, roll_no)
+        violation_counts = await async_db.get_violation_counts(session_id, roll_no)
         results.update(violation_counts)
 
-        # Update student status to Finished in database
-        db.update_student_status(session_id, roll_no, "Finished")
-        
-        # Save final results to database
-        db.save_session_results(session_id, roll_no, results)
+        # Update student status to Finished
+        await live_state.set_status(session_id, student, "Finished")
+        await bus.publish({"type": "student_status", "session_id": session_id, "roll_no": roll_no, "status": "Finished"})
         
-        # Also update in-memory for backward compatibility
-        sessions[session_id]["students"][roll_no]["status"] = "Finished"
-        sessions[session_id]["students"][roll_no]["results"] = results
+        # Save final results to database, then grade the student's MCQ answers into them
+        await async_db.save_session_results(session_id, roll_no, results)
+        await async_db.grade_session(session_id, [roll_no])
+        student.results = results
 
         await send_status_update()
 
@@ -328,21 +500,35 @@ async def stop_session(data: dict):
 
 @app.delete("/api/session/{session_id}")
 async def delete_session(session_id: str):
-    """Delete a session and all its data."""
+    """Delete a session and all its data.
+    
+    The session disappears right away; its rows are removed in the background.
+    Poll GET /api/session/{session_id}/deletion for progress.
+    """
     try:
-        # Delete from database
-        if db.delete_session(session_id):
-            # Remove from in-memory sessions
-            if session_id in sessions:
-                del sessions[session_id]
+        # Hide in the database and queue the row deletion
+        progress = await session_deleter.request(session_id)
+        if progress:
+            # Remove from every worker's live state
+            await bus.publish({"type": "session_deleted", "session_id": session_id})
+            await asyncio.to_thread(evidence_store.delete_session, session_id)
+            await asyncio.to_thread(session_recorder.delete_session, session_id)
             
             await send_status_update()
-            return {"status": "success", "message": "Session deleted successfully"}
+            return {"status": "success", "message": "Session deleted successfully", "deletion": progress}
         else:
             return {"status": "error", "message": "Failed to delete session from database"}
     except Exception as e:
         return {"status": "error", "message": f"Error deleting session: {str(e)}"}
 
+@app.get("/api/session/{session_id}/deletion")
+async def get_deletion_progress(session_id: str):
+    """Progress of a background session deletion."""
+    progress = await async_db.get_deletion_progress(session_id)
+    if not progress:
+        return {"status": "error", "message": "No deletion requested for this session"}
+    return {"status": "success", "deletion": progress}
+
 # Authentication endpoints
 @app.post("/api/auth/signup")
 async def admin_signup(data: dict):
@@ -354,7 +540,7 @@ async def admin_signup(data: dict):
     if not email or not password or not name:
         return {"status": "error", "message": "Email, password, and name are required"}
     
-    result = auth_manager.create_admin(email, password, name)
+    result = await async_auth_manager.create_admin(email, password, name)
     return result
 
 @app.post("/api/auth/verify-otp")
@@ -366,7 +552,7 @@ async def verify_otp(data: dict):
     if not email or not otp:
         return {"status": "error", "message": "Email and OTP are required"}
     
-    result = auth_manager.verify_otp(email, otp)
+    result = await async_auth_manager.verify_otp(email, otp)
     return result
 
 @app.post("/api/auth/login")
@@ -378,7 +564,7 @@ async def admin_login(data: dict):
     if not email or not password:
         return {"status": "error", "message": "Email and password are required"}
     
-    result = auth_manager.login_admin(email, password)
+    result = await async_auth_manager.login_admin(email, password)
     return result
 
 @app.post("/api/auth/resend-otp")
@@ -389,28 +575,140 @@ async def resend_otp(data: dict):
     if not email:
         return {"status": "error", "message": "Email is required"}
     
-    result = auth_manager.resend_otp(email)
+    result = await async_auth_manager.resend_otp(email)
     return result
 
 @app.get("/api/admin-status")
 async def admin_status():
     """Provides the current status of all sessions to the admin."""
-    return db.get_all_sessions()
+    return await async_db.get_all_sessions()
+
+@app.get("/api/frame-scheduler")
+async def frame_scheduler_metrics():
+    """Frame analysis latency, queue depth, shed frames and degraded students of this worker."""
+    return {"status": "success", "metrics": {**frame_scheduler.metrics(), "quality_tier": quality_ladder.tier.name,
+                                             "recording": session_recorder.metrics()}}
 
 @app.get("/api/session/{session_id}")
 async def get_session(session_id: str):
     """Gets session details."""
-    session_data = db.get_session_data(session_id)
+    session_data = await async_db.get_session_data(session_id)
     if session_data:
         return {"status": "success", "data": session_data}
     return {"status": "error", "message": "Session not found"}
 
 
+EVENTS_PAGE_SIZE = 500
+EVENTS_MAX_PAGE_SIZE = 5000
+
 @app.get("/api/session/{session_id}/events/{roll_no}")
-async def get_session_events(session_id: str, roll_no: str):
-    """Get all events for a specific student session."""
-    events = db.get_session_events(session_id, roll_no)
-    return {"status": "success", "events": events}
+async def get_session_events(session_id: str, roll_no: str, after_id: int = None, limit: int = None,
+                             start: str = None, end: str = None, format: str = "json"):
+    """Get events for a specific student session.
+    
+    - No query parameters: every event in one JSON document (legacy behaviour).
+    - after_id/limit/start/end: one keyset page; pass next_after_id back to get the next one.
+    - format=ndjson: stream every matching event as one JSON object per line.
+    """
+    if format == "ndjson":
+        async def stream_events():
+            async for event in async_db.iter_session_events(session_id, roll_no, after_id or 0, start, end,
+                                                            EVENTS_PAGE_SIZE):
+                yield json.dumps(event) + "\n"
+        
+        return StreamingResponse(stream_events(), media_type="application/x-ndjson")
+    
+    if after_id is None and limit is None and start is None and end is None:
+        events = await async_db.get_session_events(session_id, roll_no)
+        return {"status": "success", "events": events}
+    
+    limit = max(1, min(limit or EVENTS_PAGE_SIZE, EVENTS_MAX_PAGE_SIZE))
+    events = await async_db.get_session_events_page(session_id, roll_no, after_id or 0, limit, start, end)
+    next_after_id = events[-1]["id"] if len(events) == limit else None
+    return {"status": "success", "events": events, "next_after_id": next_after_id}
+
+@app.get("/api/session/{session_id}/timeline/{roll_no}")
+async def get_attention_timeline(session_id: str, roll_no: str, points: int = DEFAULT_POINTS, method: str = "lttb"):
+    """Downsampled attention series (method=lttb or minmax) with per-bucket summaries for charts."""
+    try:
+        timeline = await asyncio.to_thread(build_timeline, session_id, roll_no, points, method)
+        return {"status": "success", "timeline": timeline}
+    except Exception as e:
+        print(f"Error building timeline: {e}")
+        return {"status": "error", "message": str(e)}
+
+@app.get("/api/session/{session_id}/rollups")
+async def get_rollups(session_id: str, roll_no: str = None, minutes: int = 1):
+    """Attention/state/device/violation rollups in buckets of `minutes`, per student or class-wide."""
+    rollups = await async_db.get_rollups(session_id, roll_no, minutes)
+    return {"status": "success", "rollups": rollups}
+
+@app.get("/api/session/{session_id}/analytics")
+async def get_session_analytics(session_id: str):
+    """Per-student totals for the whole session, answered from the rollups."""
+    totals = await async_db.get_rollup_totals(session_id)
+    return {"status": "success", "students": totals}
+
+@app.get("/api/session/{session_id}/rescore")
+async def rescore_session(session_id: str, yaw_threshold: float = HEAD_POSE_YAW_THRESHOLD,
+                          pitch_threshold: float = HEAD_POSE_PITCH_THRESHOLD,
+                          gaze_duration: float = GAZE_OFF_CENTER_DURATION,
+                          smoothing_alpha: float = SCORE_SMOOTHING_ALPHA):
+    """Re-evaluate every student's stored events with other thresholds (nothing is written)."""
+    if not 0 < smoothing_alpha <= 1:
+        return {"status": "error", "message": "smoothing_alpha must be in (0, 1]"}
+    session = await live_state.get_session(session_id)
+    if not session:
+        return {"status": "error", "message": "Session not found"}
+    
+    students = {}
+    for roll_no in session.students:
+        events = await async_db.get_session_events(session_id, roll_no)
+        students[roll_no] = await asyncio.to_thread(rescore_events, events, yaw_threshold, pitch_threshold,
+                                                    gaze_duration, smoothing_alpha)
+    return {"status": "success", "students": students}
+
+# --- Evidence Frames and Recordings ---
+@app.get("/api/session/{session_id}/evidence")
+async def list_evidence(session_id: str, roll_no: str = None, reason: str = None):
+    """Evidence frames kept for a session (see evidence_store.py), oldest first.
+
+    Filter by roll_no and/or reason ("flag", "flagged" or "sample"); fetch
+    an image from /api/session/{session_id}/evidence/{id}.
+    """
+    if not evidence_store.enabled:
+        return {"status": "error", "message": "Evidence store is disabled"}
+    frames = await asyncio.to_thread(evidence_store.frames, session_id, roll_no, reason)
+    for frame in frames:
+        del frame["segment"], frame["offset"]
+    return {"status": "success", "frames": frames}
+
+@app.get("/api/session/{session_id}/evidence/{frame_id}")
+async def get_evidence_frame(session_id: str, frame_id: int):
+    """One evidence image, served straight from the memory-mapped segment."""
+    found = await asyncio.to_thread(evidence_store.read, session_id, frame_id)
+    if found is None:
+        return Response(status_code=404)
+    image, record = found
+    # Frames never change once written
+    return Response(content=image, media_type=record["media_type"],
+                    headers={"Cache-Control": "private, max-age=86400"})
+
+@app.get("/api/session/{session_id}/recordings/{roll_no}")
+async def list_recordings(session_id: str, roll_no: str):
+    """A student's recorded video segments (see session_recorder.py), oldest first."""
+    if not session_recorder.enabled:
+        return {"status": "error", "message": "Recording is disabled"}
+    segments = await asyncio.to_thread(session_recorder.segments, session_id, roll_no)
+    return {"status": "success", "segments": segments}
+
+@app.get("/api/session/{session_id}/recordings/{roll_no}/{name}")
+async def get_recording(session_id: str, roll_no: str, name: str):
+    """One finished video segment; supports range requests for scrubbing."""
+    path = await asyncio.to_thread(session_recorder.segment_path, session_id, roll_no, name)
+    if path is None:
+        return Response(status_code=404)
+    return FileResponse(path)
 
 # --- Custom Exam Question Management ---
 @app.post("/api/session/{session_id}/questions")
@@ -427,7 +725,8 @@ async def add_question(session_id: str, data: dict):
     if question_type not in ["mcq", "essay"]:
         return {"status": "error", "message": "Question type must be 'mcq' or 'essay'"}
     
-    question_id = db.add_question(session_id, question_text, question_type, points, order_index)
+    question_id = await async_db.add_question(session_id, question_text, question_type, points, order_index)
+    await bus.publish({"type": "questions_changed", "session_id": session_id})
     
     if question_id:
         return {"status": "success", "question_id": question_id}
@@ -444,54 +743,162 @@ async def add_mcq_option(question_id: int, data: dict):
     if not option_text:
         return {"status": "error", "message": "Option text is required"}
     
-    success = db.add_mcq_option(question_id, option_text, is_correct, order_index)
+    success = await async_db.add_mcq_option(question_id, option_text, is_correct, order_index)
+    await bus.publish({"type": "questions_changed", "question_id": question_id})
     
     if success:
         return {"status": "success", "message": "Option added successfully"}
     else:
         return {"status": "error", "message": "Failed to add option"}
 
+@app.post("/api/session/{session_id}/import/roster")
+async def import_roster(session_id: str, file: UploadFile = File(...)):
+    """Add students from a roster CSV (one roll number per row, header optional)."""
+    if not await live_state.get_session(session_id):
+        return {"status": "error", "message": "Session not found"}
+    
+    # Parse off the event loop; the upload is read line by line, never whole
+    lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    roll_nos, errors = await asyncio.to_thread(parse_roster, lines)
+    result = await live_state.add_students(session_id, roll_nos) if roll_nos else {"inserted": [], "skipped": []}
+    report = roster_report(result, errors)
+    if report["inserted"]:
+        await bus.publish({"type": "session_changed", "session_id": session_id})
+        await send_status_update()
+    return {"status": "success", **report}
+
+@app.post("/api/session/{session_id}/import/questions")
+async def import_questions(session_id: str, file: UploadFile = File(...), format: str = None):
+    """Add questions and MCQ options from a JSON or CSV question bank."""
+    if not await live_state.get_session(session_id):
+        return {"status": "error", "message": "Session not found"}
+    
+    file_format = format or ("csv" if (file.filename or "").lower().endswith(".csv") else "json")
+    lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    questions, errors = await asyncio.to_thread(parse_question_bank, lines, file_format)
+    question_ids = await async_db.add_questions_bulk(session_id, questions) if questions else []
+    if question_ids:
+        await bus.publish({"type": "questions_changed", "session_id": session_id})
+    return {"status": "success", **question_bank_report(questions, question_ids, errors)}
+
+async def _questions_response(session_id, request, include_answers):
+    """A session's questions from the exam content cache, or a 304 if the client's ETag still matches."""
+    content = await exam_cache.get(session_id)
+    body, etag = content.response(include_answers)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @app.get("/api/session/{session_id}/questions")
-async def get_session_questions(session_id: str):
-    """Get all questions for a session."""
-    questions = db.get_session_questions(session_id)
-    return {"status": "success", "questions": questions}
+async def get_session_questions(session_id: str, request: Request):
+    """Get all questions for a session, without the correct answers.
+    
+    Clients that send the ETag back in If-None-Match get a 304 while the
+    content is unchanged.
+    """
+    return await _questions_response(session_id, request, include_answers=False)
 
-@app.post("/api/session/{session_id}/student/{roll_no}/answer")
-async def submit_answer(session_id: str, roll_no: str, data: dict):
-    """Submit a student's answer to a question."""
+@app.get("/api/admin/session/{session_id}/questions")
+async def get_session_questions_with_answers(session_id: str, request: Request):
+    """Get all questions for a session with is_correct on every MCQ option (admin view)."""
+    return await _questions_response(session_id, request, include_answers=True)
+
+def _parse_answer(data: dict):
+    """Validate one submitted answer; returns (answer tuple, None) or (None, error message)."""
     question_id = data.get("question_id")
     answer_text = data.get("answer_text")
     selected_option_id = data.get("selected_option_id")
     
     if not question_id:
-        return {"status": "error", "message": "Question ID is required"}
+        return None, "Question ID is required"
     
     if not answer_text and not selected_option_id:
-        return {"status": "error", "message": "Either answer text or selected option is required"}
+        return None, "Either answer text or selected option is required"
     
-    success = db.save_student_answer(session_id, roll_no, question_id, answer_text, selected_option_id)
+    return (question_id, answer_text, selected_option_id), None
+
+@app.post("/api/session/{session_id}/student/{roll_no}/answer")
+async def submit_answer(session_id: str, roll_no: str, data: dict):
+    """Submit a student's answer to a question.
+    
+    With "autosave": true the answer is buffered and only the latest value per
+    question is written, after the student pauses typing.
+    """
+    answer, error = _parse_answer(data)
+    if error:
+        return {"status": "error", "message": error}
+    
+    if data.get("autosave"):
+        answer_autosaver.buffer(session_id, roll_no, *answer)
+        return {"status": "success", "message": "Answer autosaved"}
+    
+    success = await answer_autosaver.save_now(session_id, roll_no, [answer])
     
     if success:
         return {"status": "success", "message": "Answer submitted successfully"}
     else:
         return {"status": "error", "message": "Failed to submit answer"}
 
+@app.post("/api/session/{session_id}/student/{roll_no}/answers")
+async def submit_answers(session_id: str, roll_no: str, data: dict):
+    """Submit many answers at once, written in one batch (or buffered with "autosave": true).
+    
+    Invalid answers are reported by their position in the list and skipped.
+    """
+    answers, errors = {}, []
+    for index, item in enumerate(data.get("answers") or []):
+        answer, error = _parse_answer(item if isinstance(item, dict) else {})
+        if error:
+            errors.append({"index": index, "message": error})
+        else:
+            # A later answer to the same question wins
+            answers[answer[0]] = answer
+    
+    if data.get("autosave"):
+        for answer in answers.values():
+            answer_autosaver.buffer(session_id, roll_no, *answer)
+    elif answers and not await answer_autosaver.save_now(session_id, roll_no, list(answers.values())):
+        return {"status": "error", "message": "Failed to submit answers", "errors": errors}
+    
+    return {"status": "success", "saved": len(answers), "errors": errors}
+
 @app.get("/api/session/{session_id}/student/{roll_no}/answers")
 async def get_student_answers(session_id: str, roll_no: str):
     """Get all answers for a student in a session."""
-    answers = db.get_student_answers(session_id, roll_no)
+    await answer_autosaver.flush(session_id, roll_no)
+    answers = await async_db.get_student_answers(session_id, roll_no)
     return {"status": "success", "answers": answers}
 
-# --- Load existing sessions from database on startup ---
-def load_existing_sessions():
-    """Load existing sessions from database into memory for backward compatibility."""
-    global sessions
-    sessions = db.get_all_sessions()
-    print(f"Loaded {len(sessions)} existing sessions from database")
-
-# Load sessions on startup
-load_existing_sessions()
+@app.post("/api/session/{session_id}/grade")
+async def grade_session(session_id: str, data: dict = None):
+    """Grade a session's MCQ answers and fill exam scores.
+    
+    Optional body: {"roll_nos": [...]} to grade some students only, or
+    {"changed_only": true} for students whose answers changed since last grading.
+    """
+    data = data or {}
+    await answer_autosaver.flush(session_id)
+    summary = await async_db.grade_session(session_id, data.get("roll_nos"), bool(data.get("changed_only")))
+    if "error" in summary:
+        return {"status": "error", "message": f"Failed to grade session: {summary['error']}"}
+    return {"status": "success", **summary}
+
+@app.on_event("startup")
+async def start_background_work():
+    """Join the worker bus and pick up session deletions interrupted by a restart."""
+    await bus.start()
+    await session_deleter.resume()
+
+@app.on_event("shutdown")
+async def stop_background_work():
+    """Write buffered autosaves, pause deletions and finish recordings before the server exits."""
+    await answer_autosaver.close()
+    await session_deleter.close()
+    await bus.close()
+    frame_scheduler.close()
+    evidence_store.close()
+    await asyncio.to_thread(session_recorder.close)
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
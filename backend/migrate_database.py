@@ -1,5 +1,6 @@
 import sqlite3
 import os
+from database import DatabaseManager
 
 def migrate_database():
     """Migrate the database to add new columns and tables."""
@@ -69,6 +70,25 @@ def migrate_database():
         conn.rollback()
     finally:
         conn.close()
+    
+    compact_events(db_path)
+
+def compact_events(db_path):
+    """Move legacy raw_data JSON events into typed columns and reclaim the space."""
+    # Opening the manager adds any missing event columns
+    manager = DatabaseManager(db_path)
+    
+    print("\nCompacting legacy event rows...")
+    size_before = os.path.getsize(db_path)
+    converted = manager.compact_legacy_events()
+    print(f"✓ {converted} events converted to compact storage")
+    
+    if converted:
+        conn = sqlite3.connect(db_path)
+        conn.execute("VACUUM")
+        conn.close()
+        size_after = os.path.getsize(db_path)
+        print(f"✓ Database size: {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB")
 
 if __name__ == "__main__":
     migrate_database()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Faster-than-realtime replay of recorded exam streams.
+
+Re-runs recorded webcam videos or landmark streams through the same analysis
+as live processing (analyze_frame / analyze_landmarks with a fresh
+per-student AttentionScorer), driven by the recorded frame timestamps instead
+of the wall clock. Each source is replayed sequentially, since the scorer
+carries state from frame to frame, and sources are spread over a process pool,
+so a batch of disputed incidents is re-analysed as fast as the CPUs allow.
+
+Sources:
+    *.mp4, *.webm, *.avi, ...  video; one frame is sampled every --interval
+                               seconds of video time (the live capture rate)
+    *.ndjson, *.jsonl          landmark stream, one record per line:
+                               {"timestamp": seconds, "width": w, "height": h,
+                                "landmarks": <payload, see app/landmarks.py>,
+                                "thumbnail": optional base64 JPEG,
+                                "quality_tier": optional tier name}
+
+Usage:
+    python replay.py incident1.mp4 incident2.ndjson --workers 4 --out replays/
+"""
+import argparse
+import base64
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from app.analyze_frame import analyze_frame, analyze_landmarks, create_attention_scorer
+from app.landmarks import decode_landmarks
+from app.quality import TIERS
+from session_stats import StudentStats
+
+LANDMARK_STREAM_EXTENSIONS = (".ndjson", ".jsonl")
+DEFAULT_INTERVAL = 1.0
+
+_TIERS_BY_NAME = {tier.name: tier for tier in TIERS}
+
+
+def sample_video(path, interval=DEFAULT_INTERVAL, start=0.0):
+    """Yield (timestamp, frame) for one frame every `interval` seconds of video time, from `start` on."""
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Cannot open video {path}")
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    next_sample = start
+    index = 0
+    try:
+        while True:
+            # grab() skips decoding the frames that aren't sampled
+            if not capture.grab():
+                break
+            timestamp = index / fps
+            index += 1
+            if timestamp + 1e-9 < next_sample:
+                continue
+            ok, frame = capture.retrieve()
+            if not ok:
+                break
+            next_sample += interval
+            yield timestamp, frame
+    finally:
+        capture.release()
+
+
+def replay_video(path, interval=DEFAULT_INTERVAL, tier=TIERS[0]):
+    """Yield (timestamp, result) for one frame every `interval` seconds of the video."""
+    scorer = create_attention_scorer()
+    for timestamp, frame in sample_video(path, interval):
+        yield timestamp, analyze_frame(frame, scorer, tier, timestamp)
+
+
+def replay_landmark_stream(path, tier=TIERS[0]):
+    """Yield (timestamp, result) for every record of a landmark stream."""
+    scorer = create_attention_scorer()
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                landmarks = decode_landmarks(record["landmarks"])
+                timestamp = float(record["timestamp"])
+                width, height = int(record["width"]), int(record["height"])
+            except (ValueError, KeyError, TypeError) as e:
+                raise ValueError(f"{path}:{line_no}: {e}")
+            thumbnail = None
+            if record.get("thumbnail"):
+                thumbnail = cv2.imdecode(np.frombuffer(base64.b64decode(record["thumbnail"].split(",")[-1]),
+                                                       np.uint8), cv2.IMREAD_COLOR)
+            # Live processing recorded the tier it ran at: replay at the same one
+            record_tier = _TIERS_BY_NAME.get(record.get("quality_tier"), tier)
+            yield timestamp, analyze_landmarks(landmarks, width, height, scorer, thumbnail, record_tier, timestamp)
+
+
+def replay_source(path, interval=DEFAULT_INTERVAL, tier_name=TIERS[0].name, out_dir=None):
+    """Replay one source; returns a summary, writing per-frame results to out_dir if given."""
+    tier = _TIERS_BY_NAME[tier_name]
+    if path.lower().endswith(LANDMARK_STREAM_EXTENSIONS):
+        frames = replay_landmark_stream(path, tier)
+    else:
+        frames = replay_video(path, interval, tier)
+
+    stats = StudentStats()
+    states = []
+    out = None
+    if out_dir:
+        out = open(os.path.join(out_dir, os.path.basename(path) + ".results.ndjson"), "w", encoding="utf-8")
+    try:
+        for timestamp, result in frames:
+            stats.update(result, timestamp)
+            states.append(result["state"])
+            if out:
+                out.write(json.dumps({"timestamp": timestamp, **result}, default=float) + "\n")
+    finally:
+        if out:
+            out.close()
+    return {"source": path, "frames": len(states), "states": states, "summary": stats.results()}
+
+
+def replay_sources(paths, workers=None, interval=DEFAULT_INTERVAL, tier_name=TIERS[0].name, out_dir=None):
+    """Replay several sources in parallel (one process per source at a time); returns their summaries in order."""
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    if workers == 1 or len(paths) == 1:
+        return [replay_source(path, interval, tier_name, out_dir) for path in paths]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(replay_source, path, interval, tier_name, out_dir) for path in paths]
+        return [future.result() for future in futures]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded exam videos or landmark streams")
+    parser.add_argument("sources", nargs="+", help="Video files or landmark streams (.ndjson)")
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: CPU count)")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL,
+                        help="Seconds of video between analysed frames (default: 1.0, the live capture rate)")
+    parser.add_argument("--tier", choices=list(_TIERS_BY_NAME), default=TIERS[0].name,
+                        help="Analysis quality tier (landmark records carrying their own tier keep it)")
+    parser.add_argument("--out", help="Directory for per-frame results (<source>.results.ndjson)")
+    args = parser.parse_args()
+
+    for report in replay_sources(args.sources, args.workers, args.interval, args.tier, args.out):
+        summary = report["summary"]
+        print(f"{report['source']}: {report['frames']} frames, "
+              f"average attention {summary['average_attention_score']}, states {summary['state_counts']}")
+
+
+if __name__ == "__main__":
+    main()
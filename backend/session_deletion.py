@@ -0,0 +1,73 @@
+"""
+Background session deletion.
+
+Deleting a large session in one transaction would hold SQLite's write lock
+for as long as it takes to remove millions of event rows, stalling every live
+exam. Instead a deletion request only hides the session (status 'deleting');
+this worker then removes its rows DELETE_CHUNK_SIZE at a time, in short
+transactions on the DB thread, pausing between chunks so frame and violation
+writes get in. Progress is kept in session_deletions, so unfinished deletions
+resume after a restart.
+"""
+import asyncio
+import os
+
+from async_db import async_db
+from database import DELETE_CHUNK_SIZE
+
+# Pause between chunks (seconds)
+DELETE_CHUNK_PAUSE = float(os.getenv("DELETE_CHUNK_PAUSE", 0.05))
+
+
+class SessionDeletionWorker:
+    """Deletes queued sessions one chunk at a time on a background task."""
+
+    def __init__(self, database=async_db, chunk_size=DELETE_CHUNK_SIZE, pause=DELETE_CHUNK_PAUSE):
+        self.database = database
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self._queue = []
+        self._task = None
+
+    async def request(self, session_id):
+        """Hide a session and queue its deletion. Returns its progress, or None if it doesn't exist."""
+        progress = await self.database.mark_session_deleting(session_id)
+        if progress and not progress['done']:
+            self._enqueue(session_id)
+        return progress
+
+    async def resume(self):
+        """Queue deletions left unfinished by a previous run."""
+        for session_id in await self.database.get_pending_deletions():
+            self._enqueue(session_id)
+
+    def _enqueue(self, session_id):
+        if session_id not in self._queue:
+            self._queue.append(session_id)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while self._queue:
+            session_id = self._queue[0]
+            try:
+                progress = await self.database.delete_session_chunk(session_id, self.chunk_size)
+            except Exception as e:
+                progress = None
+                print(f"Error deleting session {session_id}: {e}")
+            if progress is None or progress['done']:
+                # Failed chunks are retried on the next resume() (i.e. after a restart)
+                self._queue.pop(0)
+                if progress:
+                    print(f"Deleted session {session_id} ({progress['deleted_rows']} rows)")
+            await asyncio.sleep(self.pause)
+
+    async def close(self):
+        """Stop deleting; unfinished deletions resume on the next start."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+# Global worker instance
+session_deleter = SessionDeletionWorker(async_db)
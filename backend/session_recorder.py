@@ -0,0 +1,301 @@
+"""
+Background recording of each student's webcam feed.
+
+Frames decoded for analysis are handed to submit(), which only drops a
+reference on a queue (or drops the frame), so recording never adds latency
+to the analysis response. Encoder threads (RECORDING_WORKERS; students are
+sharded over them, so each student's frames are written in order by one
+thread) write them with cv2.VideoWriter into low frame rate segments:
+
+    <RECORDING_DIR>/<session_id>/<roll_no>/<start, unix milliseconds><RECORDING_EXTENSION>
+
+Each frame is held until the next capture (repeated at the recording frame
+rate), so video time follows capture time.
+
+Segments use the first codec browsers can play that this OpenCV build can
+write: H.264 (avc1, .mp4) where its FFmpeg has an H.264 encoder, else VP8
+(.webm). RECORDING_FOURCC/RECORDING_EXTENSION override the choice. A segment ends after RECORDING_SEGMENT_SECONDS, when
+the student's feed pauses for longer than RECORDING_MAX_GAP, when it has
+been idle for RECORDING_IDLE_TIMEOUT, or when the student finishes.
+
+Under backpressure (a full encoder queue) recording frames are dropped and
+counted; analysis frames are never affected.
+"""
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+
+import cv2
+
+# Root directory for recordings; empty disables recording
+RECORDING_DIR = os.getenv("RECORDING_DIR", "")
+RECORDING_FPS = float(os.getenv("RECORDING_FPS", 1.0))
+RECORDING_SEGMENT_SECONDS = float(os.getenv("RECORDING_SEGMENT_SECONDS", 300.0))
+RECORDING_MAX_GAP = float(os.getenv("RECORDING_MAX_GAP", 10.0))
+RECORDING_IDLE_TIMEOUT = float(os.getenv("RECORDING_IDLE_TIMEOUT", 30.0))
+RECORDING_WORKERS = int(os.getenv("RECORDING_WORKERS", 2))
+# Frames waiting per encoder thread before new ones are dropped
+RECORDING_QUEUE_SIZE = int(os.getenv("RECORDING_QUEUE_SIZE", 32))
+# Empty: pick the first of BROWSER_CODECS that can be written (see probe_codec())
+RECORDING_FOURCC = os.getenv("RECORDING_FOURCC", "")
+RECORDING_EXTENSION = os.getenv("RECORDING_EXTENSION", "")
+
+# (fourcc, extension) pairs browsers play, in order of preference
+BROWSER_CODECS = (("avc1", ".mp4"), ("VP80", ".webm"))
+
+
+def probe_codec(candidates=BROWSER_CODECS):
+    """The first (fourcc, extension) this OpenCV build can write, or None."""
+    with tempfile.TemporaryDirectory() as directory:
+        for fourcc, extension in candidates:
+            writer = cv2.VideoWriter(os.path.join(directory, f"probe{extension}"), cv2.VideoWriter_fourcc(*fourcc),
+                                     1, (16, 16))
+            opened = writer.isOpened()
+            writer.release()
+            if opened:
+                return fourcc, extension
+    return None
+
+
+class _Segment:
+    def __init__(self, writer, path, start, size):
+        self.writer = writer
+        self.path = path
+        self.start = start
+        self.size = size
+        self.frames = 0
+        self.last_frame = None
+        self.last_timestamp = start
+        self.last_write = time.monotonic()
+
+
+class _Shard:
+    def __init__(self):
+        # Unbounded so control messages always get in; frames are bounded in submit()
+        self.queue = queue.Queue()
+        self.segments = {}
+        self.thread = None
+
+
+class SessionRecorder:
+    """Encodes students' frames into time-rotated video segments on background threads."""
+
+    def __init__(self, directory=RECORDING_DIR, fps=RECORDING_FPS, segment_seconds=RECORDING_SEGMENT_SECONDS,
+                 max_gap=RECORDING_MAX_GAP, idle_timeout=RECORDING_IDLE_TIMEOUT, workers=RECORDING_WORKERS,
+                 queue_size=RECORDING_QUEUE_SIZE, fourcc=RECORDING_FOURCC, extension=RECORDING_EXTENSION):
+        self.directory = directory
+        self.fps = fps
+        self.segment_seconds = segment_seconds
+        self.max_gap = max_gap
+        self.idle_timeout = idle_timeout
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        if self.enabled and not fourcc:
+            fourcc, probed_extension = probe_codec() or ("mp4v", ".mp4")
+            if fourcc == "mp4v":
+                print("Warning: OpenCV can't write H.264 or VP8 here; recordings (mp4v) won't play in browsers")
+            extension = extension or probed_extension
+        self.fourcc = fourcc
+        self.extension = extension or (".webm" if fourcc.upper().startswith("VP") else ".mp4")
+        self._shards = None
+        self._accepted = {}
+        self._open_paths = set()
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.dropped = 0
+        self.frames_written = 0
+        self.segments_written = 0
+
+    @property
+    def enabled(self):
+        return bool(self.directory)
+
+    def student_directory(self, session_id, roll_no):
+        return os.path.join(self.directory, session_id.replace("/", "_"), roll_no.replace("/", "_"))
+
+    def submit(self, session_id, roll_no, frame, timestamp):
+        """Queue a decoded frame (not copied: don't modify it afterwards); returns whether it was queued.
+
+        Frames arriving faster than the recording frame rate are skipped, and
+        frames that find the encoder queue full are dropped.
+        """
+        if not self.enabled:
+            return False
+        key = (session_id, roll_no)
+        last = self._accepted.get(key)
+        # Half a frame period of slack, so capture jitter doesn't skip every other frame
+        if last is not None and timestamp - last < 0.5 / self.fps:
+            return False
+        shard = self._shard(key)
+        with self._lock:
+            if shard.queue.qsize() >= self.queue_size:
+                self.dropped += 1
+                return False
+            self.submitted += 1
+        self._accepted[key] = timestamp
+        shard.queue.put(("frame", key, frame, timestamp))
+        return True
+
+    def finish(self, session_id, roll_no):
+        """Close the student's current segment (e.g. when they finish the exam)."""
+        if self._shards is not None:
+            self._accepted.pop((session_id, roll_no), None)
+            self._shard((session_id, roll_no)).queue.put(("close", (session_id, roll_no), None, None))
+
+    def forget(self, session_id, timeout=None):
+        """Close every segment of a session; waits up to timeout seconds for the encoders to do so."""
+        if self._shards is None:
+            return
+        for key in list(self._accepted):
+            if key[0] == session_id:
+                self._accepted.pop(key, None)
+        done = []
+        for shard in self._shards:
+            event = threading.Event()
+            shard.queue.put(("close_session", session_id, None, event))
+            done.append(event)
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+            for event in done:
+                event.wait(max(0.0, deadline - time.monotonic()))
+
+    def delete_session(self, session_id):
+        """Stop recording a session and remove its recordings from disk."""
+        self.forget(session_id, timeout=10.0)
+        if self.enabled:
+            shutil.rmtree(os.path.join(self.directory, session_id.replace("/", "_")), ignore_errors=True)
+
+    def segments(self, session_id, roll_no):
+        """A student's segments, oldest first: name, start (unix seconds), bytes and whether it's being written."""
+        directory = self.student_directory(session_id, roll_no)
+        if not self.enabled or not os.path.isdir(directory):
+            return []
+        with self._lock:
+            open_paths = set(self._open_paths)
+        segments = []
+        for name in os.listdir(directory):
+            stem, extension = os.path.splitext(name)
+            if extension != self.extension or not stem.isdigit():
+                continue
+            path = os.path.join(directory, name)
+            segments.append({"name": name, "start": int(stem) / 1000, "bytes": os.path.getsize(path),
+                             "recording": path in open_paths})
+        return sorted(segments, key=lambda segment: segment["start"])
+
+    def segment_path(self, session_id, roll_no, name):
+        """Path of a finished segment, or None if there is no such segment."""
+        for segment in self.segments(session_id, roll_no):
+            if segment["name"] == name and not segment["recording"]:
+                return os.path.join(self.student_directory(session_id, roll_no), name)
+        return None
+
+    def metrics(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "queued": sum(shard.queue.qsize() for shard in self._shards or ()),
+            "submitted": self.submitted,
+            "dropped": self.dropped,
+            "frames_written": self.frames_written,
+            "segments_written": self.segments_written,
+            "open_segments": len(self._open_paths),
+        }
+
+    def close(self):
+        """Finish every open segment and stop the encoder threads."""
+        with self._lock:
+            shards, self._shards = self._shards, None
+        for shard in shards or ():
+            shard.queue.put(None)
+        for shard in shards or ():
+            shard.thread.join()
+
+    def _shard(self, key):
+        if self._shards is None:
+            with self._lock:
+                if self._shards is None:
+                    shards = [_Shard() for _ in range(self.workers)]
+                    for number, shard in enumerate(shards):
+                        shard.thread = threading.Thread(target=self._encode, args=(shard,), daemon=True,
+                                                        name=f"recorder-{number}")
+                        shard.thread.start()
+                    self._shards = shards
+        return self._shards[hash(key) % len(self._shards)]
+
+    def _encode(self, shard):
+        last_idle_check = time.monotonic()
+        while True:
+            try:
+                message = shard.queue.get(timeout=1.0)
+            except queue.Empty:
+                message = ()
+            if message is None:
+                break
+            if message:
+                kind, key, frame, argument = message
+                try:
+                    if kind == "frame":
+                        self._write(shard, key, frame, argument)
+                    elif kind == "close":
+                        self._close_segment(shard, key)
+                    elif kind == "close_session":
+                        for segment_key in [k for k in shard.segments if k[0] == key]:
+                            self._close_segment(shard, segment_key)
+                        argument.set()
+                except Exception as e:
+                    print(f"Error recording {key}: {e}")
+            now = time.monotonic()
+            if now - last_idle_check >= 1.0:
+                last_idle_check = now
+                for key in [k for k, segment in shard.segments.items() if now - segment.last_write >= self.idle_timeout]:
+                    self._close_segment(shard, key)
+        for key in list(shard.segments):
+            self._close_segment(shard, key)
+
+    def _write(self, shard, key, frame, timestamp):
+        segment = shard.segments.get(key)
+        if segment is not None and (timestamp - segment.last_timestamp > self.max_gap
+                                    or timestamp - segment.start >= self.segment_seconds):
+            self._close_segment(shard, key)
+            segment = None
+        if segment is None:
+            directory = self.student_directory(*key)
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"{int(timestamp * 1000)}{self.extension}")
+            size = (frame.shape[1], frame.shape[0])
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*self.fourcc), self.fps, size)
+            if not writer.isOpened():
+                raise RuntimeError(f"cannot open a {self.fourcc} writer for {path}")
+            segment = shard.segments[key] = _Segment(writer, path, timestamp, size)
+            with self._lock:
+                self._open_paths.add(path)
+        # Hold the previous frame up to this one's place in video time; frames ahead of it are skipped
+        due = int(round((timestamp - segment.start) * self.fps)) + 1 - segment.frames
+        if due <= 0:
+            return
+        if (frame.shape[1], frame.shape[0]) != segment.size:
+            # The client changed its capture size (see capture advice): keep the segment's
+            frame = cv2.resize(frame, segment.size)
+        for _ in range(due - 1):
+            segment.writer.write(segment.last_frame)
+        segment.writer.write(frame)
+        segment.last_frame = frame
+        segment.frames += due
+        segment.last_timestamp = timestamp
+        segment.last_write = time.monotonic()
+        with self._lock:
+            self.frames_written += due
+
+    def _close_segment(self, shard, key):
+        segment = shard.segments.pop(key, None)
+        if segment is not None:
+            segment.writer.release()
+            with self._lock:
+                self._open_paths.discard(segment.path)
+                self.segments_written += 1
+
+
+# Global recorder instance
+session_recorder = SessionRecorder()
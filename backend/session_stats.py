@@ -0,0 +1,136 @@
+"""
+Streaming per-student aggregates for proctoring sessions
+"""
+import math
+import time
+from datetime import datetime, timezone
+
+# Gaps longer than this (seconds) between two frames are not credited to the
+# previous state, so a paused or disconnected client doesn't inflate time-in-state.
+MAX_FRAME_GAP = 5.0
+
+DISTRACTED_STATES = ("distracted", "away")
+
+
+class StudentStats:
+    """Running summary of one student's frame analysis results.
+
+    Every frame updates a fixed set of counters, so memory stays constant no
+    matter how long the exam runs. Attention scores are also kept in a
+    101-bucket histogram (one bucket per score point) for percentiles.
+    """
+
+    __slots__ = (
+        "total_events", "score_sum", "score_min", "score_max", "score_histogram",
+        "state_counts", "state_durations", "distracted_count", "multiple_faces_count",
+        "no_face_count", "device_detected_count", "last_state", "last_timestamp",
+    )
+
+    def __init__(self):
+        self.total_events = 0
+        self.score_sum = 0.0
+        self.score_min = None
+        self.score_max = None
+        self.score_histogram = [0] * 101
+        self.state_counts = {}
+        self.state_durations = {}
+        self.distracted_count = 0
+        self.multiple_faces_count = 0
+        self.no_face_count = 0
+        self.device_detected_count = 0
+        self.last_state = None
+        self.last_timestamp = None
+
+    @classmethod
+    def from_events(cls, events):
+        """Rebuild the aggregates from stored events (as returned by get_session_events()).
+        
+        Used when frames of one student may have been processed by several workers.
+        """
+        stats = cls()
+        for event in events:
+            timestamp = event.get("timestamp")
+            if timestamp:
+                timestamp = datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc).timestamp()
+            stats.update(event, timestamp)
+        return stats
+
+    @classmethod
+    def from_totals(cls, total_events, score_sum, score_min, score_max, score_histogram, state_counts,
+                    state_durations, distracted_count, multiple_faces_count, no_face_count, device_detected_count):
+        """Build the aggregates from totals computed elsewhere (e.g. by DatabaseManager.get_student_stats())."""
+        stats = cls()
+        stats.total_events = total_events
+        stats.score_sum = score_sum
+        stats.score_min = score_min
+        stats.score_max = score_max
+        stats.score_histogram = score_histogram
+        stats.state_counts = state_counts
+        stats.state_durations = state_durations
+        stats.distracted_count = distracted_count
+        stats.multiple_faces_count = multiple_faces_count
+        stats.no_face_count = no_face_count
+        stats.device_detected_count = device_detected_count
+        return stats
+
+    def update(self, result, timestamp=None):
+        """Fold one analyze_frame() result into the aggregates."""
+        if timestamp is None:
+            timestamp = time.time()
+
+        score = result.get("attention_score", 0) or 0
+        state = result.get("state", "unknown")
+        num_faces = result.get("num_faces", 0)
+        device = result.get("device") or {}
+
+        self.total_events += 1
+        self.score_sum += score
+        self.score_min = score if self.score_min is None else min(self.score_min, score)
+        self.score_max = score if self.score_max is None else max(self.score_max, score)
+        self.score_histogram[max(0, min(100, int(round(score))))] += 1
+
+        self.state_counts[state] = self.state_counts.get(state, 0) + 1
+        if state in DISTRACTED_STATES:
+            self.distracted_count += 1
+        if num_faces > 1:
+            self.multiple_faces_count += 1
+        elif num_faces == 0:
+            self.no_face_count += 1
+        if device.get("phone_detected", False):
+            self.device_detected_count += 1
+
+        # Credit the time since the previous frame to the previous state
+        if self.last_state is not None:
+            gap = timestamp - self.last_timestamp
+            if 0 < gap <= MAX_FRAME_GAP:
+                self.state_durations[self.last_state] = self.state_durations.get(self.last_state, 0.0) + gap
+        self.last_state = state
+        self.last_timestamp = timestamp
+
+    def percentile(self, q):
+        """Approximate q-th percentile (0-100) of the attention score, to the nearest point."""
+        if not self.total_events:
+            return 0
+        rank = max(1, math.ceil(q / 100 * self.total_events))
+        seen = 0
+        for score, count in enumerate(self.score_histogram):
+            seen += count
+            if seen >= rank:
+                return score
+        return 100
+
+    def results(self):
+        """Return the summary in the shape stored by save_session_results()."""
+        return {
+            "average_attention_score": self.score_sum / self.total_events if self.total_events else 0,
+            "distracted_count": self.distracted_count,
+            "multiple_faces_count": self.multiple_faces_count,
+            "no_face_count": self.no_face_count,
+            "device_detected_count": self.device_detected_count,
+            "min_attention_score": self.score_min or 0,
+            "max_attention_score": self.score_max or 0,
+            "median_attention_score": self.percentile(50),
+            "p10_attention_score": self.percentile(10),
+            "state_counts": dict(self.state_counts),
+            "time_in_state": {state: round(seconds, 2) for state, seconds in self.state_durations.items()},
+        }
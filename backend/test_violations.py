@@ -53,8 +53,18 @@ def test_violation_counts():
     assert counts['tab_switch_count'] == 2, "Final tab_switch_count should be 2"
     print("   ✓ Final counts correct!")
     
+    # Arbitrary violation types get their own counter
+    print("\n6. Adding a custom violation type...")
+    db.save_violation(test_session_id, test_roll_no, "copy_paste")
+    counts = db.get_violation_counts(test_session_id, test_roll_no)
+    print(f"   copy_paste_count = {counts.get('copy_paste_count')}")
+    assert counts.get('copy_paste_count') == 1, "copy_paste_count should be 1"
+    assert counts['mouse_out_count'] == 3, "Other counters must be unaffected"
+    assert db.check_violation_counts(test_session_id) == [], "Counters should match raw violations"
+    print("   ✓ Custom violation types are counted!")
+    
     # Check database directly
-    print("\n6. Verifying database records...")
+    print("\n7. Verifying database records...")
     conn = sqlite3.connect(db.db_path)
     cursor = conn.cursor()
     cursor.execute("""
@@ -74,7 +84,7 @@ def test_violation_counts():
     print("   ✓ Database records match!")
     
     # Cleanup
-    print("\n7. Cleaning up test data...")
+    print("\n8. Cleaning up test data...")
     db.delete_session(test_session_id)
     print("   ✓ Test data cleaned up!")
     
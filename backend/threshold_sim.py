@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+What-if simulator for the attention thresholds.
+
+Loads the stored per-frame features (head pose, gaze, faces, device,
+timestamps) of the selected sessions once into memory-mapped .npy files, one
+(students x frames) matrix per feature, then re-scores every student under
+each combination of a threshold grid with the app.batch_scoring stages.
+Combinations are split across a process pool; the workers map the same
+files, so the features are read from disk once and shared via the page cache.
+
+For each combination and student it reports the average attention score,
+flagged time (seconds in a non-focused state, credited like StudentStats)
+and state counts, next to the current thresholds from app/analyze_frame.py.
+
+Usage:
+    python threshold_sim.py <session_id> [<session_id> ...] \\
+        --yaw 15:40:5 --pitch 10,15,20,25 --gaze 0.5:3:0.5 --alpha 0.05,0.1,0.2 \\
+        --out sweep.csv
+"""
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app.analyze_frame import (HEAD_POSE_YAW_THRESHOLD, HEAD_POSE_PITCH_THRESHOLD, GAZE_OFF_CENTER_DURATION,
+                               SCORE_SMOOTHING_ALPHA)
+from app.batch_scoring import (features_from_events, head_states, gaze_runs, raw_scores, smooth_scores,
+                               STATE_NAMES, FOCUSED)
+from session_stats import MAX_FRAME_GAP
+
+CACHE_DIR = os.getenv("THRESHOLD_SIM_CACHE", "sim_cache")
+
+# Feature matrices and the value that pads rows shorter than the longest one
+FEATURES = {
+    "yaw": (np.float64, np.nan),
+    "pitch": (np.float64, np.nan),
+    "gaze_off": (np.int8, -1),
+    "num_faces": (np.int16, 0),
+    "phone_detected": (np.bool_, False),
+    "timestamps": (np.float64, 0.0),
+}
+
+CURRENT_THRESHOLDS = (HEAD_POSE_YAW_THRESHOLD, HEAD_POSE_PITCH_THRESHOLD, GAZE_OFF_CENTER_DURATION,
+                      SCORE_SMOOTHING_ALPHA)
+
+
+def cache_path(session_ids, cache_dir=CACHE_DIR, database=None):
+    """Cache directory for the sessions as they are now: new events lead to a new directory."""
+    if database is None:
+        from database import db as database
+    versions = [f"{session_id}:{database.get_last_event_id(session_id)}" for session_id in sorted(session_ids)]
+    key = hashlib.sha1("\n".join(versions).encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, key)
+
+
+def build_feature_cache(session_ids, directory, database=None):
+    """Read the sessions' events once and write them as memory-mappable feature matrices."""
+    if database is None:
+        from database import db as database
+    students, rows = [], []
+    for session_id in session_ids:
+        data = database.get_session_data(session_id)
+        if not data:
+            raise ValueError(f"Session {session_id} not found")
+        for roll_no in sorted(data["students"]):
+            events = database.get_session_events(session_id, roll_no)
+            if events:
+                students.append({"session_id": session_id, "roll_no": roll_no})
+                rows.append(features_from_events(events))
+
+    os.makedirs(directory, exist_ok=True)
+    lengths = np.array([len(row["yaw"]) for row in rows], dtype=np.int64)
+    shape = (len(rows), int(lengths.max()) if len(rows) else 0)
+    for name, (dtype, padding) in FEATURES.items():
+        matrix = np.lib.format.open_memmap(os.path.join(directory, f"{name}.npy"), mode="w+",
+                                           dtype=dtype, shape=shape)
+        matrix[:] = padding
+        for i, row in enumerate(rows):
+            matrix[i, :lengths[i]] = row[name]
+        matrix.flush()
+        del matrix
+    np.save(os.path.join(directory, "lengths.npy"), lengths)
+    # Written last: its presence marks a complete cache
+    with open(os.path.join(directory, "students.json"), "w") as f:
+        json.dump(students, f)
+
+
+def open_feature_cache(directory):
+    """Returns (features, lengths, students) with the feature matrices memory-mapped read-only."""
+    with open(os.path.join(directory, "students.json")) as f:
+        students = json.load(f)
+    features = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in FEATURES}
+    return features, np.load(os.path.join(directory, "lengths.npy")), students
+
+
+def simulate(features, lengths, combos):
+    """Score every student under each (yaw, pitch, gaze_duration, alpha) combination.
+
+    Returns float arrays (combos x students): average score and flagged
+    seconds, and int counts (combos x students x states). The score_batch()
+    stages are reused across combinations sharing their thresholds: states
+    depend only on yaw/pitch and gaze runs on no threshold at all, so combos
+    in itertools.product order mostly cost one gaze penalty and one EMA.
+    """
+    valid = np.arange(features["yaw"].shape[1]) < lengths[:, None]
+    frames = np.maximum(lengths, 1)
+    # Time from each frame to the next, credited to the frame's state (as StudentStats does)
+    timestamps = np.asarray(features["timestamps"])
+    gaps = np.diff(timestamps, axis=1)
+    credited = np.where(valid[:, 1:] & (gaps > 0) & (gaps <= MAX_FRAME_GAP), gaps, 0.0)
+    off, run_time = gaze_runs(features["gaze_off"], timestamps)
+
+    averages = np.empty((len(combos), len(lengths)))
+    flagged = np.empty((len(combos), len(lengths)))
+    counts = np.empty((len(combos), len(lengths), len(STATE_NAMES)), dtype=np.int64)
+    head_key = raw_key = None
+    for c, (yaw_threshold, pitch_threshold, gaze_duration, alpha) in enumerate(combos):
+        if head_key != (yaw_threshold, pitch_threshold):
+            head_key, raw_key = (yaw_threshold, pitch_threshold), None
+            states, base = head_states(features["yaw"], features["pitch"], features["num_faces"],
+                                       features["phone_detected"], yaw_threshold, pitch_threshold)
+            head_flagged = (credited * (states[:, :-1] != FOCUSED)).sum(axis=1)
+            head_counts = np.stack([((states == state) & valid).sum(axis=1)
+                                    for state in range(len(STATE_NAMES))], axis=1)
+        if raw_key != gaze_duration:
+            raw_key = gaze_duration
+            raw = raw_scores(base, off, run_time, gaze_duration)
+        # Live results are rounded per frame before they are averaged
+        averages[c] = np.where(valid, np.round(smooth_scores(raw, alpha), 2), 0).sum(axis=1) / frames
+        flagged[c] = head_flagged
+        counts[c] = head_counts
+    return averages, flagged, counts
+
+
+_worker_cache = None
+
+
+def _init_worker(directory):
+    global _worker_cache
+    features, lengths, _ = open_feature_cache(directory)
+    _worker_cache = (features, lengths)
+
+
+def _simulate_chunk(combos):
+    return simulate(*_worker_cache, combos)
+
+
+def run_grid(directory, combos, workers=None, chunk_size=64):
+    """simulate() over a process pool, chunk_size combinations per task."""
+    chunks = [combos[i:i + chunk_size] for i in range(0, len(combos), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(directory,)) as executor:
+        results = list(executor.map(_simulate_chunk, chunks))
+    return tuple(np.concatenate([result[i] for result in results]) for i in range(3))
+
+
+def parse_values(text):
+    """'15,20,25' or 'start:stop:step' (stop inclusive) -> list of floats."""
+    if ":" in text:
+        start, stop, step = (float(part) for part in text.split(":"))
+        return [round(value, 6) for value in np.arange(start, stop + step / 2, step)]
+    return [float(part) for part in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep attention thresholds over stored sessions")
+    parser.add_argument("sessions", nargs="+", help="Session IDs")
+    parser.add_argument("--yaw", default=str(HEAD_POSE_YAW_THRESHOLD), help="Yaw thresholds, e.g. 15:40:5")
+    parser.add_argument("--pitch", default=str(HEAD_POSE_PITCH_THRESHOLD), help="Pitch thresholds")
+    parser.add_argument("--gaze", default=str(GAZE_OFF_CENTER_DURATION), help="Gaze off-center durations (s)")
+    parser.add_argument("--alpha", default=str(SCORE_SMOOTHING_ALPHA), help="Score smoothing alphas")
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: CPU count)")
+    parser.add_argument("--refresh", action="store_true", help="Reload features from the database")
+    parser.add_argument("--top", type=int, default=20, help="Combinations to print (least flagged time first)")
+    parser.add_argument("--out", help="Write per-student results of every combination to this CSV")
+    args = parser.parse_args()
+
+    combos = [CURRENT_THRESHOLDS] + [
+        combo for combo in itertools.product(parse_values(args.yaw), parse_values(args.pitch),
+                                             parse_values(args.gaze), parse_values(args.alpha))
+        if combo != CURRENT_THRESHOLDS
+    ]
+    if any(not 0 < combo[3] <= 1 for combo in combos):
+        parser.error("smoothing alphas must be in (0, 1]")
+
+    directory = cache_path(args.sessions)
+    if args.refresh or not os.path.exists(os.path.join(directory, "students.json")):
+        print(f"Loading features into {directory} ...")
+        build_feature_cache(args.sessions, directory)
+    _, lengths, students = open_feature_cache(directory)
+    if not students:
+        parser.error("the sessions have no events")
+
+    averages, flagged, counts = run_grid(directory, combos, args.workers)
+    print(f"{len(combos)} combinations x {len(students)} students ({int(lengths.sum())} frames)")
+
+    print(f"{'yaw':>6} {'pitch':>6} {'gaze':>6} {'alpha':>6} {'avg score':>10} {'flagged min':>12}  states")
+    order = [0] + sorted(range(1, len(combos)), key=lambda c: flagged[c].sum())[:args.top]
+    for c in order:
+        totals = counts[c].sum(axis=0)
+        states = ", ".join(f"{name} {count}" for name, count in zip(STATE_NAMES, totals) if count)
+        label = "  (current)" if c == 0 else ""
+        print(f"{combos[c][0]:>6g} {combos[c][1]:>6g} {combos[c][2]:>6g} {combos[c][3]:>6g} "
+              f"{averages[c].mean():>10.2f} {flagged[c].sum() / 60:>12.1f}  {states}{label}")
+
+    if args.out:
+        with open(args.out, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["yaw_threshold", "pitch_threshold", "gaze_duration", "smoothing_alpha",
+                             "session_id", "roll_no", "average_attention_score", "flagged_seconds",
+                             "average_change", "flagged_seconds_change"]
+                            + [f"{name}_count" for name in STATE_NAMES])
+            for c, combo in enumerate(combos):
+                for s, student in enumerate(students):
+                    writer.writerow(list(combo) + [student["session_id"], student["roll_no"],
+                                                   round(averages[c, s], 2), round(flagged[c, s], 1),
+                                                   round(averages[c, s] - averages[0, s], 2),
+                                                   round(flagged[c, s] - flagged[0, s], 1)]
+                                    + counts[c, s].tolist())
+        print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Downsampled attention timelines for admin charts.
+
+Loads a student's attention scores and states as NumPy arrays straight from
+the events table (or the session archive) and reduces them to a point budget
+with LTTB (largest-triangle-three-buckets) or min/max bucketing. Each bucket
+also gets summary values and the state changes that happened inside it.
+"""
+import sqlite3
+
+import numpy as np
+
+from database import db
+
+DEFAULT_POINTS = 300
+MAX_POINTS = 5000
+# State-change markers listed per bucket (the total is always reported)
+MAX_MARKERS_PER_BUCKET = 3
+
+
+def load_attention_series(session_id, roll_no, db_path=None):
+    """Return (t, score, state_codes, state_names) arrays for one student, oldest first.
+
+    t is in Unix seconds; state_codes index into state_names.
+    """
+    conn = sqlite3.connect(db_path or db.db_path)
+    try:
+        row = conn.execute('SELECT archive_path FROM archived_sessions WHERE session_id = ?',
+                           (session_id,)).fetchone()
+        t_parts, score_parts, state_parts = [], [], []
+
+        if row:
+            from archive import read_archived_columns
+            arrays = read_archived_columns(row[0], roll_no, ('timestamp', 'attention_score', 'state'))
+            timestamps = np.char.replace(arrays['timestamp'].astype(str), ' ', 'T')
+            t_parts.append(timestamps.astype('datetime64[s]').astype(np.int64).astype(np.float64))
+            score_parts.append(arrays['attention_score'])
+            state_parts.append(arrays['state'].astype(object))
+
+        rows = conn.execute('''
+            SELECT CAST(strftime('%s', timestamp) AS INTEGER), attention_score, state
+            FROM events WHERE session_id = ? AND roll_no = ?
+            ORDER BY id ASC
+        ''', (session_id, roll_no)).fetchall()
+        if rows:
+            t, score, state = zip(*rows)
+            t_parts.append(np.asarray(t, dtype=np.float64))
+            score_parts.append(np.asarray(score, dtype=np.float64))
+            state_parts.append(np.asarray(state, dtype=object))
+    finally:
+        conn.close()
+
+    if not t_parts:
+        return np.empty(0), np.empty(0), np.empty(0, dtype=np.int64), []
+
+    t = np.concatenate(t_parts)
+    score = np.nan_to_num(np.concatenate(score_parts))
+    states = np.concatenate(state_parts)
+    states[(states == None) | (states == '')] = 'unknown'  # noqa: E711 (elementwise comparison)
+    state_names, state_codes = np.unique(states.astype(str), return_inverse=True)
+    return t, score, state_codes, [str(name) for name in state_names]
+
+
+def lttb_indices(x, y, n_out):
+    """Indices of the points kept by largest-triangle-three-buckets downsampling."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Bucket i covers [edges[i], edges[i + 1]); first and last points are always kept
+    every = (n - 2) / (n_out - 2)
+    edges = np.floor(np.arange(n_out - 1) * every).astype(np.int64) + 1
+    edges[-1] = n - 1
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_lo, next_hi = edges[i + 1], edges[i + 2]
+        else:
+            next_lo, next_hi = n - 1, n
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = y[next_lo:next_hi].mean()
+        # Twice the triangle area between the last kept point, each candidate and the next bucket's mean
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(y, n_buckets):
+    """Indices of the min and max point of each of n_buckets equal-count buckets, in time order."""
+    n = len(y)
+    if 2 * n_buckets >= n:
+        return np.arange(n)
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)[:-1]
+    bucket = np.repeat(np.arange(n_buckets), np.diff(np.append(edges, n)))
+    # First position in each bucket that equals the bucket's min (resp. max)
+    picked = []
+    for extreme in (np.minimum.reduceat(y, edges), np.maximum.reduceat(y, edges)):
+        hits = np.flatnonzero(y == extreme[bucket])
+        _, first = np.unique(bucket[hits], return_index=True)
+        picked.append(hits[first])
+    return np.unique(np.concatenate(picked))
+
+
+def summarize_buckets(t, score, state_codes, state_names, edges):
+    """Per-bucket summary values and state-change markers; edges are bucket start indices."""
+    n = len(t)
+    counts = np.diff(np.append(edges, n))
+    bucket = np.repeat(np.arange(len(edges)), counts)
+
+    sums = np.add.reduceat(score, edges)
+    mins = np.minimum.reduceat(score, edges)
+    maxs = np.maximum.reduceat(score, edges)
+    state_hist = np.zeros((len(edges), max(1, len(state_names))), dtype=np.int64)
+    np.add.at(state_hist, (bucket, state_codes), 1)
+    dominant = state_hist.argmax(axis=1)
+
+    changes = np.flatnonzero(state_codes[1:] != state_codes[:-1]) + 1
+    change_bucket = bucket[changes]
+    change_counts = np.bincount(change_bucket, minlength=len(edges))
+
+    buckets = []
+    for i, start in enumerate(edges):
+        end = start + counts[i] - 1
+        markers = changes[change_bucket == i][:MAX_MARKERS_PER_BUCKET]
+        buckets.append({
+            "t_start": float(t[start]),
+            "t_end": float(t[end]),
+            "count": int(counts[i]),
+            "mean_attention": round(float(sums[i] / counts[i]), 2),
+            "min_attention": round(float(mins[i]), 2),
+            "max_attention": round(float(maxs[i]), 2),
+            "dominant_state": state_names[dominant[i]],
+            "state_changes": int(change_counts[i]),
+            "markers": [
+                {"t": float(t[j]), "from": state_names[state_codes[j - 1]], "to": state_names[state_codes[j]]}
+                for j in markers
+            ],
+        })
+    return buckets
+
+
+def build_timeline(session_id, roll_no, points=DEFAULT_POINTS, method="lttb", db_path=None):
+    """Downsample one student's attention series to about `points` points."""
+    points = max(3, min(int(points), MAX_POINTS))
+    t, score, state_codes, state_names = load_attention_series(session_id, roll_no, db_path)
+    n = len(t)
+    if n == 0:
+        return {"method": method, "total_events": 0, "t": [], "attention_score": [], "buckets": []}
+
+    if method == "minmax":
+        n_buckets = max(1, points // 2)
+        indices = minmax_indices(score, n_buckets)
+        edges = np.unique(np.linspace(0, n, min(n_buckets, n) + 1).astype(np.int64)[:-1])
+    else:
+        method = "lttb"
+        indices = lttb_indices(t, score, points)
+        # Summaries use the same buckets LTTB picked from (first/last points fold into their neighbours)
+        if len(indices) < n:
+            every = (n - 2) / (points - 2)
+            edges = np.floor(np.arange(points - 2) * every).astype(np.int64) + 1
+            edges[0] = 0
+        else:
+            edges = np.arange(n)
+
+    return {
+        "method": method,
+        "total_events": n,
+        "t": t[indices].tolist(),
+        "attention_score": np.round(score[indices], 2).tolist(),
+        "state": [state_names[c] for c in state_codes[indices]],
+        "buckets": summarize_buckets(t, score, state_codes, state_names, edges),
+    }
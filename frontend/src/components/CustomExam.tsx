@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 
 interface Question {
@@ -35,6 +35,8 @@ export default function CustomExam({ sessionId, rollNo, examTitle, examDescripti
   const [isLoading, setIsLoading] = useState(true);
   const [isSubmitting] = useState(false);
   const [error, setError] = useState('');
+  // One pending autosave per question, so typing in one doesn't cancel another's
+  const autosaveTimers = useRef<Record<number, ReturnType<typeof setTimeout>>>({});
 
   useEffect(() => {
     fetchQuestions();
@@ -64,6 +66,19 @@ export default function CustomExam({ sessionId, rollNo, examTitle, examDescripti
         ...(type === 'text' ? { answer_text: value as string } : { selected_option_id: value as number })
       }
     }));
+
+    // Autosave essays while typing; the server keeps only the latest text per question
+    if (type === 'text') {
+      clearTimeout(autosaveTimers.current[questionId]);
+      autosaveTimers.current[questionId] = setTimeout(() => {
+        delete autosaveTimers.current[questionId];
+        axios.post(`http://127.0.0.1:8000/api/session/${sessionId}/student/${rollNo}/answer`, {
+          question_id: questionId,
+          answer_text: value,
+          autosave: true
+        }).catch(error => console.error('Error autosaving answer:', error));
+      }, 500);
+    }
   };
 
   const handleSubmitAnswer = async (questionId: number) => {
@@ -252,7 +252,7 @@ export default function AdminDashboard() {
                 <div className="grid grid-cols-2 md:grid-cols-3 gap-4 text-sm">
                   <div className="bg-gradient-to-br from-green-50 to-green-100 p-4 rounded-lg border border-green-200">
                     <p className="font-medium text-green-700 mb-1">Average Attention</p>
-                    <p className="font-bold text-2xl text-green-800">{studentData.results.average_attention_score.toFixed(1)}%</p>
+                    <p className="font-bold text-2xl text-green-800">{(studentData.results.average_attention_score ?? 0).toFixed(1)}%</p>
                   </div>
                   <div className="bg-gradient-to-br from-red-50 to-red-100 p-4 rounded-lg border border-red-200">
                     <p className="font-medium text-red-700 mb-1">Distractions</p>
@@ -282,6 +282,12 @@ export default function AdminDashboard() {
                     <p className="font-medium text-blue-700 mb-1">Total Events</p>
                     <p className="font-bold text-2xl text-blue-800">{studentData.results.total_events || 0}</p>
                   </div>
+                  {studentData.results.total_possible_points > 0 && (
+                    <div className="bg-gradient-to-br from-teal-50 to-teal-100 p-4 rounded-lg border border-teal-200">
+                      <p className="font-medium text-teal-700 mb-1">Exam Score</p>
+                      <p className="font-bold text-2xl text-teal-800">{studentData.results.exam_score ?? 0} / {studentData.results.total_possible_points}</p>
+                    </div>
+                  )}
                 </div>
               </div>
             )}
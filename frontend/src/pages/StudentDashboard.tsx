@@ -23,6 +23,8 @@ export default function StudentDashboard() {
   const lastMouseOutRef = useRef<number>(0);
   const lastTabSwitchRef = useRef<number>(0);
   const isSubmittingViolationRef = useRef(false);
+  const captureRef = useRef({ interval_ms: 1000, width: 640, height: 480, jpeg_quality: 0.8 });
+  const [captureQuality, setCaptureQuality] = useState(0.8);
 
   // Fetch session data
   useEffect(() => {
@@ -239,26 +241,45 @@ export default function StudentDashboard() {
     return () => clearInterval(interval);
   }, [sessionId, rollNo, isTestEnded]);
 
-  // Frame submission interval
+  // Frame submission loop; the server recommends the next capture interval and screenshot size/quality
   useEffect(() => {
-    const interval = setInterval(() => {
-      if (webcamRef.current && session && !isTestEnded) {
-        const frame = webcamRef.current.getScreenshot();
-        axios.post("http://127.0.0.1:8000/api/submit-frame", {
-          session_id: sessionId,
-          roll_no: rollNo,
-          frame: frame,
-        }).then(response => {
-          setProctoringStatus(response.data.proctoring_status || 'Monitoring...');
-        }).catch(err => {
-          console.error('Error submitting frame:', err);
-          setProctoringStatus('Connection Error');
-        });
+    let timeout: NodeJS.Timeout | null = null;
+    let cancelled = false;
+
+    const scheduleNext = () => {
+      if (!cancelled) {
+        timeout = setTimeout(submitFrame, captureRef.current.interval_ms);
       }
-    }, 1000);
+    };
+
+    const submitFrame = () => {
+      if (!webcamRef.current || !session || isTestEnded) {
+        scheduleNext();
+        return;
+      }
+      const { width, height } = captureRef.current;
+      const frame = webcamRef.current.getScreenshot({ width, height });
+      axios.post("http://127.0.0.1:8000/api/submit-frame", {
+        session_id: sessionId,
+        roll_no: rollNo,
+        frame: frame,
+      }).then(response => {
+        setProctoringStatus(response.data.proctoring_status || 'Monitoring...');
+        if (response.data.capture) {
+          captureRef.current = response.data.capture;
+          setCaptureQuality(response.data.capture.jpeg_quality);
+        }
+      }).catch(err => {
+        console.error('Error submitting frame:', err);
+        setProctoringStatus('Connection Error');
+      }).finally(scheduleNext);
+    };
+
+    scheduleNext();
 
     return () => {
-      clearInterval(interval);
+      cancelled = true;
+      if (timeout) clearTimeout(timeout);
     };
   }, [sessionId, rollNo, session, isTestEnded]);
 
@@ -457,6 +478,7 @@ export default function StudentDashboard() {
                       audio={false}
                       ref={webcamRef}
                       screenshotFormat="image/jpeg"
+                      screenshotQuality={captureQuality}
                       className="absolute inset-0 w-full h-full object-cover"
                     />
                     <div className="absolute inset-0 bg-gradient-to-t from-black/20 to-transparent"></div>
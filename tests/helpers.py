@@ -0,0 +1,70 @@
+"""Fixtures shared by several test modules."""
+import time
+import cv2
+import numpy as np
+
+def random_events(rng, count):
+    """analyze_frame()-shaped results of one student, captured at irregular intervals."""
+    events = []
+    timestamp = 1000.0
+    for _ in range(count):
+        timestamp += rng.uniform(0.2, 1.5)
+        num_faces = int(rng.choice([0, 1, 1, 1, 2]))
+        events.append({
+            "num_faces": num_faces,
+            "head_pose": {"yaw": rng.normal(0, 25), "pitch": rng.normal(0, 15), "roll": 0} if num_faces else None,
+            "gaze": None if rng.random() < 0.1 else {"direction": str(rng.choice(["center", "left", "right"])),
+                                                     "confidence": 0.8},
+            "device": {"phone_detected": bool(rng.random() < 0.1)},
+            "captured_at": timestamp,
+        })
+    return events
+
+_FACE = {"yaw": 0.0, "pitch": 0.0, "roll": 0.0}
+_CENTER = {"direction": "center", "confidence": 0.9}
+_NO_DEVICE = {"phone_detected": False, "bbox": None, "confidence": 0.0}
+
+# Detections that frame_features_by_brightness() gives frames of each brightness level
+BRIGHTNESS_FEATURES = {
+    0: {"num_faces": 2, "head_pose": _FACE, "gaze": _CENTER, "device": _NO_DEVICE},
+    80: {"num_faces": 1, "head_pose": _FACE, "gaze": _CENTER, "device": _NO_DEVICE},
+    160: {"num_faces": 1, "head_pose": {**_FACE, "yaw": 60.0}, "gaze": {**_CENTER, "direction": "left"},
+          "device": _NO_DEVICE},
+    240: {"num_faces": 1, "head_pose": _FACE, "gaze": _CENTER,
+          "device": {"phone_detected": True, "bbox": [10, 10, 20, 40], "confidence": 0.8}},
+}
+
+def frame_features_by_brightness(frame, tier=None):
+    """Stands in for app.analyze_frame.frame_features on synthetic videos (picklable, for process pools).
+
+    A frame gets the detections of the nearest BRIGHTNESS_FEATURES level.
+    Dark frames take longer, so a pool finishes frames out of order.
+    """
+    level = min(BRIGHTNESS_FEATURES, key=lambda level: abs(level - float(frame.mean())))
+    time.sleep(0.02 if level == 0 else 0.0)
+    return {**BRIGHTNESS_FEATURES[level], "quality_tier": tier.name if tier else "high"}
+
+# The head pose model points (app/head_pose.py) by FaceMesh landmark, as labelled on the flipped image
+MODEL_POINTS = {1: (0, 0, 0), 152: (0, -330, -65), 263: (-225, 170, -135),
+                33: (225, 170, -135), 287: (-150, -150, -125), 57: (150, -150, -125)}
+
+def face_landmarks(yaw=0.0, iris_x=0.42, width=640, height=480):
+    """(1, 478, 3) landmarks of the unflipped camera image of a face turned by yaw degrees.
+
+    The model points are projected as the server sees them on the flipped
+    (selfie-view) image, where head_pose_from_landmarks() measures the given
+    yaw, then mirrored back with the left/right corners swapping labels.
+    iris_x places the iris landmarks: with the inner eye corner (133) at 0.45,
+    the default looks to the center and 0.44 looks left.
+    """
+    camera = np.array([[width, 0, width / 2], [0, width, height / 2], [0, 0, 1]], np.float64)
+    projected, _ = cv2.projectPoints(np.array(list(MODEL_POINTS.values()), np.float64),
+                                     np.array([0.0, np.radians(yaw), 0.0]), np.array([0.0, 0.0, -2000.0]),
+                                     camera, np.zeros(4))
+    labels = {33: 263, 263: 33, 57: 287, 287: 57}
+    points = np.full((1, 478, 3), 0.5, np.float32)
+    for index, (u, v) in zip(MODEL_POINTS, projected[:, 0]):
+        points[0, labels.get(index, index)] = (1.0 - u / width, v / height, 0.0)
+    points[0, 133, 0] = 0.45
+    points[0, 473:478, 0] = iris_x
+    return points
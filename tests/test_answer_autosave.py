@@ -0,0 +1,75 @@
+import asyncio
+import unittest
+from answer_autosave import AnswerAutosaver
+
+class FakeDatabase:
+    def __init__(self):
+        self.batches = []
+
+    async def save_student_answers(self, answers):
+        self.batches.append(list(answers))
+        return True
+
+class SlowFailingDatabase(FakeDatabase):
+    """First write takes a while and fails."""
+
+    def __init__(self):
+        super().__init__()
+        self.fail = True
+        self.writing = asyncio.Event()
+
+    async def save_student_answers(self, answers):
+        if self.fail:
+            self.writing.set()
+            await asyncio.sleep(0.01)
+            return False
+        return await super().save_student_answers(answers)
+
+class TestAnswerAutosaver(unittest.TestCase):
+
+    def test_rapid_saves_coalesce_to_last(self):
+        database = FakeDatabase()
+        autosaver = AnswerAutosaver(database, debounce=0.02, max_delay=1.0)
+
+        async def run():
+            for text in ("h", "he", "hel", "hello"):
+                autosaver.buffer("s1", "r1", 7, text)
+                await asyncio.sleep(0.001)
+            await asyncio.sleep(0.1)
+
+        asyncio.run(run())
+        self.assertEqual(database.batches, [[("s1", "r1", 7, "hello", None)]])
+
+    def test_save_now_supersedes_buffered_answer(self):
+        database = FakeDatabase()
+        autosaver = AnswerAutosaver(database, debounce=10, max_delay=10)
+
+        async def run():
+            autosaver.buffer("s1", "r1", 7, "draft")
+            await autosaver.save_now("s1", "r1", [(7, "final", None)])
+            await autosaver.close()
+
+        asyncio.run(run())
+        self.assertEqual(database.batches, [[("s1", "r1", 7, "final", None)]])
+
+    def test_failed_flush_keeps_newer_saved_answer(self):
+        database = SlowFailingDatabase()
+        autosaver = AnswerAutosaver(database, debounce=10, max_delay=10)
+
+        async def run():
+            autosaver.buffer("s1", "r1", 7, "draft")
+            autosaver.buffer("s1", "r1", 8, "other draft")
+            flushing = asyncio.create_task(autosaver.flush())
+            await database.writing.wait()
+            database.fail = False
+            self.assertTrue(await autosaver.save_now("s1", "r1", [(7, "final", None)]))
+            self.assertFalse(await flushing)
+            await autosaver.close()
+
+        asyncio.run(run())
+        # The failed drafts come back for the next flush, except the one save_now replaced
+        self.assertEqual(database.batches, [[("s1", "r1", 7, "final", None)],
+                                            [("s1", "r1", 8, "other draft", None)]])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from archive import SessionArchiver, read_archived_violations
+from database import DatabaseManager
+
+def make_event(i):
+    return {
+        "num_faces": i % 3,
+        "head_pose": {"yaw": i * 1.5, "pitch": -2.0, "roll": 0.5} if i % 3 else None,
+        "gaze": {"direction": "left" if i % 2 else "center", "confidence": 0.75} if i % 4 else None,
+        "device": {"phone_detected": i % 5 == 0, "bbox": [i, 2, 30, 40] if i % 5 == 0 else None,
+                   "confidence": 0.9 if i % 5 == 0 else 0.0},
+        "attention_score": 50.0 + i % 50,
+        "state": "away" if i % 7 == 0 else "focused",
+        "captured_at": 1000.0 + i,
+    }
+
+class ArchiveTestCase(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.database = DatabaseManager(os.path.join(directory, "archive.db"))
+        self.database.create_session("s1", students=["r1", "r2"])
+        for i in range(60):
+            self.database.save_event("s1", "r1" if i % 3 else "r2", make_event(i))
+        self.live = {roll_no: self.database.get_session_events("s1", roll_no) for roll_no in ("r1", "r2")}
+        self.archiver = SessionArchiver(self.database, os.path.join(directory, "archive"))
+
+class TestSessionArchiver(ArchiveTestCase):
+
+    def test_round_trip(self):
+        for violation_type in ("tab_switch", "mouse_out", "tab_switch"):
+            self.database.save_violation("s1", "r1", violation_type)
+        counts = self.database.get_violation_counts("s1", "r1")
+
+        manifest = self.archiver.archive_session("s1")
+        self.assertEqual((manifest["event_count"], manifest["violation_count"]), (60, 3))
+        self.assertTrue(os.path.exists(manifest["archive_path"]))
+        conn = sqlite3.connect(self.database.db_path)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM events").fetchone()[0], 0)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM violations").fetchone()[0], 0)
+        conn.close()
+
+        # Every value comes back as SQLite returned it, NULLs included
+        for roll_no, events in self.live.items():
+            self.assertEqual(self.database.get_session_events("s1", roll_no), events)
+        self.assertEqual([violation["violation_type"] for violation in
+                          read_archived_violations(manifest["archive_path"], "r1")],
+                         ["tab_switch", "mouse_out", "tab_switch"])
+        self.assertEqual(self.database.get_violation_counts("s1", "r1"), counts)
+        self.assertIsNone(self.archiver.archive_session("s1"))
+
+class TestArchivedPages(ArchiveTestCase):
+
+    def test_pages_match_live_pages(self):
+        self.archiver.archive_session("s1")
+        for roll_no, events in self.live.items():
+            pages, after_id = [], 0
+            while True:
+                page = self.database.get_session_events_page("s1", roll_no, after_id, limit=7)
+                if not page:
+                    break
+                pages.append(page)
+                after_id = page[-1]["id"]
+            self.assertTrue(all(len(page) == 7 for page in pages[:-1]))
+            self.assertEqual([event for page in pages for event in page], events)
+
+    def test_pages_continue_into_live_events(self):
+        self.archiver.archive_session("s1")
+        self.database.save_event("s1", "r1", make_event(100))
+        page = self.database.get_session_events_page("s1", "r1", self.live["r1"][-3]["id"], limit=5)
+        self.assertEqual([event["captured_at"] for event in page], [1058.0, 1059.0, 1100.0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+from async_db import AsyncDatabaseManager
+from database import DatabaseManager
+
+class Recorder:
+    """Stands in for a manager: records which thread ran each call, in order."""
+
+    limit = 3
+
+    def __init__(self):
+        self.calls = []
+
+    def slow(self, name, seconds=0.05):
+        time.sleep(seconds)
+        self.calls.append((name, threading.current_thread().name))
+        return name
+
+    def fail(self):
+        raise ValueError("bad call")
+
+    def _private(self):
+        return "private"
+
+class TestAsyncFacade(unittest.TestCase):
+
+    def setUp(self):
+        self.recorder = Recorder()
+        self.facade = AsyncDatabaseManager(self.recorder)
+
+    def tearDown(self):
+        self.facade.shutdown()
+
+    def test_calls_run_in_order_on_one_db_thread(self):
+        async def run():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0.005)
+
+            task = asyncio.ensure_future(ticker())
+            results = await asyncio.gather(*(self.facade.slow(f"call {i}") for i in range(5)))
+            task.cancel()
+            return results, ticks, threading.current_thread().name
+
+        results, ticks, loop_thread = asyncio.run(run())
+        self.assertEqual(results, [f"call {i}" for i in range(5)])
+        self.assertEqual([name for name, _ in self.recorder.calls], results)
+        threads = {thread for _, thread in self.recorder.calls}
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads.pop().startswith("db"))
+        self.assertFalse(loop_thread.startswith("db"))
+        # The event loop kept running while the calls slept on the DB thread
+        self.assertGreater(ticks, 10)
+
+    def test_passes_through_errors_and_attributes(self):
+        with self.assertRaises(ValueError):
+            asyncio.run(self.facade.fail())
+        self.assertEqual(self.facade.limit, 3)
+        self.assertEqual(self.facade._private(), "private")
+        self.assertIs(self.facade.sync, self.recorder)
+        # The coroutine wrapper is built once
+        self.assertIs(self.facade.slow, self.facade.slow)
+
+    def test_database_manager(self):
+        database = AsyncDatabaseManager(DatabaseManager(os.path.join(tempfile.mkdtemp(), "async.db")))
+
+        async def run():
+            await database.create_session("s1", None, ["r1"], "custom", "Exam", None)
+            await asyncio.gather(*(database.save_violation("s1", "r1", "tab_switch") for _ in range(20)))
+            return await database.get_violation_counts("s1", "r1")
+
+        try:
+            self.assertEqual(asyncio.run(run())["tab_switch_count"], 20)
+        finally:
+            database.shutdown()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -54,5 +54,15 @@ class TestAttentionScorer(unittest.TestCase):
         self.assertEqual(state, "device_detected")
         self.assertEqual(score, 50)
 
+    def test_gaze_duration_uses_frame_timestamps(self):
+        head_pose = {"yaw": 0, "pitch": 0, "roll": 0}
+        gaze = {"direction": "left", "confidence": 0.9}
+        scores = [
+            self.scorer.calculate_attention_score(head_pose, gaze, {"phone_detected": False}, 1, timestamp)[0]
+            for timestamp in (100.0, 101.0, 101.6)
+        ]
+        # No sleeping: only the frame timestamps decide when the gaze penalty applies
+        self.assertEqual(scores, [100, 100, 75])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,86 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+import cv2
+import numpy as np
+import batch_analyze
+from batch_analyze import analyze_directory, output_paths
+from app.analyze_frame import score_features, create_attention_scorer
+from app.quality import TIERS
+from helpers import frame_features_by_brightness
+from replay import sample_video
+from session_stats import StudentStats
+
+def write_video(path, levels, fps=10):
+    """Uniform frames, one brightness level (see frame_features_by_brightness) per half second."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (160, 120))
+    for level in levels:
+        for _ in range(fps // 2):
+            writer.write(np.full((120, 160, 3), level, dtype=np.uint8))
+    writer.release()
+
+def expected_events(path, interval):
+    """The video's events scored in order on one thread, as the batch should write them."""
+    scorer = create_attention_scorer()
+    stats = StudentStats()
+    events = []
+    for timestamp, frame in sample_video(path, interval):
+        result = score_features(frame_features_by_brightness(frame, TIERS[0]), scorer, timestamp)
+        stats.update(result, timestamp)
+        events.append(json.loads(json.dumps({"timestamp": timestamp, **result}, default=float)))
+    return events, stats.results()
+
+class TestBatchAnalyze(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.out = os.path.join(self.directory, "analysis")
+        write_video(os.path.join(self.directory, "a.avi"), [0, 80, 160, 240, 80, 80, 160, 160])
+        write_video(os.path.join(self.directory, "b.avi"), [240, 240, 0, 80, 80, 160])
+        with open(os.path.join(self.directory, "c.mp4"), "wb") as f:
+            f.write(b"not a video")
+        with open(os.path.join(self.directory, "notes.txt"), "w") as f:
+            f.write("not a video either")
+
+    def read(self, name):
+        events_path, summary_path = output_paths(os.path.join(self.directory, name), self.out)
+        with open(events_path) as events, open(summary_path) as summary:
+            return events.read(), json.load(summary)
+
+    def test_scores_in_order_resumes_and_reports_errors(self):
+        # Stub detections vary with brightness and finish out of order on the two workers
+        with mock.patch.object(batch_analyze, "frame_features", frame_features_by_brightness):
+            summaries = analyze_directory(self.directory, self.out, workers=2, interval=0.5)
+            self.assertEqual([os.path.basename(summary["source"]) for summary in summaries],
+                             ["a.avi", "b.avi", "c.mp4"])
+            self.assertEqual([summary["frames"] for summary in summaries[:2]], [8, 6])
+            self.assertIn("Cannot open video", summaries[2]["error"])
+
+            for name in ("a.avi", "b.avi"):
+                expected, results = expected_events(os.path.join(self.directory, name), 0.5)
+                events, summary = self.read(name)
+                self.assertEqual([json.loads(line) for line in events.splitlines()], expected)
+                self.assertEqual({key: summary[key] for key in results}, results)
+            self.assertEqual({event["state"] for event in expected},
+                             {"focused", "away", "device_detected", "multiple_faces_detected"})
+
+            # Interrupted: three complete events and half of the fourth written, no summary
+            events, summary = self.read("a.avi")
+            events_path, summary_path = output_paths(os.path.join(self.directory, "a.avi"), self.out)
+            lines = events.splitlines(keepends=True)
+            with open(events_path, "w") as f:
+                f.write("".join(lines[:3]) + lines[3][:20])
+            os.remove(summary_path)
+
+            summaries = analyze_directory(self.directory, self.out, workers=1, interval=0.5)
+        self.assertEqual(summaries[0]["resumed_from"], 3)
+        self.assertTrue(summaries[1]["skipped"])
+        resumed_events, resumed_summary = self.read("a.avi")
+        self.assertEqual(resumed_events, events)
+        for key in results:
+            self.assertEqual(resumed_summary[key], summary[key])
+
+if __name__ == '__main__':
+    unittest.main()
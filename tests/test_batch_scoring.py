@@ -0,0 +1,51 @@
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+import numpy as np
+from app.attention import AttentionScorer
+from app.batch_scoring import score_batch, features_from_events, STATE_NAMES
+from database import DatabaseManager
+from helpers import random_events
+
+class TestBatchScoring(unittest.TestCase):
+
+    def test_matches_streaming_scorer_exactly(self):
+        rng = np.random.default_rng(7)
+        events = random_events(rng, 2000)
+        for thresholds in ((25, 20, 1.5, 0.1), (15, 10, 0.5, 0.35), (40, 30, 3.0, 1.0)):
+            scorer = AttentionScorer(*thresholds)
+            expected = [scorer.calculate_attention_score(event["head_pose"], event["gaze"], event["device"],
+                                                         event["num_faces"], event["captured_at"])
+                        for event in events]
+
+            scores, states = score_batch(**features_from_events(events), yaw_threshold=thresholds[0],
+                                         pitch_threshold=thresholds[1], gaze_duration_threshold=thresholds[2],
+                                         smoothing_alpha=thresholds[3])
+            self.assertEqual(scores.tolist(), [score for score, _ in expected])
+            self.assertEqual(STATE_NAMES[states].tolist(), [state for _, state in expected])
+
+    def test_stored_events_keep_capture_time(self):
+        events = random_events(np.random.default_rng(2), 20)
+        database = DatabaseManager(os.path.join(tempfile.mkdtemp(), "events.db"))
+        database.create_session("s1", students=["r1"])
+        for event in events:
+            database.save_event("s1", "r1", {**event, "attention_score": 80.0, "state": "focused"})
+        conn = sqlite3.connect(database.db_path)
+        # Rows from before captured_at had its own column kept it in the extra JSON
+        conn.executemany("UPDATE events SET extra = ?, captured_at = NULL WHERE id = ?",
+                         [(json.dumps({"captured_at": event["captured_at"], "quality_tier": "low"}), i + 1)
+                          for i, event in enumerate(events[:5])])
+        conn.commit()
+        self.assertEqual(database.compact_legacy_events(), 5)
+        extras = conn.execute("SELECT extra FROM events ORDER BY id").fetchall()
+        conn.close()
+        self.assertEqual(extras, [('{"quality_tier":"low"}',)] * 5 + [(None,)] * 15)
+
+        stored = database.get_session_events("s1", "r1")
+        self.assertEqual(features_from_events(stored)["timestamps"].tolist(),
+                         [event["captured_at"] for event in events])
+
+if __name__ == '__main__':
+    unittest.main()
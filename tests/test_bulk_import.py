@@ -0,0 +1,63 @@
+import json
+import unittest
+from bulk_import import parse_roster, parse_question_bank
+
+class TestParseRoster(unittest.TestCase):
+
+    def test_header_and_row_errors(self):
+        lines = ["name,roll_no\n", "A,R1\n", "B,R2\n", "C,R1\n", "D,\n", "\n", "E,bad roll\n"]
+        roll_nos, errors = parse_roster(lines)
+        self.assertEqual(roll_nos, ["R1", "R2"])
+        self.assertEqual([e["row"] for e in errors], [4, 5, 7])
+
+    def test_no_header_uses_first_column(self):
+        roll_nos, errors = parse_roster(["R1,extra\n", "R2\n"])
+        self.assertEqual(roll_nos, ["R1", "R2"])
+        self.assertEqual(errors, [])
+
+class TestParseQuestionBank(unittest.TestCase):
+
+    def test_csv_options_and_correct_indices(self):
+        lines = [
+            "question_text,question_type,points,options,correct\n",
+            "Capital of France?,mcq,2,Paris|Rome,1\n",
+            "Explain,essay,5,,\n",
+            "Broken,mcq,1,a|b,3\n",
+        ]
+        questions, errors = parse_question_bank(lines, "csv")
+        self.assertEqual(len(questions), 2)
+        self.assertEqual(questions[0]["points"], 2)
+        self.assertEqual([o["is_correct"] for o in questions[0]["options"]], [True, False])
+        self.assertEqual(questions[1]["options"], [])
+        self.assertEqual(errors[0]["row"], 4)
+
+    def test_json_validation(self):
+        lines = ['[{"question_text": "Q", "question_type": "mcq", "options": ["a", "b"]},',
+                 ' {"question_text": "E", "question_type": "essay", "points": "3"}]']
+        questions, errors = parse_question_bank(lines, "json")
+        self.assertEqual([q["question_text"] for q in questions], ["E"])
+        self.assertEqual(questions[0]["points"], 3)
+        self.assertEqual(errors[0]["row"], 1)
+
+    def test_json_flags_and_order_must_be_typed(self):
+        def question(options, **fields):
+            return {"question_text": "Q", "question_type": "mcq", "options": options, **fields}
+        bank = [
+            question([{"option_text": "a", "is_correct": 1}, {"option_text": "b", "is_correct": False}],
+                     order_index=4),
+            question([{"option_text": "a", "is_correct": True}, {"option_text": "b", "is_correct": "false"}]),
+            question([{"option_text": "a", "is_correct": True}, {"option_text": "b", "is_correct": 2}]),
+            question([{"option_text": "a", "is_correct": True, "order_index": "1"}, "b"]),
+            question([{"option_text": "a", "is_correct": True}, "b"], order_index=1.5),
+        ]
+        questions, errors = parse_question_bank([json.dumps(bank)], "json")
+        self.assertEqual(len(questions), 1)
+        self.assertEqual(questions[0]["order_index"], 4)
+        self.assertEqual([(o["is_correct"], o["order_index"]) for o in questions[0]["options"]],
+                         [(True, 0), (False, 1)])
+        self.assertEqual([error["row"] for error in errors], [2, 3, 4, 5])
+        self.assertIn("is_correct", errors[0]["message"])
+        self.assertIn("order_index", errors[2]["message"])
+
+if __name__ == '__main__':
+    unittest.main()
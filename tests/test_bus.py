@@ -0,0 +1,49 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from bus import BusServer, LocalBus, RespBus
+
+class TestBus(unittest.TestCase):
+
+    def test_local_bus(self):
+        bus = LocalBus()
+        received = []
+
+        async def handler(message):
+            received.append(message)
+
+        async def run():
+            bus.subscribe(handler)
+            await bus.publish({"type": "status_update"})
+
+        asyncio.run(run())
+        self.assertEqual(received, [{"type": "status_update"}])
+
+    def test_messages_shared_between_workers(self):
+        url = "unix://" + os.path.join(tempfile.mkdtemp(), "bus.sock")
+
+        async def run():
+            server = await BusServer().start(url)
+            workers = [RespBus(url), RespBus(url)]
+            received = [[], []]
+            for worker, inbox in zip(workers, received):
+                async def handler(message, inbox=inbox):
+                    inbox.append(message)
+                worker.subscribe(handler)
+                await worker.start()
+
+            await workers[0].publish({"type": "session_deleted", "session_id": "s1"})
+            await asyncio.sleep(0.05)
+
+            for worker in workers:
+                await worker.close()
+            await server.close()
+            return received
+
+        received = asyncio.run(run())
+        # The publisher handles its own message exactly once
+        self.assertEqual(received, [[{"type": "session_deleted", "session_id": "s1"}]] * 2)
+
+if __name__ == '__main__':
+    unittest.main()
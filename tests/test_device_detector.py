@@ -0,0 +1,60 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+import numpy as np
+from app import device_detector
+from app.analyze_frame import analyze_frame, create_attention_scorer
+from app.quality import TIERS
+
+class ExclusiveModel:
+    """Stands in for a YOLO model; fails if two threads run the same instance at once."""
+    instances = []
+
+    def __init__(self, *args):
+        self.busy = threading.Lock()
+        self.threads = set()
+        ExclusiveModel.instances.append(self)
+
+    def __call__(self, frame, imgsz, verbose):
+        if not self.busy.acquire(blocking=False):
+            raise AssertionError("model used by two threads at once")
+        try:
+            self.threads.add(threading.get_ident())
+            time.sleep(0.005)
+            return []
+        finally:
+            self.busy.release()
+
+def frames(count):
+    rng = np.random.default_rng(5)
+    return [rng.integers(0, 255, (120, 160, 3), dtype=np.uint8) for _ in range(count)]
+
+class TestConcurrentAnalysis(unittest.TestCase):
+
+    def test_each_thread_gets_its_own_model(self):
+        ExclusiveModel.instances = []
+        with mock.patch.object(device_detector, "YOLO_AVAILABLE", True), \
+                mock.patch.object(device_detector, "YOLO", ExclusiveModel), \
+                mock.patch.object(device_detector, "yolo_model", ExclusiveModel(), create=True), \
+                mock.patch.object(device_detector, "_thread_models", threading.local()), \
+                mock.patch.object(device_detector, "_claimed", set()):
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                results = list(executor.map(lambda frame: device_detector.detect_device(frame, 320), frames(40)))
+        self.assertTrue(all(not result["phone_detected"] for result in results))
+        used = [model for model in ExclusiveModel.instances if model.threads]
+        self.assertGreater(len(used), 1)
+        self.assertTrue(all(len(model.threads) == 1 for model in used))
+
+    def test_concurrent_analysis_matches_sequential(self):
+        images = frames(12)
+        tier = TIERS[0]
+        expected = [analyze_frame(image, create_attention_scorer(), tier, 1000.0) for image in images]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda image: analyze_frame(image, create_attention_scorer(), tier, 1000.0),
+                                        images))
+        self.assertEqual(results, expected)
+
+if __name__ == '__main__':
+    unittest.main()
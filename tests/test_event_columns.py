@@ -0,0 +1,59 @@
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from database import DatabaseManager, PACKED_EVENT_COLUMNS, _event_from_row, _pack_event
+
+EVENTS = [
+    {"num_faces": 1, "head_pose": {"yaw": 12.5, "pitch": -3.0, "roll": 1.25},
+     "gaze": {"direction": "left", "confidence": 0.75},
+     "device": {"phone_detected": True, "bbox": [10, 20, 30, 40], "confidence": 0.9},
+     "attention_score": 61.5, "state": "device_detected", "captured_at": 1700000000.25},
+    # No face: every nested field is NULL
+    {"num_faces": 0, "head_pose": None, "gaze": None, "device": None, "attention_score": 70.0, "state": "focused"},
+    # Device ran without a hit; keys without a column go to extra
+    {"num_faces": 2, "head_pose": {"yaw": 0.0, "pitch": 0.0, "roll": 0.0}, "gaze": None,
+     "device": {"phone_detected": False, "bbox": None, "confidence": 0.0}, "attention_score": 40.0,
+     "state": "multiple_faces_detected", "quality_tier": "low", "source": "landmarks"},
+]
+
+class TestEventColumns(unittest.TestCase):
+
+    def test_pack_round_trip(self):
+        for i, event in enumerate(EVENTS):
+            packed = _pack_event(event)
+            self.assertEqual(len(packed), len(PACKED_EVENT_COLUMNS))
+            row = (i, "2025-10-25 15:00:00") + packed + (None,)
+            self.assertEqual(_event_from_row(row), {**event, "id": i, "timestamp": "2025-10-25 15:00:00"})
+        packed = dict(zip(PACKED_EVENT_COLUMNS, _pack_event(EVENTS[1])))
+        self.assertEqual({column for column, value in packed.items() if value is None},
+                         {"head_pose_yaw", "head_pose_pitch", "head_pose_roll", "gaze_direction", "gaze_confidence",
+                          "phone_detected", "device_confidence", "device_bbox_x", "device_bbox_y", "device_bbox_w",
+                          "device_bbox_h", "captured_at", "extra"})
+
+    def test_database_round_trip_and_legacy_rows(self):
+        database = DatabaseManager(os.path.join(tempfile.mkdtemp(), "events.db"))
+        database.create_session("s1", students=["r1"])
+        for event in EVENTS:
+            database.save_event("s1", "r1", event)
+        # A row from before the typed columns: only raw_data is set
+        conn = sqlite3.connect(database.db_path)
+        conn.execute("INSERT INTO events (session_id, roll_no, raw_data) VALUES ('s1', 'r1', ?)",
+                     (json.dumps(EVENTS[0]),))
+        conn.commit()
+        conn.close()
+
+        def stored():
+            return [{key: value for key, value in event.items() if key not in ("id", "timestamp")}
+                    for event in database.get_session_events("s1", "r1")]
+
+        self.assertEqual(stored(), EVENTS + EVENTS[:1])
+        self.assertEqual(database.compact_legacy_events(), 1)
+        self.assertEqual(stored(), EVENTS + EVENTS[:1])
+        conn = sqlite3.connect(database.db_path)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM events WHERE raw_data IS NOT NULL").fetchone()[0], 0)
+        conn.close()
+
+if __name__ == '__main__':
+    unittest.main()
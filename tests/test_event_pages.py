@@ -0,0 +1,85 @@
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from async_db import AsyncDatabaseManager
+from database import DatabaseManager
+
+def event(i):
+    return {"num_faces": 1, "head_pose": None, "gaze": None, "device": None, "attention_score": float(i % 100),
+            "state": "focused", "captured_at": 1000.0 + i}
+
+class TestLiveEventPages(unittest.TestCase):
+
+    def setUp(self):
+        self.database = DatabaseManager(os.path.join(tempfile.mkdtemp(), "pages.db"))
+        self.database.create_session("s1", students=["r1", "r2"])
+        for i in range(50):
+            self.database.save_event("s1", "r1" if i % 5 else "r2", event(i))
+
+    def insert_concurrently(self, count):
+        """Start a thread that saves count more r1/r2 events while the test reads pages."""
+        def write():
+            for i in range(100, 100 + count):
+                self.database.save_event("s1", "r1" if i % 5 else "r2", event(i))
+        writer = threading.Thread(target=write)
+        writer.start()
+        return writer
+
+    def test_pages_during_concurrent_inserts(self):
+        writer = self.insert_concurrently(200)
+        pages, after_id = [], 0
+        while True:
+            page = self.database.get_session_events_page("s1", "r1", after_id, limit=7)
+            if not page and not writer.is_alive():
+                break
+            pages.append(page)
+            after_id = page[-1]["id"] if page else after_id
+        writer.join()
+
+        ids = [event["id"] for page in pages for event in page]
+        # Strictly increasing: no event repeated or reordered across pages, and none missed
+        self.assertTrue(all(a < b for a, b in zip(ids, ids[1:])))
+        self.assertTrue(all(len(page) <= 7 for page in pages))
+        self.assertEqual(ids, [event["id"] for event in self.database.get_session_events("s1", "r1")])
+        self.assertEqual(len(ids), 40 + 160)
+
+    def test_time_bounds(self):
+        conn = sqlite3.connect(self.database.db_path)
+        conn.execute("UPDATE events SET timestamp = datetime('2025-10-25 15:00:00', '+' || id || ' seconds')")
+        conn.commit()
+        conn.close()
+        page = self.database.get_session_events_page("s1", "r1", 0, limit=100, start="2025-10-25 15:00:10",
+                                                      end="2025-10-25 15:00:20")
+        self.assertEqual([event["id"] for event in page], [i for i in range(10, 21) if (i - 1) % 5])
+
+    def test_ndjson_stream_during_concurrent_inserts(self):
+        database = AsyncDatabaseManager(self.database)
+
+        async def run():
+            lines = []
+            writer = self.insert_concurrently(200)
+            async for item in database.iter_session_events("s1", "r1", page_size=7):
+                lines.append(json.dumps(item) + "\n")
+                await asyncio.sleep(0)
+            writer.join()
+            # Picking up after the last streamed id returns exactly the events it didn't reach yet
+            last_id = json.loads(lines[-1])["id"]
+            rest = [item async for item in database.iter_session_events("s1", "r1", last_id, page_size=7)]
+            return lines, rest
+
+        try:
+            lines, rest = asyncio.run(run())
+        finally:
+            database.shutdown()
+        streamed = [json.loads(line) for line in lines]
+        ids = [item["id"] for item in streamed + rest]
+        self.assertTrue(all(a < b for a, b in zip(ids, ids[1:])))
+        self.assertEqual(streamed + rest, self.database.get_session_events("s1", "r1"))
+        self.assertGreaterEqual(len(streamed), 40)
+
+if __name__ == '__main__':
+    unittest.main()
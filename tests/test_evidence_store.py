@@ -0,0 +1,145 @@
+import os
+import tempfile
+import threading
+import unittest
+from evidence_store import EvidenceStore, INDEX_FILE
+
+FOCUSED = {"state": "focused", "attention_score": 90.0}
+AWAY = {"state": "away", "attention_score": 40.0}
+
+def image(n):
+    return b"\xff\xd8" + bytes([n % 256]) * 100
+
+class BlockingStore(EvidenceStore):
+    """Store whose writes to session s1 hang until released."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def _append(self, writer, image, record):
+        if writer.directory.endswith("s1"):
+            self.entered.set()
+            self.release.wait()
+        return super()._append(writer, image, record)
+
+class TestEvidenceStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = EvidenceStore(self.directory, segment_bytes=250, flag_interval=10, sample_interval=60,
+                                   max_per_minute=3)
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_rate_limits(self):
+        stored = []
+        # Away for a minute at 1 fps: the flag, then one frame every 10 s, capped at 3 a minute
+        for t in range(60):
+            if self.store.offer("s1", "r1", image(t), "Distracted", AWAY, 1000.0 + t):
+                stored.append(t)
+        self.assertEqual(stored, [0, 10, 20])
+        # Back to focused: nothing until the next sample is due, then a new flag is kept right away
+        self.assertIsNone(self.store.offer("s1", "r1", image(60), "Focused", FOCUSED, 1060.0))
+        self.assertEqual(self.store.offer("s1", "r1", image(61), "Device Detected", AWAY, 1061.0)["reason"], "flag")
+        self.assertEqual(self.store.offer("s1", "r2", image(62), "Focused", FOCUSED, 1062.0)["reason"], "sample")
+        self.assertIsNone(self.store.offer("s1", "r2", image(63), "Focused", FOCUSED, 1100.0))
+        self.assertEqual(self.store.offer("s1", "r2", image(64), "Focused", FOCUSED, 1122.0)["reason"], "sample")
+
+        frames = self.store.frames("s1")
+        self.assertEqual([frame["reason"] for frame in frames], ["flag", "flagged", "flagged", "flag", "sample",
+                                                                 "sample"])
+        self.assertEqual([frame["id"] for frame in self.store.frames("s1", roll_no="r2")], [4, 5])
+
+    def test_segments_and_reads(self):
+        for t in range(5):
+            self.store.offer("s1", "r1", image(t), "Multiple faces detected", AWAY, 1000.0 + 10 * t)
+            # Read while the active segment is still growing
+            view, record = self.store.read("s1", t // 2)
+            self.assertIsInstance(view, memoryview)
+            self.assertEqual(bytes(view), image(t // 2))
+        frames = self.store.frames("s1")
+        self.assertEqual(len(frames), 3)
+        # 102-byte frames, 250-byte segments: two frames per segment
+        self.assertEqual(len({frame["segment"] for frame in frames}), 2)
+        self.assertEqual([bytes(self.store.read("s1", frame["id"])[0]) for frame in frames],
+                         [image(0), image(1), image(2)])
+        self.assertIsNone(self.store.read("s1", 3))
+        self.assertIsNone(self.store.read("missing", 0))
+
+        # Another store (worker) sees the same frames and appends to its own segments
+        other = EvidenceStore(self.directory, flag_interval=10)
+        try:
+            other.offer("s1", "r2", image(9), "No face detected", AWAY, 1100.0)
+            self.assertEqual(bytes(other.read("s1", 3)[0]), image(9))
+            self.assertEqual(bytes(self.store.read("s1", 0)[0]), image(0))
+            self.assertEqual(bytes(self.store.read("s1", 3)[0]), image(9))
+        finally:
+            other.close()
+
+    def test_maps_are_bounded(self):
+        store = EvidenceStore(self.directory, segment_bytes=100, flag_interval=0, max_maps=2)
+        try:
+            # One frame per segment, so every frame is its own map
+            for t in range(5):
+                store.offer("s1", "r1", image(t), "Distracted", AWAY, 1000.0 + t)
+            held = store.read("s1", 0)[0]
+            for frame_id in (1, 2, 3, 4, 0, 2):
+                self.assertEqual(bytes(store.read("s1", frame_id)[0]), image(frame_id))
+                self.assertLessEqual(len(store._maps), 2)
+            # An evicted map stays readable through the view a response still holds
+            self.assertEqual(bytes(held), image(0))
+            del held
+            store.forget("s1")
+            self.assertEqual(len(store._maps), 0)
+        finally:
+            store.close()
+
+    def test_torn_index_line_is_skipped(self):
+        self.store.offer("s1", "r1", image(1), "Distracted", AWAY, 1000.0)
+        # A writer crashed halfway through its index line
+        with open(os.path.join(self.directory, "s1", INDEX_FILE), "a") as f:
+            f.write('{"roll_no": "r1", "trunc')
+        self.assertEqual(len(self.store.frames("s1")), 1)
+        # After a restart, the new writer's lines start on a line of their own
+        restarted = EvidenceStore(self.directory, flag_interval=10)
+        try:
+            restarted.offer("s1", "r2", image(2), "Distracted", AWAY, 1001.0)
+            restarted.offer("s1", "r3", image(3), "Distracted", AWAY, 1002.0)
+            for store in (restarted, self.store):
+                self.assertEqual([frame["id"] for frame in store.frames("s1")], [0, 2, 3])
+                self.assertEqual(bytes(store.read("s1", 2)[0]), image(2))
+        finally:
+            restarted.close()
+
+    def test_writes_of_one_session_dont_block_others(self):
+        store = BlockingStore(self.directory)
+        try:
+            writing = threading.Thread(target=store.offer, args=("s1", "r1", image(1), "Distracted", AWAY, 1000.0))
+            writing.start()
+            self.assertTrue(store.entered.wait(5))
+            # s1's write is stuck on the disk; s2's decision and write go ahead
+            self.assertEqual(store.offer("s2", "r1", image(2), "Distracted", AWAY, 1000.0)["reason"], "flag")
+            store.release.set()
+            writing.join(5)
+            self.assertEqual(len(store.frames("s1")), 1)
+        finally:
+            store.release.set()
+            store.close()
+
+    def test_delete_session(self):
+        self.store.offer("s1", "r1", image(1), "Distracted", AWAY, 1000.0)
+        self.store.delete_session("s1")
+        self.assertFalse(os.path.exists(os.path.join(self.directory, "s1")))
+        self.assertEqual(self.store.frames("s1"), [])
+        # The student's limits start over
+        self.assertEqual(self.store.offer("s1", "r1", image(2), "Distracted", AWAY, 1001.0)["reason"], "flag")
+
+    def test_disabled(self):
+        store = EvidenceStore("")
+        self.assertIsNone(store.offer("s1", "r1", image(1), "Distracted", AWAY, 1000.0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import asyncio
+import unittest
+from exam_cache import ExamContentCache, etag_matches
+
+QUESTIONS = [{
+    "id": 1, "question_text": "2+2?", "question_type": "mcq", "points": 1, "order_index": 0,
+    "options": [{"id": 1, "option_text": "4", "is_correct": True, "order_index": 0}],
+}]
+
+class FakeDatabase:
+    def __init__(self):
+        self.reads = 0
+
+    async def get_session_questions(self, session_id):
+        self.reads += 1
+        await asyncio.sleep(0.01)
+        return QUESTIONS
+
+class TestExamContentCache(unittest.TestCase):
+
+    def test_concurrent_misses_share_one_read(self):
+        database = FakeDatabase()
+        cache = ExamContentCache(database)
+
+        async def run():
+            return await asyncio.gather(*(cache.get("s1") for _ in range(50)))
+
+        entries = asyncio.run(run())
+        self.assertEqual(database.reads, 1)
+        self.assertTrue(all(entry is entries[0] for entry in entries))
+        self.assertNotIn(b"is_correct", entries[0].student_body)
+        self.assertIn(b"is_correct", entries[0].admin_body)
+
+    def test_invalidate_question_forces_rebuild(self):
+        database = FakeDatabase()
+        cache = ExamContentCache(database)
+
+        async def run():
+            first = await cache.get("s1")
+            await cache.get("s1")
+            cache.invalidate_question(1)
+            await cache.get("s1")
+            return first
+
+        asyncio.run(run())
+        self.assertEqual(database.reads, 2)
+
+class TestEtagMatches(unittest.TestCase):
+
+    def test_compares_each_listed_tag(self):
+        etag = '"abc123"'
+        for header in ('"abc123"', 'W/"abc123"', '"x", "abc123"', '"x",W/"abc123"', "*"):
+            self.assertTrue(etag_matches(header, etag), header)
+        # A substring of the header, or of the tag, is not a match
+        for header in (None, "", '"abc1234"', '"abc12"', 'abc123', '"x", "abc123x"'):
+            self.assertFalse(etag_matches(header, etag), header)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import asyncio
+import time
+import unittest
+from frame_scheduler import FrameScheduler, FrameShed
+
+class TestFrameScheduler(unittest.TestCase):
+
+    def test_flagged_students_first_and_superseded_frames_dropped(self):
+        scheduler = FrameScheduler(workers=1, min_interval=60, latency_target=10, max_wait=10)
+        order = []
+
+        def work(name, duration=0.02):
+            def analyze():
+                time.sleep(duration)
+                order.append(name)
+                return name
+            return analyze
+
+        async def run():
+            blocker = asyncio.ensure_future(scheduler.run(("s1", "busy"), work("busy", 0.1)))
+            await asyncio.sleep(0.01)
+            first = asyncio.ensure_future(scheduler.run(("s1", "calm"), work("calm-old")))
+            await asyncio.sleep(0)
+            second = asyncio.ensure_future(scheduler.run(("s1", "calm"), work("calm-new")))
+            flagged = asyncio.ensure_future(scheduler.run(("s1", "phone"), work("phone"), flagged=True))
+            return await asyncio.gather(blocker, first, second, flagged, return_exceptions=True)
+
+        results = asyncio.run(run())
+        scheduler.close()
+        self.assertIsInstance(results[1], FrameShed)
+        self.assertEqual(results[1].reason, "superseded")
+        self.assertEqual(order, ["busy", "phone", "calm-new"])
+
+    def test_surplus_frames_shed_under_load(self):
+        scheduler = FrameScheduler(workers=1, min_interval=60, latency_target=0.001, max_wait=10)
+
+        async def run():
+            # First frame of a student is guaranteed; later ones within min_interval are surplus
+            await scheduler.run(("s1", "r1"), lambda: time.sleep(0.01))
+            busy = asyncio.ensure_future(scheduler.run(("s1", "r2"), lambda: time.sleep(0.05)))
+            await asyncio.sleep(0.01)
+            with self.assertRaises(FrameShed):
+                await scheduler.run(("s1", "r1"), lambda: None)
+            flagged = await scheduler.run(("s1", "r1"), lambda: "analyzed", flagged=True)
+            await busy
+            return flagged
+
+        self.assertEqual(asyncio.run(run()), "analyzed")
+        metrics = scheduler.metrics()
+        scheduler.close()
+        self.assertEqual(metrics["shed"]["load"], 1)
+        self.assertEqual([student["roll_no"] for student in metrics["degraded_students"]], ["r1"])
+
+    def test_capture_advice_backs_off_under_load_but_not_past_guaranteed_rate(self):
+        scheduler = FrameScheduler(workers=2, min_interval=5, latency_target=0.5)
+        calm = scheduler.capture_advice()
+        flagged = scheduler.capture_advice(flagged=True)
+        self.assertLess(flagged["interval_ms"], calm["interval_ms"])
+
+        scheduler._latency = 50.0
+        hot = scheduler.capture_advice()
+        self.assertEqual(hot["interval_ms"], 5000)
+        self.assertLess(hot["width"], calm["width"])
+        self.assertLessEqual(scheduler.capture_advice(flagged=True)["interval_ms"], hot["interval_ms"])
+
+if __name__ == '__main__':
+    unittest.main()
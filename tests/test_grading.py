@@ -0,0 +1,98 @@
+import os
+import random
+import sqlite3
+import tempfile
+import unittest
+from database import DatabaseManager
+
+class TestGradeSession(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = random.Random(12)
+        self.database = DatabaseManager(os.path.join(tempfile.mkdtemp(), "grading.db"))
+        self.students = [f"r{i}" for i in range(8)]
+        self.database.create_session("s1", students=self.students, exam_type="custom")
+        self.database.create_session("s2", students=["r0"], exam_type="custom")
+        # question id -> (points, {option id: is_correct})
+        self.mcqs = {}
+        for session_id in ("s1", "s2"):
+            for n in range(4):
+                question_id = self.database.add_question(session_id, f"Q{n}", "mcq", points=n + 1, order_index=n)
+                correct = self.rng.randrange(3)
+                for o in range(3):
+                    self.database.add_mcq_option(question_id, f"option {o}", o == correct, o)
+                if session_id == "s1":
+                    self.mcqs[question_id] = (n + 1, self.options(question_id))
+        self.essay = self.database.add_question("s1", "Explain", "essay", points=5, order_index=9)
+
+    def options(self, question_id):
+        conn = sqlite3.connect(self.database.db_path)
+        rows = conn.execute("SELECT id, is_correct FROM mcq_options WHERE question_id = ?", (question_id,))
+        options = {option_id: bool(is_correct) for option_id, is_correct in rows}
+        conn.close()
+        return options
+
+    def answer_randomly(self, roll_nos):
+        every_option = [option_id for _, options in self.mcqs.values() for option_id in options]
+        answers = []
+        for roll_no in roll_nos:
+            for question_id, (_, options) in self.mcqs.items():
+                # Mostly its own options; sometimes another question's, or nothing selected
+                choice = self.rng.choice(list(options) * 3 + every_option[:2] + [None])
+                answers.append(("s1", roll_no, question_id, None, choice))
+            answers.append(("s1", roll_no, self.essay, "Because.", None))
+        self.assertTrue(self.database.save_student_answers(answers))
+
+    def expected_points(self, roll_no):
+        """Points per question, checking each answer in Python."""
+        points = {}
+        for answer in self.database.get_student_answers("s1", roll_no):
+            question_id = answer["question_id"]
+            if question_id in self.mcqs:
+                value, options = self.mcqs[question_id]
+                points[question_id] = value if options.get(answer["selected_option_id"]) else 0
+        return points
+
+    def stored_scores(self):
+        conn = sqlite3.connect(self.database.db_path)
+        rows = conn.execute("SELECT roll_no, exam_score, total_possible_points FROM results WHERE session_id = 's1'")
+        scores = {roll_no: (score, possible) for roll_no, score, possible in rows}
+        conn.close()
+        return scores
+
+    def test_matches_per_answer_check(self):
+        self.answer_randomly(self.students)
+        graded = self.database.grade_session("s1")
+        self.assertEqual(graded, {"graded_students": 8, "graded_answers": 8 * len(self.mcqs)})
+
+        scores = self.stored_scores()
+        for roll_no in self.students:
+            expected = self.expected_points(roll_no)
+            answers = {answer["question_id"]: answer for answer in self.database.get_student_answers("s1", roll_no)}
+            self.assertEqual({question_id: answers[question_id]["points_earned"] for question_id in expected},
+                             expected)
+            self.assertEqual(answers[self.essay]["points_earned"], 0)
+            self.assertEqual(scores[roll_no], (sum(expected.values()), 1 + 2 + 3 + 4 + 5))
+
+    def test_limits_to_students_and_changes(self):
+        self.answer_randomly(self.students)
+        self.database.grade_session("s1", roll_nos=["r1", "r2"])
+        self.assertEqual(sorted(self.stored_scores()), ["r1", "r2"])
+
+        self.database.grade_session("s1")
+        conn = sqlite3.connect(self.database.db_path)
+        # Graded in the past, so only answers changed afterwards count as changes
+        conn.execute("UPDATE results SET graded_at = datetime('now', '+1 minute')")
+        conn.commit()
+        conn.close()
+        self.assertEqual(self.database.grade_session("s1", changed_only=True)["graded_students"], 0)
+        conn = sqlite3.connect(self.database.db_path)
+        conn.execute("UPDATE results SET graded_at = datetime('now', '-1 minute') WHERE roll_no = 'r3'")
+        conn.commit()
+        conn.close()
+        self.answer_randomly(["r3"])
+        self.assertEqual(self.database.grade_session("s1", changed_only=True)["graded_students"], 1)
+        self.assertEqual(self.stored_scores()["r3"][0], sum(self.expected_points("r3").values()))
+
+if __name__ == '__main__':
+    unittest.main()
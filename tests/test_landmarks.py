@@ -0,0 +1,48 @@
+import unittest
+import numpy as np
+from app.landmarks import decode_landmarks, encode_landmarks
+from app.analyze_frame import analyze_landmarks, create_attention_scorer
+from helpers import face_landmarks
+
+class TestLandmarks(unittest.TestCase):
+
+    def test_round_trip(self):
+        points = face_landmarks()
+        for value_format in ("float16", "int16"):
+            decoded = decode_landmarks(encode_landmarks(points, value_format))
+            self.assertEqual(decoded.shape, (1, 478, 3))
+            self.assertLess(np.abs(decoded - points).max(), 1e-3)
+
+    def test_invalid_payloads(self):
+        payload = encode_landmarks(face_landmarks())
+        for bad in ({**payload, "format": "float64"}, {**payload, "faces": 3},
+                    {**payload, "points": 100}, {**payload, "data": payload["data"][:-8]},
+                    {**payload, "data": "not base64!"},
+                    encode_landmarks(np.full((1, 478, 3), 50.0))):
+            with self.assertRaises(ValueError):
+                decode_landmarks(bad)
+
+    def test_analyze_landmarks(self):
+        scorer = create_attention_scorer()
+        result = analyze_landmarks(decode_landmarks(encode_landmarks(face_landmarks())), 640, 480, scorer)
+        self.assertEqual(result["num_faces"], 1)
+        for angle in ("yaw", "pitch", "roll"):
+            self.assertAlmostEqual(result["head_pose"][angle], 0, delta=0.5)
+        self.assertEqual((result["state"], result["gaze"]["direction"]), ("focused", "center"))
+        # One full-score frame smoothed into the scorer's starting 70
+        self.assertEqual(result["attention_score"], 73.0)
+        self.assertIsNone(result["device"])
+
+        # The yaw the server would measure on the flipped image, sign included
+        for yaw in (30, -30):
+            turned = analyze_landmarks(decode_landmarks(encode_landmarks(face_landmarks(yaw))), 640, 480,
+                                       create_attention_scorer())
+            self.assertAlmostEqual(turned["head_pose"]["yaw"], yaw, delta=0.5)
+            self.assertAlmostEqual(turned["head_pose"]["pitch"], 0, delta=0.5)
+            self.assertEqual(turned["state"], "away")
+
+        empty = analyze_landmarks(decode_landmarks({"faces": 0, "data": ""}), 640, 480, scorer)
+        self.assertEqual((empty["num_faces"], empty["head_pose"]), (0, None))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import asyncio
+import unittest
+from live_state import LiveStateStore
+
+class FakeDatabase:
+    def __init__(self):
+        self.reads = 0
+        self.status_writes = 0
+
+    async def get_session_data(self, session_id):
+        self.reads += 1
+        if session_id != "s1":
+            return None
+        return {"exam_title": "Quiz", "students": {"r1": {"status": "Not Started"}}}
+
+    async def update_student_status(self, session_id, roll_no, status):
+        self.status_writes += 1
+        return True
+
+class TestLiveStateStore(unittest.TestCase):
+
+    def test_lazy_load_once(self):
+        database = FakeDatabase()
+        store = LiveStateStore(database)
+
+        async def run():
+            students = await asyncio.gather(*(store.get_student("s1", "r1") for _ in range(20)))
+            missing = [await store.get_student("nope", "r1") for _ in range(5)]
+            return students, missing
+
+        students, missing = asyncio.run(run())
+        self.assertTrue(all(student is students[0] for student in students))
+        self.assertEqual(missing, [None] * 5)
+        self.assertEqual(database.reads, 2)
+
+    def test_status_written_only_on_change(self):
+        database = FakeDatabase()
+        store = LiveStateStore(database)
+
+        async def run():
+            student = await store.get_student("s1", "r1")
+            for status in ("Focused", "Focused", "Focused", "Distracted"):
+                await store.set_status("s1", student, status)
+            return student
+
+        student = asyncio.run(run())
+        self.assertEqual(student.status, "Distracted")
+        self.assertEqual(database.status_writes, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+from app.quality import QualityLadder
+
+class TestQualityLadder(unittest.TestCase):
+
+    def test_steps_down_under_load_and_back_up_slowly(self):
+        ladder = QualityLadder(latency_slo=0.5, down_after=3, up_after=5, cooldown=0)
+
+        ladder.observe(0.9)
+        ladder.observe(0.9)
+        self.assertEqual(ladder.tier.name, "full")
+        self.assertEqual(ladder.observe(0.9).name, "high")
+        for _ in range(3):
+            ladder.observe(0.1, backlogged=True)
+        self.assertEqual(ladder.tier.name, "medium")
+
+        # Latency just under the SLO is not enough headroom to step up
+        for _ in range(10):
+            ladder.observe(0.45)
+        self.assertEqual(ladder.tier.name, "medium")
+        for _ in range(5):
+            ladder.observe(0.1)
+        self.assertEqual(ladder.tier.name, "high")
+
+    def test_cooldown_holds_tier(self):
+        ladder = QualityLadder(latency_slo=0.5, down_after=1, up_after=1, cooldown=60)
+        ladder.observe(1.0)
+        for _ in range(10):
+            ladder.observe(1.0)
+        self.assertEqual(ladder.tier.name, "high")
+
+if __name__ == '__main__':
+    unittest.main()
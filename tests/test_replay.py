@@ -0,0 +1,42 @@
+import json
+import os
+import tempfile
+import unittest
+from app.landmarks import decode_landmarks, encode_landmarks
+from app.analyze_frame import analyze_landmarks, create_attention_scorer
+from helpers import face_landmarks
+from replay import replay_source
+from session_stats import StudentStats
+
+class TestReplay(unittest.TestCase):
+
+    def test_landmark_stream_replay_matches_live_scoring(self):
+        # Looking left for the first four seconds, with the head turned away from 2.5 s to 4 s
+        records = [{"timestamp": 1000.0 + 0.5 * i, "width": 640, "height": 480,
+                    "landmarks": encode_landmarks(face_landmarks(40 if 5 <= i < 8 else 0,
+                                                                 0.44 if i < 8 else 0.42))}
+                   for i in range(12)]
+        path = os.path.join(tempfile.mkdtemp(), "r1.ndjson")
+        with open(path, "w") as f:
+            f.writelines(json.dumps(record) + "\n" for record in records)
+
+        # Live: one scorer fed frame by frame with the capture timestamps
+        scorer = create_attention_scorer()
+        live = [analyze_landmarks(decode_landmarks(record["landmarks"]), 640, 480, scorer,
+                                  timestamp=record["timestamp"]) for record in records]
+
+        report = replay_source(path)
+        self.assertEqual(report["frames"], 12)
+        self.assertEqual(report["states"], [result["state"] for result in live])
+        self.assertEqual(report["states"], ["focused"] * 5 + ["away"] * 3 + ["focused"] * 4)
+        scores = [result["attention_score"] for result in live]
+        # The gaze penalty starts once the stream (not the wall clock) passed 1.5 s off-center
+        self.assertEqual(live[3]["gaze"]["direction"], "left")
+        self.assertGreater(scores[3] - scores[4], 0)
+        stats = StudentStats()
+        for record, result in zip(records, live):
+            stats.update(result, record["timestamp"])
+        self.assertEqual(report["summary"], stats.results())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import random
+import sqlite3
+import tempfile
+import unittest
+from collections import Counter
+from database import DatabaseManager, ROLLUP_STATES
+
+class TestEventRollups(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(9)
+        self.database = DatabaseManager(os.path.join(tempfile.mkdtemp(), "rollups.db"))
+        self.database.create_session("s1", students=["r1", "r2"])
+        self.events = {"r1": [], "r2": []}
+        for _ in range(300):
+            roll_no = rng.choice(["r1", "r2"])
+            event = {"attention_score": rng.choice([20.0, 55.5, 90.0]), "num_faces": rng.choice([0, 1, 1, 2]),
+                     "state": rng.choice(ROLLUP_STATES + ("unknown",)),
+                     "device": {"phone_detected": rng.random() < 0.2}}
+            self.database.save_event("s1", roll_no, event)
+            self.events[roll_no].append(event)
+        for violation_type in ("tab_switch", "mouse_out", "tab_switch"):
+            self.database.save_violation("s1", "r1", violation_type)
+
+    def assert_totals_match_events(self):
+        totals = self.database.get_rollup_totals("s1")
+        for roll_no, events in self.events.items():
+            total = totals[roll_no]
+            states = Counter(event["state"] for event in events)
+            faces = Counter(min(event["num_faces"], 2) for event in events)
+            scores = [event["attention_score"] for event in events]
+            self.assertEqual(total["events"], len(events))
+            self.assertEqual(total["mean_attention"], round(sum(scores) / len(scores), 2))
+            self.assertEqual((total["min_attention"], total["max_attention"]), (min(scores), max(scores)))
+            self.assertEqual(total["states"], {**{state: states[state] for state in ROLLUP_STATES},
+                                               "other": states["unknown"]})
+            self.assertEqual(total["faces"], {"0": faces[0], "1": faces[1], "2+": faces[2]})
+            self.assertEqual(total["device_hits"], sum(event["device"]["phone_detected"] for event in events))
+            self.assertEqual(total["violations"], 3 if roll_no == "r1" else 0)
+
+    def test_incremental_totals_match_raw_events(self):
+        self.assert_totals_match_events()
+
+    def test_rebuilt_minutes_match_raw_events(self):
+        # Spread the events over ten minutes, then recompute the rollups from the raw rows
+        conn = sqlite3.connect(self.database.db_path)
+        conn.execute("UPDATE events SET timestamp = datetime('2025-10-25 15:00:00', '+' || (id % 10) || ' minutes')")
+        conn.execute("UPDATE violations SET timestamp = '2025-10-25 15:03:30'")
+        conn.commit()
+        per_minute = dict(conn.execute("""
+            SELECT CAST(strftime('%s', timestamp) AS INTEGER) / 60, COUNT(*) FROM events
+            WHERE roll_no = 'r1' GROUP BY 1
+        """).fetchall())
+        conn.close()
+        self.assertTrue(self.database.rebuild_rollups("s1"))
+
+        rollups = self.database.get_rollups("s1", "r1")
+        self.assertEqual({rollup["minute"]: rollup["events"] for rollup in rollups}, per_minute)
+        self.assertEqual([rollup["violations"] for rollup in rollups if rollup["start"] == "2025-10-25 15:03:00"],
+                         [3])
+        self.assert_totals_match_events()
+
+if __name__ == '__main__':
+    unittest.main()
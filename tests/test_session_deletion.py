@@ -0,0 +1,87 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import unittest
+from archive import SessionArchiver
+from async_db import AsyncDatabaseManager
+from database import DatabaseManager
+from session_deletion import SessionDeletionWorker
+
+SESSION_TABLES = ("student_answers", "questions", "results", "violation_counts", "event_rollups", "violations",
+                  "events", "students", "sessions")
+
+class TestChunkedDeletion(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.database = DatabaseManager(os.path.join(self.directory, "deletion.db"))
+        for session_id in ("s1", "s2"):
+            self.database.create_session(session_id, students=["r1", "r2", "r3"], exam_type="custom")
+            for i in range(45):
+                self.database.save_event(session_id, f"r{i % 3 + 1}", {"attention_score": 80.0, "state": "focused"})
+            for _ in range(4):
+                self.database.save_violation(session_id, "r1", "tab_switch")
+            question_id = self.database.add_question(session_id, "Q", "mcq")
+            self.database.add_mcq_option(question_id, "a", True)
+            self.database.add_mcq_option(question_id, "b")
+            self.database.save_student_answer(session_id, "r1", question_id, selected_option_id=None)
+            self.database.grade_session(session_id)
+
+    def rows(self, session_id):
+        conn = sqlite3.connect(self.database.db_path)
+        counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table} WHERE session_id = ?", (session_id,)).fetchone()[0]
+                  for table in SESSION_TABLES}
+        counts["mcq_options"] = conn.execute("""
+            SELECT COUNT(*) FROM mcq_options o JOIN questions q ON q.id = o.question_id WHERE q.session_id = ?
+        """, (session_id,)).fetchone()[0]
+        conn.close()
+        return counts
+
+    def test_chunks_report_progress(self):
+        before = self.rows("s2")
+        progress = self.database.mark_session_deleting("s1")
+        self.assertEqual(progress["total_rows"], sum(self.rows("s1").values()))
+        self.assertEqual((progress["deleted_rows"], progress["done"]), (0, False))
+
+        steps = [progress]
+        while not steps[-1]["done"]:
+            steps.append(self.database.delete_session_chunk("s1", chunk_size=10))
+        deleted = [step["deleted_rows"] for step in steps]
+        # Never more than a chunk at a time, always forward, until everything is gone
+        self.assertTrue(all(0 < b - a <= 10 for a, b in zip(deleted, deleted[1:])))
+        self.assertEqual(deleted[-1], progress["total_rows"])
+        self.assertEqual(steps[-1]["progress"], 1.0)
+        self.assertGreaterEqual(len(steps) - 1, progress["total_rows"] / 10)
+        self.assertEqual(set(self.rows("s1").values()), {0})
+        self.assertEqual(self.rows("s2"), before)
+        self.assertIsNone(self.database.mark_session_deleting("s1"))
+
+    def test_deletes_archive(self):
+        manifest = SessionArchiver(self.database, os.path.join(self.directory, "archive")).archive_session("s1")
+        self.assertTrue(self.database.delete_session("s1"))
+        self.assertFalse(os.path.exists(manifest["archive_path"]))
+        self.assertEqual(set(self.rows("s1").values()), {0})
+
+    def test_worker_resumes_unfinished_deletion(self):
+        self.database.mark_session_deleting("s1")
+        self.database.delete_session_chunk("s1", chunk_size=10)
+        database = AsyncDatabaseManager(self.database)
+
+        async def run():
+            # A new worker, as after a restart
+            worker = SessionDeletionWorker(database, chunk_size=10, pause=0)
+            await worker.resume()
+            while not (await database.get_deletion_progress("s1"))["done"]:
+                await asyncio.sleep(0.01)
+            await worker.close()
+
+        try:
+            asyncio.run(asyncio.wait_for(run(), 10))
+        finally:
+            database.shutdown()
+        self.assertEqual(set(self.rows("s1").values()), {0})
+        self.assertEqual(self.database.get_pending_deletions(), [])
+
+if __name__ == '__main__':
+    unittest.main()
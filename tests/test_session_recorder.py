@@ -0,0 +1,124 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+import cv2
+import numpy as np
+from session_recorder import SessionRecorder
+
+def frame(value, size=(160, 120)):
+    return np.full((size[1], size[0], 3), value, np.uint8)
+
+def frame_count(path):
+    capture = cv2.VideoCapture(path)
+    count = 0
+    while capture.grab():
+        count += 1
+    capture.release()
+    return count
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+class BlockingRecorder(SessionRecorder):
+    """Encoder stuck on its first frame until released."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def _write(self, shard, key, frame, timestamp):
+        self.entered.set()
+        self.release.wait()
+        super()._write(shard, key, frame, timestamp)
+
+class TestSessionRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def test_segments_follow_capture_time(self):
+        recorder = SessionRecorder(self.directory, fps=2, segment_seconds=5, max_gap=3, workers=2)
+        try:
+            # One capture a second for 8 s (every other one at a smaller size), a 7 s pause, then 2 s more
+            for t in list(range(8)) + [15, 16]:
+                self.assertTrue(recorder.submit("s1", "r1", frame(t * 10, (160, 120) if t % 2 else (80, 60)),
+                                                1000.0 + t))
+            # Faster than the recording frame rate: skipped
+            self.assertFalse(recorder.submit("s1", "r1", frame(0), 1016.1))
+            recorder.finish("s1", "r1")
+            self.assertTrue(wait_for(lambda: recorder.metrics()["open_segments"] == 0))
+        finally:
+            recorder.close()
+
+        segments = recorder.segments("s1", "r1")
+        self.assertEqual([segment["start"] for segment in segments], [1000.0, 1005.0, 1015.0])
+        self.assertFalse(any(segment["recording"] for segment in segments))
+        paths = [recorder.segment_path("s1", "r1", segment["name"]) for segment in segments]
+        # Frames repeat to fill each second at 2 fps
+        self.assertEqual([frame_count(path) for path in paths], [9, 5, 3])
+        self.assertEqual(recorder.metrics()["frames_written"], 17)
+        self.assertIsNone(recorder.segment_path("s1", "r1", "../../etc/passwd"))
+
+    def test_gaps_hold_the_previous_frame(self):
+        recorder = SessionRecorder(self.directory, fps=2, workers=1)
+        try:
+            recorder.submit("s1", "r1", frame(0), 1000.0)
+            recorder.submit("s1", "r1", frame(250), 1002.0)
+            recorder.finish("s1", "r1")
+            self.assertTrue(wait_for(lambda: recorder.metrics()["segments_written"] == 1))
+        finally:
+            recorder.close()
+        self.assertEqual(recorder.extension, ".webm" if recorder.fourcc == "VP80" else ".mp4")
+        capture = cv2.VideoCapture(recorder.segment_path("s1", "r1", recorder.segments("s1", "r1")[0]["name"]))
+        brightness = []
+        while True:
+            ok, image = capture.read()
+            if not ok:
+                break
+            brightness.append(image.mean())
+        capture.release()
+        self.assertEqual([value > 125 for value in brightness], [False] * 4 + [True])
+
+    def test_drops_recording_frames_under_backpressure(self):
+        recorder = BlockingRecorder(self.directory, fps=1, workers=1, queue_size=2)
+        try:
+            start = time.monotonic()
+            self.assertTrue(recorder.submit("s1", "r1", frame(0), 1000.0))
+            self.assertTrue(recorder.entered.wait(5))
+            queued = [recorder.submit("s1", "r1", frame(t), 1000.0 + t) for t in range(1, 5)]
+            # Never waits for the encoder
+            self.assertLess(time.monotonic() - start, 1.0)
+            self.assertEqual(queued, [True, True, False, False])
+            self.assertEqual(recorder.metrics()["dropped"], 2)
+            recorder.release.set()
+            self.assertTrue(wait_for(lambda: recorder.metrics()["frames_written"] == 3))
+        finally:
+            recorder.release.set()
+            recorder.close()
+
+    def test_delete_session(self):
+        recorder = SessionRecorder(self.directory, fps=1, workers=1)
+        try:
+            recorder.submit("s1", "r1", frame(0), 1000.0)
+            self.assertTrue(wait_for(lambda: recorder.segments("s1", "r1")))
+            self.assertTrue(recorder.segments("s1", "r1")[0]["recording"])
+            self.assertIsNone(recorder.segment_path("s1", "r1", recorder.segments("s1", "r1")[0]["name"]))
+            recorder.delete_session("s1")
+            self.assertFalse(os.path.exists(os.path.join(self.directory, "s1")))
+            self.assertEqual(recorder.metrics()["open_segments"], 0)
+        finally:
+            recorder.close()
+
+    def test_disabled(self):
+        recorder = SessionRecorder("")
+        self.assertFalse(recorder.submit("s1", "r1", frame(0), 1000.0))
+        self.assertEqual(recorder.segments("s1", "r1"), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import random
+import tempfile
+import unittest
+from database import DatabaseManager
+from session_stats import StudentStats
+
+def make_result(score, state="focused", num_faces=1, phone=False):
+    return {
+        "num_faces": num_faces,
+        "attention_score": score,
+        "state": state,
+        "device": {"phone_detected": phone},
+    }
+
+class TestStudentStats(unittest.TestCase):
+
+    def test_empty_results(self):
+        results = StudentStats().results()
+        self.assertEqual(results["average_attention_score"], 0)
+        self.assertEqual(results["distracted_count"], 0)
+        self.assertEqual(results["device_detected_count"], 0)
+
+    def test_counters_match_event_list(self):
+        events = [
+            make_result(90),
+            make_result(60, state="away"),
+            make_result(40, state="device_detected", phone=True),
+            make_result(30, state="multiple_faces_detected", num_faces=2),
+            make_result(80, num_faces=0),
+        ]
+        stats = StudentStats()
+        for i, event in enumerate(events):
+            stats.update(event, timestamp=100.0 + i)
+
+        results = stats.results()
+        self.assertAlmostEqual(results["average_attention_score"], 60.0)
+        self.assertEqual(results["distracted_count"], 1)
+        self.assertEqual(results["multiple_faces_count"], 1)
+        self.assertEqual(results["no_face_count"], 1)
+        self.assertEqual(results["device_detected_count"], 1)
+        self.assertEqual(results["min_attention_score"], 30)
+        self.assertEqual(results["max_attention_score"], 90)
+        self.assertEqual(results["median_attention_score"], 60)
+        self.assertEqual(results["time_in_state"]["focused"], 1.0)
+        self.assertEqual(results["time_in_state"]["away"], 1.0)
+
+    def test_long_gaps_not_credited(self):
+        stats = StudentStats()
+        stats.update(make_result(90), timestamp=0.0)
+        stats.update(make_result(90), timestamp=60.0)
+        self.assertNotIn("focused", stats.results()["time_in_state"])
+    def test_database_aggregate_matches_streaming(self):
+        rng = random.Random(4)
+        database = DatabaseManager(os.path.join(tempfile.mkdtemp(), "stats.db"))
+        database.create_session("s1", students=["r1", "r2"])
+        stats = StudentStats()
+        timestamp = 1000.0
+        for _ in range(300):
+            # Mostly steady frames, some pauses longer than MAX_FRAME_GAP, scores with .5 ties
+            timestamp += rng.choice([0.5, 1.0, 1.25, 7.0])
+            result = make_result(rng.choice([12.5, 13.5, 47.25, 60.0, 99.5]),
+                                 state=rng.choice(["focused", "away", "distracted", "device_detected"]),
+                                 num_faces=rng.choice([0, 1, 1, 2]), phone=rng.random() < 0.2)
+            database.save_event("s1", "r1", {**result, "captured_at": timestamp})
+            stats.update(result, timestamp)
+        database.save_event("s1", "r2", {**make_result(10.0), "captured_at": 1000.0})
+
+        expected = stats.results()
+        results = database.get_student_stats("s1", "r1").results()
+        self.assertAlmostEqual(results.pop("average_attention_score"), expected.pop("average_attention_score"))
+        self.assertEqual(results, expected)
+        self.assertEqual(database.get_student_stats("s1", "missing").results(), StudentStats().results())
+
+if __name__ == '__main__':
+    unittest.main()
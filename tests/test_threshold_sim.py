@@ -0,0 +1,70 @@
+import tempfile
+import unittest
+import numpy as np
+from app.attention import AttentionScorer
+from session_stats import StudentStats
+from helpers import random_events
+from threshold_sim import build_feature_cache, open_feature_cache, simulate, parse_values, cache_path
+
+class FakeDatabase:
+    def __init__(self, events):
+        self.events = events
+
+    def get_session_data(self, session_id):
+        return {"students": {roll_no: {} for roll_no in self.events}} if session_id == "s1" else None
+
+    def get_session_events(self, session_id, roll_no):
+        return self.events[roll_no]
+
+    def get_last_event_id(self, session_id):
+        return sum(len(events) for events in self.events.values()) if session_id == "s1" else None
+
+class TestThresholdSim(unittest.TestCase):
+
+    def test_matches_streaming_scorer_and_stats(self):
+        rng = np.random.default_rng(3)
+        database = FakeDatabase({f"r{i}": random_events(rng, int(rng.integers(50, 400))) for i in range(5)})
+        combos = [(25, 20, 1.5, 0.1), (25, 20, 0.5, 0.3), (15, 10, 0.5, 0.3), (40, 30, 3.0, 1.0)]
+
+        with tempfile.TemporaryDirectory() as directory:
+            build_feature_cache(["s1"], directory, database)
+            features, lengths, students = open_feature_cache(directory)
+            averages, flagged, counts = simulate(features, lengths, combos)
+            del features
+
+        self.assertEqual([student["roll_no"] for student in students], sorted(database.events))
+        for c, thresholds in enumerate(combos):
+            for s, student in enumerate(students):
+                scorer = AttentionScorer(*thresholds)
+                stats = StudentStats()
+                for event in database.events[student["roll_no"]]:
+                    score, state = scorer.calculate_attention_score(event["head_pose"], event["gaze"],
+                                                                    event["device"], event["num_faces"],
+                                                                    event["captured_at"])
+                    stats.update({"attention_score": round(score, 2), "state": state}, event["captured_at"])
+                results = stats.results()
+                # np.round and round() can disagree on a last-digit tie (0.01 on that frame)
+                self.assertAlmostEqual(averages[c, s], results["average_attention_score"], delta=0.001)
+                self.assertAlmostEqual(flagged[c, s], sum(seconds for state, seconds in
+                                                          stats.state_durations.items() if state != "focused"))
+                self.assertEqual(counts[c, s].sum(), len(database.events[student["roll_no"]]))
+                self.assertEqual(counts[c, s, 0], results["state_counts"].get("focused", 0))
+
+    def test_unknown_session(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with self.assertRaises(ValueError):
+                build_feature_cache(["missing"], directory, FakeDatabase({}))
+
+    def test_cache_path_follows_new_events(self):
+        database = FakeDatabase({"r1": [{}, {}]})
+        path = cache_path(["s1", "s2"], "cache", database)
+        self.assertEqual(cache_path(["s2", "s1"], "cache", database), path)
+        database.events["r1"].append({})
+        self.assertNotEqual(cache_path(["s1", "s2"], "cache", database), path)
+
+    def test_parse_values(self):
+        self.assertEqual(parse_values("15,20.5"), [15.0, 20.5])
+        self.assertEqual(parse_values("0.5:2:0.5"), [0.5, 1.0, 1.5, 2.0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from database import DatabaseManager
+from timeline import lttb_indices, minmax_indices, build_timeline
+
+class TestDownsampling(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.x = np.cumsum(rng.uniform(0.5, 1.5, 1000))
+        self.y = rng.uniform(40, 60, 1000)
+        self.y[437] = 100.0
+
+    def test_lttb_keeps_endpoints_and_count(self):
+        indices = lttb_indices(self.x, self.y, 100)
+        self.assertEqual(len(indices), 100)
+        self.assertEqual((indices[0], indices[-1]), (0, 999))
+        self.assertTrue(np.all(np.diff(indices) > 0))
+        # A lone spike always makes the largest triangle in its bucket
+        self.assertIn(437, indices)
+        self.assertEqual(lttb_indices(self.x[:50], self.y[:50], 100).tolist(), list(range(50)))
+
+    def test_minmax_keeps_each_bucket_extremes(self):
+        indices = minmax_indices(self.y, 50)
+        self.assertLessEqual(len(indices), 100)
+        self.assertTrue(np.all(np.diff(indices) > 0))
+        for bucket in np.array_split(np.arange(1000), 50):
+            self.assertIn(bucket[np.argmin(self.y[bucket])], indices)
+            self.assertIn(bucket[np.argmax(self.y[bucket])], indices)
+        self.assertEqual(minmax_indices(self.y[:60], 50).tolist(), list(range(60)))
+
+class TestBuildTimeline(unittest.TestCase):
+
+    def test_points_and_buckets_cover_the_series(self):
+        database = DatabaseManager(os.path.join(tempfile.mkdtemp(), "timeline.db"))
+        database.create_session("s1", students=["r1"])
+        for i in range(500):
+            database.save_event("s1", "r1", {"attention_score": 50.0 + (i % 40), "num_faces": 1,
+                                             "state": "away" if i % 100 < 10 else "focused"})
+
+        for method in ("lttb", "minmax"):
+            timeline = build_timeline("s1", "r1", points=60, method=method, db_path=database.db_path)
+            self.assertEqual(timeline["total_events"], 500)
+            self.assertLessEqual(len(timeline["t"]), 60)
+            self.assertEqual(sum(bucket["count"] for bucket in timeline["buckets"]), 500)
+            self.assertEqual(sum(bucket["state_changes"] for bucket in timeline["buckets"]), 9)
+        self.assertEqual(len(build_timeline("s1", "r1", points=60, db_path=database.db_path)["t"]), 60)
+        self.assertEqual(build_timeline("s1", "missing", db_path=database.db_path)["total_events"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
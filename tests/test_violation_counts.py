@@ -0,0 +1,60 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from database import DatabaseManager
+
+class TestViolationCounts(unittest.TestCase):
+
+    def setUp(self):
+        self.database = DatabaseManager(os.path.join(tempfile.mkdtemp(), "violations.db"))
+        for session_id in ("s1", "s2"):
+            self.database.create_session(session_id, students=["r1", "r2"])
+        for violation_type in ("tab_switch", "mouse_out", "tab_switch", "copy_paste"):
+            self.database.save_violation("s1", "r1", violation_type)
+        self.database.save_violation("s2", "r1", "tab_switch")
+
+    def execute(self, *statements):
+        conn = sqlite3.connect(self.database.db_path)
+        for statement in statements:
+            conn.execute(statement)
+        conn.commit()
+        conn.close()
+
+    def test_counters_follow_inserts(self):
+        self.assertEqual(self.database.get_violation_counts("s1", "r1"),
+                         {"mouse_out_count": 1, "tab_switch_count": 2, "copy_paste_count": 1})
+        self.assertEqual(self.database.get_violation_counts("s1", "r2"), {"mouse_out_count": 0, "tab_switch_count": 0})
+        self.assertEqual(self.database.get_violation_counts("s2", "r1"), {"mouse_out_count": 0, "tab_switch_count": 1})
+        self.assertEqual(self.database.check_violation_counts(), [])
+
+    def test_check_reports_and_repairs_drift(self):
+        self.execute(
+            "UPDATE violation_counts SET count = 5 WHERE session_id = 's1' AND violation_type = 'tab_switch'",
+            "DELETE FROM violation_counts WHERE session_id = 's1' AND violation_type = 'mouse_out'",
+            # A raw row written without its counter
+            "INSERT INTO violations (session_id, roll_no, violation_type) VALUES ('s2', 'r2', 'mouse_out')",
+        )
+        self.assertEqual([(m["session_id"], m["violation_type"], m["stored_count"], m["actual_count"])
+                          for m in self.database.check_violation_counts()],
+                         [("s1", "mouse_out", 0, 1), ("s1", "tab_switch", 5, 2), ("s2", "mouse_out", 0, 1)])
+
+        # Repairing one session leaves the other's drift alone
+        self.assertEqual(len(self.database.check_violation_counts("s1", repair=True)), 2)
+        self.assertEqual(self.database.check_violation_counts("s1"), [])
+        self.assertEqual(self.database.get_violation_counts("s1", "r1")["tab_switch_count"], 2)
+        self.assertEqual(len(self.database.check_violation_counts()), 1)
+        self.database.check_violation_counts(repair=True)
+        self.assertEqual(self.database.check_violation_counts(), [])
+        self.assertEqual(self.database.get_violation_counts("s2", "r2")["mouse_out_count"], 1)
+
+    def test_counters_seeded_for_existing_database(self):
+        # A database from before the counters table
+        self.execute("DROP TABLE violation_counts")
+        database = DatabaseManager(self.database.db_path)
+        self.assertEqual(database.get_violation_counts("s1", "r1"),
+                         {"mouse_out_count": 1, "tab_switch_count": 2, "copy_paste_count": 1})
+        self.assertEqual(database.check_violation_counts(), [])
+
+if __name__ == '__main__':
+    unittest.main()